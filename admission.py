@@ -0,0 +1,187 @@
+"""
+Admission control per proses: batas request yang diproses bersamaan, antrian
+tunggu terbatas, dan load shedding (503 + Retry-After) saat server jenuh.
+
+- Slot: paling banyak `limit` request diproses bersamaan. Request berikutnya
+  menunggu di antrian FIFO (paling banyak queue_size) sampai slot dilepas,
+  paling lama queue_timeout detik.
+- Shedding: request langsung ditolak jika antrian penuh, jika perkiraan waktu
+  tunggunya (posisi antrian x latency layanan / limit) melewati queue_timeout,
+  atau jika tenggat antriannya habis.
+- Batas adaptif (AIMD): setiap `window` request selesai, p90 latency layanan
+  (sejak mendapat slot sampai dilepas) dibandingkan dengan target_latency.
+  Di atas target limit dikali 0.9 (paling kecil min_limit); di bawah target dan
+  limit sempat penuh, limit ditambah 1 (paling besar max_limit).
+
+Request prioritas tidak melewati controller ini sehingga tidak pernah ditolak:
+/health dan /metrics (hanya statistik), serta /chat dan /chat/stream yang jawabannya
+sudah ada di RESPONSE_CACHE untuk session mana pun (dicek tanpa membaca history
+store, lihat utils.is_cached). Route lain yang memakai store (/chat/batch, /history,
+/clear) selalu lewat controller. Controller dipakai bersama oleh thread Flask
+(acquire) dan event loop ASGI (acquire_async).
+"""
+import asyncio
+import math
+import threading
+from collections import deque
+from config import (
+    ADMISSION_MAX_CONCURRENCY, ADMISSION_MIN_CONCURRENCY, ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT,
+    ADMISSION_TARGET_LATENCY, ADMISSION_WINDOW
+)
+
+_ADMITTED = "admitted"
+_QUEUED = "queued"
+_SHED = "shed"
+# Bobot sampel baru pada rata-rata latency (EWMA)
+_EWMA_ALPHA = 0.1
+
+
+class _Waiter:
+    """Request di antrian; wake() dipanggil setelah slot diberikan (granted)"""
+
+    __slots__ = ("wake", "granted")
+
+    def __init__(self, wake):
+        self.wake = wake
+        self.granted = False
+
+
+class AdmissionController:
+    """Batas concurrency adaptif dengan antrian tunggu terbatas"""
+
+    def __init__(self, max_limit=ADMISSION_MAX_CONCURRENCY, min_limit=ADMISSION_MIN_CONCURRENCY,
+                 queue_size=ADMISSION_QUEUE_SIZE, queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+                 target_latency=ADMISSION_TARGET_LATENCY, window=ADMISSION_WINDOW):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.target_latency = target_latency
+        self.window = max(1, window)
+        self.limit = float(self.max_limit)
+        self.inflight = 0
+        self.latency = None
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self.timeouts = 0
+        self._waiters = deque()
+        self._samples = []
+        self._saturated = False
+        self._lock = threading.Lock()
+
+    def _predicted_wait(self, position):
+        """Perkiraan detik menunggu di posisi antrian ini, dari latency layanan yang teramati"""
+        if self.latency is None:
+            return 0.0
+        return position * self.latency / max(int(self.limit), 1)
+
+    def _enter(self, waiter):
+        with self._lock:
+            if self.inflight < int(self.limit) and not self._waiters:
+                self.inflight += 1
+                self.admitted += 1
+                return _ADMITTED
+            self._saturated = True
+            position = len(self._waiters) + 1
+            if position > self.queue_size or self._predicted_wait(position) > self.queue_timeout:
+                self.shed += 1
+                return _SHED
+            self._waiters.append(waiter)
+            self.queued += 1
+            return _QUEUED
+
+    def _cancel(self, waiter):
+        """Keluarkan waiter yang tenggatnya habis; True jika slot ternyata sudah diberikan"""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            self.timeouts += 1
+            self.shed += 1
+            return False
+
+    def acquire(self):
+        """Slot untuk thread ini: True jika boleh diproses (release() wajib dipanggil), False jika ditolak"""
+        event = threading.Event()
+        waiter = _Waiter(event.set)
+        state = self._enter(waiter)
+        if state is not _QUEUED:
+            return state is _ADMITTED
+        return event.wait(self.queue_timeout) or self._cancel(waiter)
+
+    async def acquire_async(self):
+        """Versi acquire untuk event loop ASGI: menunggu slot tanpa menahan loop"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def grant():
+            if not future.done():
+                future.set_result(True)
+
+        waiter = _Waiter(lambda: loop.call_soon_threadsafe(grant))
+        state = self._enter(waiter)
+        if state is not _QUEUED:
+            return state is _ADMITTED
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return self._cancel(waiter)
+        except asyncio.CancelledError:
+            # Client disconnect saat menunggu: slot yang terlanjur diberikan dikembalikan
+            if self._cancel(waiter):
+                self.release()
+            raise
+
+    def release(self, latency=None):
+        """Lepas slot; latency (detik sejak acquire) dipakai menyesuaikan limit"""
+        wakes = []
+        with self._lock:
+            if latency is not None:
+                self._observe(latency)
+            self.inflight -= 1
+            # Slot diberikan langsung ke waiter terdepan, request baru tidak bisa menyerobot
+            while self._waiters and self.inflight < int(self.limit):
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                self.inflight += 1
+                self.admitted += 1
+                wakes.append(waiter.wake)
+        for wake in wakes:
+            wake()
+
+    def _observe(self, latency):
+        """Catat latency layanan dan sesuaikan limit setiap `window` sampel (dipanggil dengan _lock)"""
+        self.latency = latency if self.latency is None else self.latency + _EWMA_ALPHA * (latency - self.latency)
+        self._samples.append(latency)
+        if len(self._samples) < self.window:
+            return
+        samples = sorted(self._samples)
+        p90 = samples[min(len(samples) - 1, int(len(samples) * 0.9))]
+        self._samples = []
+        if p90 > self.target_latency:
+            self.limit = max(float(self.min_limit), self.limit * 0.9)
+        elif self._saturated:
+            self.limit = min(float(self.max_limit), self.limit + 1)
+        self._saturated = False
+
+    def retry_after(self):
+        """Detik (bulat ke atas, minimal 1) sampai antrian saat ini diperkirakan habis"""
+        with self._lock:
+            wait = self._predicted_wait(len(self._waiters) + 1)
+        return max(1, math.ceil(min(wait, 60.0)))
+
+    def stats(self):
+        """Statistik admission control untuk health check"""
+        with self._lock:
+            return {
+                "limit": int(self.limit),
+                "inflight": self.inflight,
+                "waiting": len(self._waiters),
+                "latency_ms": round(self.latency * 1000, 3) if self.latency is not None else None,
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "shed": self.shed,
+                "timeouts": self.timeouts
+            }
@@ -0,0 +1,469 @@
+"""
+Event analytics per giliran chat dan ringkasannya untuk analisis offline.
+
+Setiap giliran /chat dan /chat/stream dicatat sebagai satu baris JSON:
+
+    {"ts":1760000000.123,"session":"3f2a9c0e1b7d4a55","route":"chat",
+     "category":"jadwal","score":100,"latency_ms":0.42,"query":"jam buka lab"}
+
+- session: HMAC-SHA256 session id dengan SECRET_KEY (16 hex), bukan id aslinya
+- query: input yang dinormalisasi seperti matcher (ASCII, lowercase, tanpa tanda baca)
+- category null: input tidak dikenali (ambiguous)
+- latency_ms: waktu match + generate respons (termasuk hit RESPONSE_CACHE)
+
+Event ditampung di buffer dan ditulis per batch oleh thread flusher, baik saat
+buffer penuh maupun secara periodik. Setiap proses menulis segmennya sendiri
+(pid di nama file) di ANALYTICS_DIR; segmen baru dibuka begitu ukurannya melewati
+ANALYTICS_SEGMENT_SIZE. Jika buffer mencapai ANALYTICS_MAX_PENDING (disk lambat
+atau penuh), event baru dibuang dan dihitung di stats().
+
+Ringkasan semua segmen, dibaca baris per baris dengan memory tetap:
+
+    python -m analytics report [--dir logs/analytics] [--since 2026-10-01] [--top 20] [--json]
+"""
+import argparse
+import atexit
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from glob import glob
+from logger_config import logger
+from metrics import DEFAULT_BUCKETS
+from config import (
+    SECRET_KEY, ANALYTICS_ENABLED, ANALYTICS_DIR, ANALYTICS_SEGMENT_SIZE, ANALYTICS_BATCH_SIZE,
+    ANALYTICS_FLUSH_INTERVAL, ANALYTICS_MAX_PENDING
+)
+
+_SESSION_KEY = SECRET_KEY.encode("utf-8")
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+# Sink proses ini, dibuat saat event pertama (lihat get_sink)
+_sink = None
+_sink_lock = threading.Lock()
+
+
+class EventSink:
+    """
+    Penulis event JSON lines append-only dengan rotasi segmen per ukuran.
+
+    emit() dipanggil di thread request dan hanya menambah ke buffer; encode dan
+    write ke disk selalu dikerjakan thread flusher (atau flush()/close()), jadi
+    disk yang lambat tidak menahan request, hanya membuat buffer penuh.
+    """
+
+    def __init__(self, directory=ANALYTICS_DIR, segment_size=ANALYTICS_SEGMENT_SIZE,
+                 batch_size=ANALYTICS_BATCH_SIZE, flush_interval=ANALYTICS_FLUSH_INTERVAL,
+                 max_pending=ANALYTICS_MAX_PENDING):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.segments = 0
+        self._pending = []
+        # _lock hanya melindungi buffer dan counter; file segmen dipegang _write_lock
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._size = 0
+
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="analytics-flusher", daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        # flush_interval <= 0: tidak ada flush periodik, hanya saat buffer mencapai batch_size
+        interval = self.flush_interval if self.flush_interval > 0 else None
+        while not self._stop.is_set():
+            self._wake.wait(interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing event analytics: {str(e)}")
+
+    def emit(self, event):
+        """Tambahkan event ke buffer; flusher dibangunkan saat buffer mencapai batch_size"""
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return
+            self._pending.append(event)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Tulis semua event di buffer; emit tidak menunggu selama encode dan write"""
+        with self._write_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if batch:
+                self._write(batch)
+
+    def _open_segment(self):
+        """Tutup segmen saat ini dan buka segmen baru (dipanggil dengan _write_lock dipegang)"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        os.makedirs(self.directory, exist_ok=True)
+        self.segments += 1
+        name = f"events-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self.segments:04d}.jsonl"
+        self._path = os.path.join(self.directory, name)
+        self._file = open(self._path, "ab")
+        self._size = self._file.tell()
+
+    def _write(self, batch):
+        """Tulis satu batch ke segmen saat ini (dipanggil dengan _write_lock dipegang)"""
+        data = "".join(f"{_encoder.encode(event)}\n" for event in batch).encode("utf-8")
+        try:
+            if self._file is None or self._size >= self.segment_size:
+                self._open_segment()
+            # Satu write per batch: baris tidak pernah terpotong di tengah oleh writer lain
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data)
+            with self._lock:
+                self.written += len(batch)
+        except OSError as e:
+            with self._lock:
+                self.errors += 1
+                self.dropped += len(batch)
+            logger.error(f"Error menulis event analytics ke {self.directory}: {str(e)}")
+
+    def close(self):
+        """Hentikan flusher, tulis sisa buffer dan tutup segmen"""
+        self._stop.set()
+        self._wake.set()
+        if self._flusher is not threading.current_thread():
+            self._flusher.join(timeout=2)
+        self.flush()
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": True,
+                "segment": self._path,
+                "segments": self.segments,
+                "written": self.written,
+                "pending": len(self._pending),
+                "dropped": self.dropped,
+                "errors": self.errors
+            }
+
+
+def get_sink():
+    """EventSink proses ini, None jika ANALYTICS_ENABLED mati"""
+    global _sink
+    if _sink is None and ANALYTICS_ENABLED:
+        with _sink_lock:
+            if _sink is None:
+                _sink = EventSink()
+    return _sink
+
+
+def session_hash(session_id):
+    """Identitas session di event: HMAC dengan SECRET_KEY, tidak bisa dipakai sebagai cookie"""
+    return hmac.new(_SESSION_KEY, str(session_id).encode("utf-8"), hashlib.sha256).hexdigest()[:16]
+
+
+def normalize_query(user_input):
+    """Query dalam bentuk yang dipakai matcher, spasi dirapatkan agar query sama terhitung sama"""
+    from matcher import normalize
+    return " ".join(normalize(user_input).split())
+
+
+def record_turn(route, session_id, user_input, category, score, latency):
+    """Catat satu giliran chat (latency dalam detik); tidak pernah menggagalkan request"""
+    sink = get_sink()
+    if sink is None:
+        return
+    try:
+        sink.emit({
+            "ts": round(time.time(), 3),
+            "session": session_hash(session_id),
+            "route": route,
+            "category": category,
+            "score": round(score, 1) if isinstance(score, float) else score,
+            "latency_ms": round(latency * 1000, 3),
+            "query": normalize_query(user_input)
+        })
+    except Exception as e:
+        logger.error(f"Error dalam record_turn: {str(e)}")
+
+
+def analytics_stats():
+    """Status sink untuk /health"""
+    sink = _sink
+    if sink is None:
+        return {"enabled": ANALYTICS_ENABLED, "written": 0}
+    return sink.stats()
+
+
+def close():
+    """Tulis sisa event saat proses berhenti"""
+    sink = _sink
+    if sink is not None:
+        sink.close()
+
+
+def _reset_after_fork():
+    """
+    Buffer dan file segmen milik proses induk tidak dipakai proses anak (event
+    induk yang belum ditulis akan tertulis dua kali); anak membuat sink sendiri.
+    """
+    global _sink, _sink_lock
+    _sink = None
+    _sink_lock = threading.Lock()
+
+
+atexit.register(close)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# --- Ringkasan offline -------------------------------------------------------
+
+class FrequentItems:
+    """
+    Item paling sering dengan memory tetap (algoritma Misra-Gries): paling banyak
+    capacity counter. Selama jumlah item berbeda tidak melebihi capacity hitungannya
+    tepat; selebihnya hitungan adalah batas bawah yang kurang paling banyak `error`.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.error = 0
+        self._counts = {}
+        self._labels = {}
+
+    def add(self, item, label=None):
+        counts = self._counts
+        if item in counts:
+            counts[item] += 1
+        elif len(counts) < self.capacity:
+            counts[item] = 1
+        else:
+            # Semua counter dikurangi satu; total pengurangan <= jumlah item, jadi amortized O(1)
+            self.error += 1
+            for key in list(counts):
+                counts[key] -= 1
+                if not counts[key]:
+                    del counts[key]
+                    self._labels.pop(key, None)
+            return
+        self._labels[item] = label
+
+    def top(self, n):
+        ranked = sorted(self._counts.items(), key=lambda item: (-item[1], item[0]))[:n]
+        return [{"query": item, "count": count, "category": self._labels.get(item)} for item, count in ranked]
+
+
+class LatencyHistogram:
+    """Histogram latency (ms) dengan bucket tetap metrics.DEFAULT_BUCKETS"""
+
+    BOUNDS = tuple(bound * 1000 for bound in DEFAULT_BUCKETS)
+
+    def __init__(self):
+        self.buckets = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.buckets[bisect_left(self.BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Batas atas bucket yang memuat kuantil q (paling besar nilai maksimum)"""
+        rank = q * self.count
+        cumulative = 0
+        for i, n in enumerate(self.buckets):
+            cumulative += n
+            if n and cumulative >= rank:
+                return min(self.BOUNDS[i], self.max) if i < len(self.BOUNDS) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5), 3),
+            "p95_ms": round(self.quantile(0.95), 3),
+            "p99_ms": round(self.quantile(0.99), 3),
+            "max_ms": round(self.max, 3)
+        }
+
+
+class Report:
+    """Agregat streaming event analytics: jumlah, rate ambiguous, top query, latency per kategori"""
+
+    def __init__(self, capacity=10000, since=None, until=None):
+        self.since = since
+        self.until = until
+        self.events = 0
+        self.invalid = 0
+        self.segments = 0
+        self.first = None
+        self.last = None
+        self.ambiguous = 0
+        self.routes = {}
+        # Jumlah kategori dibatasi KB, jadi satu histogram per kategori
+        self.categories = {}
+        self.queries = FrequentItems(capacity)
+        self.unmatched = FrequentItems(capacity)
+
+    def add(self, event):
+        try:
+            ts = float(event["ts"])
+            category = event.get("category")
+            latency = float(event.get("latency_ms", 0.0))
+            query = str(event.get("query", ""))
+        except (KeyError, TypeError, ValueError):
+            self.invalid += 1
+            return
+        if (self.since is not None and ts < self.since) or (self.until is not None and ts >= self.until):
+            return
+
+        self.events += 1
+        self.first = ts if self.first is None else min(self.first, ts)
+        self.last = ts if self.last is None else max(self.last, ts)
+        route = str(event.get("route"))
+        self.routes[route] = self.routes.get(route, 0) + 1
+
+        histogram = self.categories.get(category)
+        if histogram is None:
+            histogram = self.categories[category] = LatencyHistogram()
+        histogram.add(latency)
+
+        self.queries.add(query, category)
+        if category is None:
+            self.ambiguous += 1
+            self.unmatched.add(query)
+
+    def read(self, path):
+        """Tambahkan semua event satu segmen (.jsonl atau .jsonl.gz); baris rusak dilewati"""
+        opener = gzip.open if path.endswith(".gz") else open
+        self.segments += 1
+        with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # Termasuk baris terakhir yang belum selesai ditulis
+                    self.invalid += 1
+                    continue
+                if isinstance(event, dict):
+                    self.add(event)
+                else:
+                    self.invalid += 1
+
+    def to_dict(self, top=20):
+        def iso(ts):
+            return datetime.fromtimestamp(ts).isoformat(timespec="seconds") if ts is not None else None
+
+        categories = sorted(self.categories.items(), key=lambda item: -item[1].count)
+        return {
+            "segments": self.segments,
+            "events": self.events,
+            "invalid_lines": self.invalid,
+            "first": iso(self.first),
+            "last": iso(self.last),
+            "routes": self.routes,
+            "ambiguous": self.ambiguous,
+            "ambiguous_rate": round(self.ambiguous / self.events, 4) if self.events else 0.0,
+            "categories": [
+                {"category": category, "share": round(histogram.count / self.events, 4), **histogram.summary()}
+                for category, histogram in categories
+            ],
+            "top_queries": self.queries.top(top),
+            "top_unmatched": self.unmatched.top(top),
+            # Hitungan top query bisa kurang paling banyak sebesar ini (0 = tepat)
+            "count_error": {"queries": self.queries.error, "unmatched": self.unmatched.error}
+        }
+
+
+def segment_paths(directory=ANALYTICS_DIR):
+    """File segmen di directory, urut nama (waktu dibuka, pid, nomor)"""
+    return sorted(glob(os.path.join(directory, "events-*.jsonl")) + glob(os.path.join(directory, "events-*.jsonl.gz")))
+
+
+def _parse_time(value):
+    """Timestamp unix atau tanggal/waktu ISO ('2026-10-01', '2026-10-01T08:00')"""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"waktu tidak valid: {value}")
+
+
+def _print_report(summary):
+    print(f"{summary['events']} event dari {summary['segments']} segmen ({summary['first']} - {summary['last']}), "
+          f"{summary['invalid_lines']} baris tidak valid")
+    print(f"ambiguous: {summary['ambiguous']} ({summary['ambiguous_rate']:.1%})")
+    print("\nkategori               jumlah   share   mean ms    p50 ms    p95 ms    p99 ms")
+    for row in summary["categories"]:
+        print(f"{str(row['category']):<20} {row['count']:>8} {row['share']:>7.1%} {row['mean_ms']:>9.3f} "
+              f"{row['p50_ms']:>9.3f} {row['p95_ms']:>9.3f} {row['p99_ms']:>9.3f}")
+    for title, key in (("top query", "top_queries"), ("top query tidak dikenali", "top_unmatched")):
+        print(f"\n{title}:")
+        for row in summary[key]:
+            label = f"  [{row['category']}]" if key == "top_queries" else ""
+            print(f"{row['count']:>8}  {row['query']}{label}")
+
+
+def main(argv=None):
+    """CLI: python -m analytics report [--dir DIR] [--since T] [--until T] [--top N] [--capacity N] [--json]"""
+    parser = argparse.ArgumentParser(prog="python -m analytics", description="Ringkasan event analytics chatbot")
+    commands = parser.add_subparsers(dest="command", required=True)
+    report = commands.add_parser("report", help="top query, rate ambiguous dan latency per kategori")
+    report.add_argument("--dir", default=ANALYTICS_DIR, help=f"direktori segmen (default {ANALYTICS_DIR})")
+    report.add_argument("--since", type=_parse_time, help="hanya event sejak waktu ini (ISO atau unix)")
+    report.add_argument("--until", type=_parse_time, help="hanya event sebelum waktu ini (ISO atau unix)")
+    report.add_argument("--top", type=int, default=20, help="jumlah top query (default 20)")
+    report.add_argument("--capacity", type=int, default=10000,
+                        help="counter query yang disimpan, membatasi memory (default 10000)")
+    report.add_argument("--json", action="store_true", help="output JSON")
+    args = parser.parse_args(argv)
+
+    paths = segment_paths(args.dir)
+    if not paths:
+        print(f"{args.dir}: tidak ada segmen event")
+        return 1
+    summary = Report(max(args.capacity, args.top), args.since, args.until)
+    for path in paths:
+        try:
+            summary.read(path)
+        except (OSError, EOFError) as e:
+            print(f"error: {path}: {str(e)}")
+    summary = summary.to_dict(args.top)
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        _print_report(summary)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
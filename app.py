@@ -1,90 +1,458 @@
-from flask import Flask, render_template, request, jsonify, session
-from utils import match_category, generate_response
-from logger_config import logger
-from config import SECRET_KEY, SESSION_LIFETIME, MAX_CONVERSATION_HISTORY, DEBUG, TESTING
+from flask import Blueprint, Flask, Response, current_app, render_template, request, jsonify, session, g
+from flask.json.provider import DefaultJSONProvider
+from utils import (
+    get_response, get_responses, stream_response, load_knowledge_base, ensure_knowledge_base,
+    start_kb_watcher, kb_info, matcher_pool_stats, advance_context, is_cached, RESPONSE_CACHE
+)
+from conversation import ConversationContext
+from analytics import record_turn, analytics_stats
+from admission import AdmissionController
+from logger_config import logger, request_logger, queue_logging_stats, setup_logging
+from history_store import create_history_store, HistoryRecord
+from rate_limiter import create_rate_limiter
+from metrics import REGISTRY, REQUESTS, REQUEST_LATENCY, STAGE_LATENCY, CATEGORIES
+import sse
+from compression import choose_encoding, compress, CachedPage
+from config import (
+    SECRET_KEY, SESSION_LIFETIME, SESSION_CLEANUP_INTERVAL, DEBUG, TESTING, MAX_CONVERSATION_HISTORY,
+    RATE_LIMIT_ENABLED, MAX_REQUESTS_PER_MINUTE, MAX_BATCH_SIZE, ADMIN_TOKEN, METRICS_ENABLED,
+    SSE_HEARTBEAT_INTERVAL, KB_PRELOAD, STATIC_MAX_AGE, COMPRESSION_ENABLED, COMPRESSION_MIN_SIZE,
+    CONTEXT_ENABLED, ADMISSION_ENABLED
+)
 from datetime import datetime, timedelta
 import uuid
+import time
 from functools import wraps
+import gc
 import json
+import hmac
+import logging
+import os
+import threading
 
-app = Flask(__name__)
-app.secret_key = SECRET_KEY
-app.permanent_session_lifetime = SESSION_LIFETIME
+# Route dan hook aplikasi; dipasang ke app Flask oleh create_app()
+bp = Blueprint("chatbot", __name__)
 
-# Store conversation history in memory (untuk development)
-conversation_history = {}
-request_count = {}  # untuk rate limiting
+# Store conversation history (backend sesuai HISTORY_BACKEND), rate limiter dan
+# admission control, dibuat per proses oleh init_process()
+history_store = None
+rate_limiter = None
+admission = None
+_process_pid = None
+_init_lock = threading.Lock()
+_last_cleanup = time.monotonic()
+# Halaman index yang sudah dirender (template tidak bergantung pada request)
+_index_page = None
 
-def rate_limit(max_requests=30, time_window=60):
-    """Decorator untuk rate limiting"""
+class CompactJSONProvider(DefaultJSONProvider):
+    """
+    JSON ringkas (tanpa spasi, UTF-8 apa adanya) lewat satu JSONEncoder yang dibuat
+    sekali, bukan json.dumps dengan argumen baru di setiap response.
+    """
+    
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=DefaultJSONProvider.default)
+    
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._encoder.encode(obj)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(f"{self._encoder.encode(obj)}\n", mimetype=self.mimetype)
+
+def init_process():
+    """
+    Buat resource milik proses ini: history store, rate limiter, admission control,
+    dan thread yang me-reload KB saat file berubah (KB_WATCH_INTERVAL). Worker hasil fork (gunicorn
+    --preload) membuat ulang resource-nya saat request pertama, karena koneksi
+    sqlite/redis dan thread proses induk tidak ikut ter-fork.
+    """
+    global history_store, rate_limiter, admission, _process_pid
+    pid = os.getpid()
+    if _process_pid == pid:
+        return
+    with _init_lock:
+        if _process_pid == pid:
+            return
+        history_store = create_history_store()
+        rate_limiter = create_rate_limiter()
+        admission = AdmissionController()
+        start_kb_watcher()
+        _process_pid = pid
+
+def unmatched_ratio():
+    """Rasio respons chat tanpa kategori (tidak dikenali/ambigu)"""
+    counts = CATEGORIES.values()
+    total = sum(counts.values())
+    return counts.get(("none",), 0) / total if total else 0.0
+
+# Metrics dari komponen yang sudah menghitung statistiknya sendiri, dibaca saat scrape
+REGISTRY.callback("chatbot_unmatched_ratio", "Rasio respons chat dengan kategori none", unmatched_ratio)
+REGISTRY.callback("chatbot_rate_limit_rejections_total", "Request yang ditolak rate limiter",
+                  lambda: rate_limiter.rejected, type="counter")
+REGISTRY.callback("chatbot_rate_limit_clients", "Client yang sedang dilacak rate limiter", lambda: len(rate_limiter))
+REGISTRY.callback("chatbot_response_cache_hits_total", "Cache hit respons", lambda: RESPONSE_CACHE.hits, type="counter")
+REGISTRY.callback("chatbot_response_cache_misses_total", "Cache miss respons", lambda: RESPONSE_CACHE.misses, type="counter")
+REGISTRY.callback("chatbot_response_cache_evictions_total", "Entry cache yang di-evict (LRU)",
+                  lambda: RESPONSE_CACHE.evictions, type="counter")
+REGISTRY.callback("chatbot_response_cache_size", "Jumlah entry di cache respons", lambda: len(RESPONSE_CACHE))
+REGISTRY.callback("chatbot_history_sessions", "Session yang memiliki history", lambda: history_store.count())
+REGISTRY.callback("chatbot_history_records", "Total record history (backend memory)",
+                  lambda: history_store.stats().get("records"))
+REGISTRY.callback("chatbot_history_expired_sessions_total", "Session yang expired karena idle",
+                  lambda: history_store.expired, type="counter")
+REGISTRY.callback("chatbot_history_evicted_sessions_total", "Session yang di-evict karena batas memory",
+                  lambda: history_store.evicted, type="counter")
+REGISTRY.callback("chatbot_log_dropped_total", "Record log yang dibuang karena antrian penuh",
+                  lambda: queue_logging_stats().get("dropped"), type="counter")
+REGISTRY.callback("chatbot_matcher_pool_saturated_total", "Matching yang dihitung di proses request karena pool penuh",
+                  lambda: matcher_pool_stats().get("saturated"), type="counter")
+REGISTRY.callback("chatbot_matcher_pool_timeouts_total", "Task matcher pool yang timeout",
+                  lambda: matcher_pool_stats().get("timeouts"), type="counter")
+REGISTRY.callback("chatbot_admission_limit", "Batas adaptif request diproses bersamaan", lambda: int(admission.limit))
+REGISTRY.callback("chatbot_admission_inflight", "Request yang sedang memegang slot admission",
+                  lambda: admission.inflight)
+REGISTRY.callback("chatbot_admission_waiting", "Request di antrian admission", lambda: admission.stats()["waiting"])
+REGISTRY.callback("chatbot_admission_shed_total", "Request yang ditolak 503 oleh admission control",
+                  lambda: admission.shed, type="counter")
+REGISTRY.callback("chatbot_knowledge_base_version", "Versi KB yang sedang aktif", lambda: kb_info()["version"])
+
+def rate_limit(max_requests=MAX_REQUESTS_PER_MINUTE, time_window=60):
+    """Decorator untuk rate limiting (sliding window per IP, backend sesuai RATE_LIMIT_BACKEND)"""
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
+            if not RATE_LIMIT_ENABLED:
+                return f(*args, **kwargs)
             try:
                 client_ip = request.remote_addr
-                now = datetime.now()
-                
-                if client_ip not in request_count:
-                    request_count[client_ip] = []
-                
-                # Clean old requests
-                request_count[client_ip] = [
-                    req_time for req_time in request_count[client_ip]
-                    if (now - req_time).seconds < time_window
-                ]
-                
-                if len(request_count[client_ip]) >= max_requests:
+                allowed, retry_after = rate_limiter.hit(client_ip, max_requests, time_window)
+                if not allowed:
                     logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-                    return jsonify({"error": "Terlalu banyak permintaan. Coba lagi nanti."}), 429
-                
-                request_count[client_ip].append(now)
-                return f(*args, **kwargs)
+                    response = jsonify({"error": "Terlalu banyak permintaan. Coba lagi nanti."})
+                    response.headers["Retry-After"] = str(retry_after)
+                    return response, 429
             except Exception as e:
                 logger.error(f"Error dalam rate_limit: {str(e)}")
+            return f(*args, **kwargs)
+        
+        return decorated_function
+    return decorator
+
+def overloaded():
+    """Payload, status dan Retry-After (detik) untuk request yang ditolak admission control"""
+    return {"error": "Server sedang sibuk. Coba lagi sebentar lagi."}, 503, admission.retry_after()
+
+def admission_control(priority=None):
+    """
+    Decorator admission control (lihat admission.py): request menunggu slot di antrian
+    terbatas, atau langsung 503 + Retry-After saat server jenuh. priority() True:
+    request dilayani tanpa slot (misal jawabannya sudah ada di cache).
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not ADMISSION_ENABLED:
                 return f(*args, **kwargs)
+            try:
+                if priority is not None and priority():
+                    return f(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"Error dalam admission_control: {str(e)}")
+            
+            controller = admission
+            if not controller.acquire():
+                payload, status, retry_after = overloaded()
+                logger.warning(f"Request shed (503) untuk {request.path}: {controller.stats()}")
+                response = jsonify(payload)
+                response.headers["Retry-After"] = str(retry_after)
+                return response, status
+            
+            start = time.perf_counter()
+            streamed = False
+            try:
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.is_streamed:
+                    # Slot dilepas setelah stream selesai; latency kirim ke client tidak dipakai menyesuaikan limit
+                    response.call_on_close(controller.release)
+                    streamed = True
+                return response
+            finally:
+                if not streamed:
+                    controller.release(time.perf_counter() - start)
         
         return decorated_function
     return decorator
 
+def cached_chat_request():
+    """
+    Prioritas /chat dan /chat/stream: jawabannya sudah ada di RESPONSE_CACHE untuk
+    session mana pun sehingga tidak perlu slot. Tidak membaca history store, agar
+    request yang akan ditolak tidak sempat membebani store.
+    """
+    data = request.get_json(silent=True)
+    message = data.get("message") if isinstance(data, dict) else None
+    if not isinstance(message, str):
+        return False
+    return is_cached(message.strip())
+
 def cleanup_old_sessions():
     """Bersihkan session yang sudah expired"""
     try:
-        now = datetime.now()
-        expired_sessions = []
-        
-        for session_id in list(conversation_history.keys()):
-            if len(conversation_history[session_id]) > MAX_CONVERSATION_HISTORY:
-                # Jaga hanya history terbaru
-                conversation_history[session_id] = conversation_history[session_id][-MAX_CONVERSATION_HISTORY:]
-        
-        logger.debug(f"Cleanup sessions completed. Active sessions: {len(conversation_history)}")
+        removed = history_store.cleanup()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Cleanup sessions completed. Removed: %s, active sessions: %s", removed, history_store.count())
     except Exception as e:
         logger.error(f"Error dalam cleanup_old_sessions: {str(e)}")
 
-@app.before_request
+def get_or_create_session_id():
+    """Ambil session_id dari cookie, session baru hanya dibuat saat dibutuhkan (/chat)"""
+    session_id = session.get('session_id')
+    if not session_id:
+        session.permanent = True
+        session_id = session['session_id'] = str(uuid.uuid4())
+        request_logger.info("New session created: %s", session_id)
+    return session_id
+
+@bp.before_app_request
 def before_request():
     """Jalankan sebelum setiap request"""
+    global _last_cleanup
+    g.request_start = time.perf_counter()
+    init_process()
     try:
-        session.permanent = True
-        if 'session_id' not in session:
-            session['session_id'] = str(uuid.uuid4())
-            conversation_history[session['session_id']] = []
-            logger.info(f"New session created: {session['session_id']}")
+        # Expire session idle secara periodik, tanpa membuat session untuk request tanpa cookie
+        now = time.monotonic()
+        if now - _last_cleanup >= SESSION_CLEANUP_INTERVAL:
+            _last_cleanup = now
+            cleanup_old_sessions()
     except Exception as e:
         logger.error(f"Error dalam before_request: {str(e)}")
 
-@app.route("/", methods=["GET"])
+@bp.after_app_request
+def compress_response(response):
+    """Kompres response JSON yang cukup besar sesuai Accept-Encoding (lihat compression.py)"""
+    if (response.mimetype != "application/json" or response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers or not 200 <= response.status_code < 300):
+        return response
+    data = response.get_data()
+    if not COMPRESSION_ENABLED or len(data) < COMPRESSION_MIN_SIZE:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+    if encoding is not None:
+        response.set_data(compress(data, encoding))
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+@bp.after_app_request
+def record_request_metrics(response):
+    """Catat jumlah dan latency request per route (pola URL, bukan path mentah)"""
+    start = g.pop("request_start", None)
+    if METRICS_ENABLED and start is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_LATENCY.observe(time.perf_counter() - start, route, request.method)
+        REQUESTS.inc(route, request.method, str(response.status_code))
+    return response
+
+def chat_message(data):
+    """
+    Field message dari body JSON /chat dan /chat/stream (Flask dan ASGI).
+    Mengembalikan (pesan, None), atau (None, (payload error, status)) jika body bukan
+    object JSON atau message bukan string.
+    """
+    message = data.get("message", "") if isinstance(data, dict) else None
+    if not isinstance(message, str):
+        logger.warning("Invalid chat request body")
+        return None, ({"error": "Format JSON tidak valid"}, 400)
+    return message.strip(), None
+
+def validate_chat_message(session_id, user_msg):
+    """Validasi pesan chat. Mengembalikan (payload error, status) atau None jika valid"""
+    if not user_msg:
+        logger.warning(f"[{session_id}] Empty message received")
+        return {"error": "Pesan tidak boleh kosong"}, 400
+    
+    if len(user_msg) > 500:
+        logger.warning(f"[{session_id}] Message too long: {len(user_msg)}")
+        return {"error": "Pesan terlalu panjang (maksimal 500 karakter)"}, 400
+    
+    return None
+
+def load_context(session_id):
+    """Konteks percakapan session dari history store, None jika nonaktif/tidak ada/kedaluwarsa"""
+    if not CONTEXT_ENABLED:
+        return None
+    try:
+        return ConversationContext.from_dict(history_store.get_context(session_id))
+    except Exception as e:
+        logger.error(f"Error dalam load_context: {str(e)}")
+        return None
+
+def context_after(context, user_msg, category):
+    """State konteks (dict) untuk disimpan bersama record history giliran ini, None jika nonaktif"""
+    if not CONTEXT_ENABLED:
+        return None
+    context = advance_context(context, user_msg, category)
+    return context.to_dict() if context is not None else None
+
+def answer_chat(session_id, user_msg, context=None):
+    """
+    Jawab pesan chat yang sudah valid.
+    Dipakai route Flask dan handler ASGI; context dari load_context().
+    Mengembalikan (payload respons, record history, state konteks untuk history_store.append).
+    """
+    start = time.perf_counter()
+    request_logger.debug("[%s] User message: %s", session_id, user_msg)
+    logging_time = time.perf_counter() - start
+    
+    # Match category dan generate response (via response cache)
+    start = time.perf_counter()
+    category, bot_response, score = get_response(user_msg, context)
+    record_turn("chat", session_id, user_msg, category, score, time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    request_logger.info("[%s] Bot response category: %s", session_id, category)
+    STAGE_LATENCY.observe(logging_time + time.perf_counter() - start, "logging")
+    CATEGORIES.inc(category or "none")
+    
+    conversation_record = HistoryRecord(user_msg, bot_response, category)
+    payload = {
+        "response": bot_response,
+        "category": category,
+        "success": True
+    }
+    return payload, conversation_record, context_after(context, user_msg, category)
+
+def chat_events(session_id, user_msg, context=None):
+    """
+    Generator event SSE untuk /chat/stream (route Flask dan handler ASGI):
+    'category' lebih dulu, lalu 'message' per potongan respons, lalu 'done'.
+    Giliran dicatat ke history setelah respons lengkap; context dari load_context().
+    """
+    try:
+        request_logger.debug("[%s] User message (stream): %s", session_id, user_msg)
+        category = None
+        chunks = []
+        score = 0
+        start = time.perf_counter()
+        for kind, value in stream_response(user_msg, context):
+            if kind == "score":
+                score = value
+            elif kind == "category":
+                category = value
+                # Latency sampai kategori diketahui, belum termasuk waktu kirim ke client
+                record_turn("stream", session_id, user_msg, category, score, time.perf_counter() - start)
+                yield sse.format_event("category", {"category": category})
+            else:
+                chunks.append(value)
+                yield sse.format_event("message", {"text": value})
+
+        request_logger.info("[%s] Bot response category: %s", session_id, category)
+        CATEGORIES.inc(category or "none")
+
+        start = time.perf_counter()
+        history_store.append(
+            session_id, HistoryRecord(user_msg, "".join(chunks), category), context_after(context, user_msg, category)
+        )
+        STAGE_LATENCY.observe(time.perf_counter() - start, "history_append")
+
+        yield sse.format_event("done", {"category": category, "success": True})
+    except Exception as e:
+        logger.error(f"Error in chat stream: {str(e)}", exc_info=True)
+        yield sse.format_event("error", {"error": "Maaf, terjadi kesalahan server."})
+
+def parse_history_query(args):
+    """
+    Parameter /history: limit (1..MAX_CONVERSATION_HISTORY), before dan since (id record).
+    Mengembalikan (query, None) atau (None, payload error).
+    """
+    query = {}
+    for name in ("limit", "before", "since"):
+        value = args.get(name)
+        if value is None or value == "":
+            continue
+        try:
+            query[name] = int(value)
+        except (TypeError, ValueError):
+            return None, {"error": f"Parameter '{name}' harus berupa angka"}
+        if query[name] < (1 if name == "limit" else 0):
+            return None, {"error": f"Parameter '{name}' tidak valid"}
+    query["limit"] = min(query.get("limit", MAX_CONVERSATION_HISTORY), MAX_CONVERSATION_HISTORY)
+    return query, None
+
+def history_etag(latest, count):
+    """
+    ETag history session: berubah setiap ada record baru, dipotong, atau di-clear.
+    Dikirim sebagai weak ETag karena sama untuk semua Content-Encoding.
+    """
+    return f"h{latest or 0}.{count}"
+
+def history_payload(session_id, query):
+    """
+    Satu halaman history session. Cursor 'before' untuk halaman lebih lama dan
+    'since' untuk mengambil giliran baru saja. Mengembalikan (payload, etag).
+    """
+    records, has_more, latest, count = history_store.page(session_id, **query)
+    since = query.get("since")
+    payload = {
+        "history": records,
+        "has_more": has_more,
+        "before": records[0]["id"] if records else None,
+        "since": records[-1]["id"] if records else (since if since is not None else latest),
+        "total": count
+    }
+    return payload, history_etag(latest, count)
+
+def health_payload():
+    """Isi response health check"""
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "active_sessions": history_store.count(),
+        "history_store": history_store.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "admission": admission.stats(),
+        "knowledge_base": kb_info(),
+        "matcher_pool": matcher_pool_stats(),
+        "response_cache": RESPONSE_CACHE.stats(),
+        "logging": queue_logging_stats(),
+        "analytics": analytics_stats()
+    }
+
+def index_page():
+    """Halaman utama yang dirender sekali per proses; mode debug selalu render ulang template"""
+    global _index_page
+    page = _index_page
+    if page is None or current_app.debug:
+        page = _index_page = CachedPage(render_template("index.html").encode("utf-8"), "text/html; charset=utf-8")
+    return page
+
+@bp.route("/", methods=["GET"])
 def index():
-    """Render halaman utama"""
+    """Render halaman utama (dari cache, 304 jika ETag di If-None-Match masih sama)"""
     try:
-        logger.info(f"Index page accessed from {request.remote_addr}")
-        return render_template("index.html")
+        request_logger.info("Index page accessed from %s", request.remote_addr)
+        page = index_page()
+        body, encoding, etag = page.variant(request.headers.get("Accept-Encoding"))
+        if etag in request.if_none_match:
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(body, content_type=page.content_type)
+            if encoding is not None:
+                response.headers["Content-Encoding"] = encoding
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        response.vary.add("Accept-Encoding")
+        return response
     except Exception as e:
         logger.error(f"Error rendering index: {str(e)}")
         return jsonify({"error": "Terjadi kesalahan saat memuat halaman."}), 500
 
-@app.route("/chat", methods=["POST"])
-@rate_limit(max_requests=30, time_window=60)
+@bp.route("/chat", methods=["POST"])
+@rate_limit()
+@admission_control(priority=cached_chat_request)
 def chat():
     """Endpoint untuk chat dengan bot"""
     try:
@@ -93,85 +461,146 @@ def chat():
             logger.warning("Invalid content type in chat request")
             return jsonify({"error": "Content-Type harus application/json"}), 400
         
-        user_msg = request.json.get("message", "").strip()
-        session_id = session.get('session_id', str(uuid.uuid4()))
+        user_msg, error = chat_message(request.json)
+        if error:
+            return jsonify(error[0]), error[1]
+        session_id = get_or_create_session_id()
         
         # Validasi input
-        if not user_msg:
-            logger.warning(f"[{session_id}] Empty message received")
-            return jsonify({"error": "Pesan tidak boleh kosong"}), 400
+        error = validate_chat_message(session_id, user_msg)
+        if error:
+            return jsonify(error[0]), error[1]
         
-        if len(user_msg) > 500:
-            logger.warning(f"[{session_id}] Message too long: {len(user_msg)}")
-            return jsonify({"error": "Pesan terlalu panjang (maksimal 500 karakter)"}), 400
+        payload, conversation_record, context = answer_chat(session_id, user_msg, load_context(session_id))
         
-        logger.info(f"[{session_id}] User message: {user_msg}")
+        # History dipotong ke MAX_CONVERSATION_HISTORY di sisi store
+        start = time.perf_counter()
+        history_store.append(session_id, conversation_record, context)
+        STAGE_LATENCY.observe(time.perf_counter() - start, "history_append")
         
-        # Initialize history jika belum ada
-        if session_id not in conversation_history:
-            conversation_history[session_id] = []
+        return jsonify(payload), 200
+    
+    except json.JSONDecodeError:
+        logger.error("Invalid JSON in request")
+        return jsonify({"error": "Format JSON tidak valid"}), 400
+    except Exception as e:
+        logger.error(f"Error in chat endpoint: {str(e)}", exc_info=True)
+        return jsonify({"error": "Maaf, terjadi kesalahan server."}), 500
+
+@bp.route("/chat/stream", methods=["POST"])
+@rate_limit()
+@admission_control(priority=cached_chat_request)
+def chat_stream():
+    """
+    Endpoint chat dengan Server-Sent Events. Body sama seperti /chat; error validasi
+    dikembalikan sebagai JSON biasa sebelum stream dimulai.
+    """
+    try:
+        if not request.is_json:
+            logger.warning("Invalid content type in chat stream request")
+            return jsonify({"error": "Content-Type harus application/json"}), 400
         
-        # Match category dan generate response
-        category = match_category(user_msg)
-        bot_response = generate_response(category, user_msg)
+        user_msg, error = chat_message(request.json)
+        if error:
+            return jsonify(error[0]), error[1]
+        session_id = get_or_create_session_id()
         
-        logger.info(f"[{session_id}] Bot response category: {category}")
+        error = validate_chat_message(session_id, user_msg)
+        if error:
+            return jsonify(error[0]), error[1]
         
-        # Store dalam history
-        conversation_record = {
-            "user": user_msg,
-            "bot": bot_response,
-            "category": category,
-            "timestamp": datetime.now().isoformat()
-        }
+        # Session cookie sudah ikut di header; generator tidak butuh request context
+        events = sse.with_heartbeat(
+            chat_events(session_id, user_msg, load_context(session_id)), SSE_HEARTBEAT_INTERVAL
+        )
+        return Response(events, content_type="text/event-stream; charset=utf-8", headers=sse.HEADERS)
+    
+    except Exception as e:
+        logger.error(f"Error in chat stream endpoint: {str(e)}", exc_info=True)
+        return jsonify({"error": "Maaf, terjadi kesalahan server."}), 500
+
+@bp.route("/chat/batch", methods=["POST"])
+@rate_limit()
+@admission_control()
+def chat_batch():
+    """
+    Endpoint untuk klasifikasi banyak pesan dalam satu request.
+    Tidak dicatat ke history session; satu batch dihitung satu request oleh rate limiter.
+    """
+    try:
+        if not request.is_json:
+            logger.warning("Invalid content type in batch request")
+            return jsonify({"error": "Content-Type harus application/json"}), 400
         
-        conversation_history[session_id].append(conversation_record)
+        messages = request.json.get("messages")
+        if not isinstance(messages, list) or not messages:
+            return jsonify({"error": "Field 'messages' harus berupa list yang tidak kosong"}), 400
         
-        # Cleanup history jika terlalu panjang
-        if len(conversation_history[session_id]) > MAX_CONVERSATION_HISTORY:
-            conversation_history[session_id] = conversation_history[session_id][-MAX_CONVERSATION_HISTORY:]
+        if len(messages) > MAX_BATCH_SIZE:
+            logger.warning(f"Batch too large: {len(messages)}")
+            return jsonify({"error": f"Batch terlalu besar (maksimal {MAX_BATCH_SIZE} pesan)"}), 400
+        
+        messages = [m.strip() if isinstance(m, str) else m for m in messages]
+        results = get_responses(messages)
+        request_logger.info("Batch processed: %s messages", len(results))
         
         return jsonify({
-            "response": bot_response,
-            "category": category,
+            "results": results,
+            "count": len(results),
             "success": True
         }), 200
     
-    except json.JSONDecodeError:
-        logger.error("Invalid JSON in request")
-        return jsonify({"error": "Format JSON tidak valid"}), 400
     except Exception as e:
-        logger.error(f"Error in chat endpoint: {str(e)}", exc_info=True)
+        logger.error(f"Error in chat batch endpoint: {str(e)}", exc_info=True)
         return jsonify({"error": "Maaf, terjadi kesalahan server."}), 500
 
-@app.route("/history", methods=["GET"])
-@rate_limit(max_requests=30, time_window=60)
+@bp.route("/history", methods=["GET"])
+@rate_limit()
+@admission_control()
 def get_history():
-    """Endpoint untuk mendapatkan history percakapan"""
+    """
+    Endpoint untuk mendapatkan history percakapan (per halaman).
+    Query: limit, before=<id> (halaman lebih lama), since=<id> (giliran baru saja).
+    Mendukung If-None-Match: 304 jika history session tidak berubah.
+    """
     try:
         session_id = session.get('session_id')
         
-        if not session_id or session_id not in conversation_history:
+        if not session_id:
             logger.warning(f"History requested for invalid session: {session_id}")
             return jsonify({"history": []}), 200
         
-        logger.debug(f"[{session_id}] History retrieved: {len(conversation_history[session_id])} items")
-        return jsonify({"history": conversation_history[session_id]}), 200
+        query, error = parse_history_query(request.args)
+        if error:
+            return jsonify(error), 400
+        
+        etag = history_etag(*history_store.head(session_id))
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            payload, etag = history_payload(session_id, query)
+            logger.debug("[%s] History retrieved: %s items", session_id, len(payload["history"]))
+            response = jsonify(payload)
+        response.set_etag(etag, weak=True)
+        response.headers["Cache-Control"] = "private, no-cache"
+        response.vary.add("Cookie")
+        return response
     
     except Exception as e:
         logger.error(f"Error getting history: {str(e)}")
         return jsonify({"error": "Gagal mengambil history"}), 500
 
-@app.route("/clear", methods=["POST"])
-@rate_limit(max_requests=30, time_window=60)
+@bp.route("/clear", methods=["POST"])
+@rate_limit()
+@admission_control()
 def clear_history():
     """Endpoint untuk clear history percakapan"""
     try:
         session_id = session.get('session_id')
         
-        if session_id in conversation_history:
-            conversation_history[session_id] = []
-            logger.info(f"[{session_id}] Conversation history cleared")
+        if session_id:
+            history_store.clear(session_id)
+            request_logger.info("[%s] Conversation history cleared", session_id)
         
         return jsonify({"success": True}), 200
     
@@ -179,46 +608,105 @@ def clear_history():
         logger.error(f"Error clearing history: {str(e)}")
         return jsonify({"error": "Gagal menghapus history"}), 500
 
-@app.route("/health", methods=["GET"])
+@bp.route("/health", methods=["GET"])
 def health_check():
     """Health check endpoint"""
     try:
-        return jsonify({
-            "status": "healthy",
-            "timestamp": datetime.now().isoformat(),
-            "active_sessions": len(conversation_history)
-        }), 200
+        return jsonify(health_payload()), 200
     except Exception as e:
         logger.error(f"Error in health check: {str(e)}")
         return jsonify({"status": "unhealthy"}), 500
 
-@app.errorhandler(400)
+@bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Metrics dalam format teks Prometheus (request, latency per tahap, cache, store, proses)"""
+    if not METRICS_ENABLED:
+        return jsonify({"error": "Endpoint tidak ditemukan"}), 404
+    try:
+        return Response(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+    except Exception as e:
+        logger.error(f"Error rendering metrics: {str(e)}")
+        return jsonify({"error": "Gagal mengambil metrics"}), 500
+
+@bp.route("/admin/reload-kb", methods=["POST"])
+def reload_knowledge_base():
+    """Reload knowledge base tanpa restart (butuh header X-Admin-Token = ADMIN_TOKEN)"""
+    try:
+        token = request.headers.get("X-Admin-Token", "")
+        if not ADMIN_TOKEN or not hmac.compare_digest(token, ADMIN_TOKEN):
+            logger.warning(f"Unauthorized KB reload from {request.remote_addr}")
+            return jsonify({"error": "Tidak diizinkan"}), 403
+        
+        success = load_knowledge_base()
+        logger.info(f"Knowledge base reload via admin endpoint: {success}")
+        return jsonify({"success": success, "knowledge_base": kb_info()}), 200 if success else 500
+    
+    except Exception as e:
+        logger.error(f"Error reloading knowledge base: {str(e)}")
+        return jsonify({"error": "Gagal reload knowledge base"}), 500
+
+@bp.app_errorhandler(400)
 def bad_request(e):
     logger.warning(f"400 Bad Request: {str(e)}")
     return jsonify({"error": "Bad Request"}), 400
 
-@app.errorhandler(404)
+@bp.app_errorhandler(404)
 def not_found(e):
     logger.warning(f"404 Not Found: {request.path}")
     return jsonify({"error": "Endpoint tidak ditemukan"}), 404
 
-@app.errorhandler(429)
+@bp.app_errorhandler(429)
 def rate_limit_exceeded(e):
     logger.warning(f"429 Rate Limit Exceeded: {request.remote_addr}")
     return jsonify({"error": "Terlalu banyak permintaan"}), 429
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def server_error(e):
     logger.error(f"500 Internal Server Error: {str(e)}")
     return jsonify({"error": "Terjadi kesalahan server"}), 500
 
-@app.errorhandler(Exception)
+@bp.app_errorhandler(Exception)
 def handle_exception(e):
     logger.error(f"Unhandled exception: {str(e)}", exc_info=True)
     return jsonify({"error": "Terjadi kesalahan yang tidak terduga"}), 500
 
+def create_app(config=None):
+    """
+    App factory. config: dict yang menimpa app.config (misal {"TESTING": True}).
+    Import berat (rapidfuzz, numpy) dan kompilasi KB ditunda sampai request pertama.
+    Dengan KB_PRELOAD, KB di-load di sini lalu gc.freeze(), sehingga worker hasil
+    fork (gunicorn --preload) berbagi memori KB dengan proses induk (copy-on-write).
+    """
+    setup_logging()
+    flask_app = Flask(__name__)
+    flask_app.json = CompactJSONProvider(flask_app)
+    flask_app.secret_key = SECRET_KEY
+    flask_app.permanent_session_lifetime = SESSION_LIFETIME
+    flask_app.config["KB_PRELOAD"] = KB_PRELOAD
+    flask_app.config["SEND_FILE_MAX_AGE_DEFAULT"] = STATIC_MAX_AGE
+    if config:
+        flask_app.config.update(config)
+    flask_app.register_blueprint(bp)
+    init_process()
+    
+    if flask_app.config["KB_PRELOAD"]:
+        ensure_knowledge_base()
+        # Objek yang sudah ada tidak lagi dipindai GC, jadi page memori KB tidak
+        # ditulis ulang (dan disalin) oleh collector di setiap worker
+        gc.freeze()
+    return flask_app
+
+def __getattr__(name):
+    """`app` dibuat saat pertama diakses: `from app import app`, gunicorn app:app"""
+    global app
+    if name == "app":
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 if __name__ == "__main__":
     try:
+        app = create_app()
         logger.info("Starting Flask application...")
         app.run(
             debug=DEBUG,
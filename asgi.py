@@ -0,0 +1,513 @@
+"""
+ASGI entry point untuk production.
+
+Route /chat, /chat/stream, /history, /clear dan /health dilayani handler async
+native (satu event loop, tanpa thread per koneksi); route lain (/ dan static)
+diteruskan ke app Flask lewat asgiref WsgiToAsgi. Session cookie memakai
+serializer Flask yang sama sehingga kedua jalur saling kompatibel.
+
+Menjalankan:
+    python asgi.py
+
+atau langsung dengan uvicorn:
+    uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 4 \\
+        --limit-concurrency 10000 --backlog 4096 --timeout-keep-alive 30
+
+atau gunicorn dengan worker uvicorn:
+    gunicorn asgi:application -k uvicorn.workers.UvicornWorker -w 4 \\
+        --worker-connections 10000 --keep-alive 30
+
+Konfigurasi (config.py / environment):
+- ASGI_WORKERS: jumlah proses, idealnya sama dengan jumlah core. Dengan lebih
+  dari satu worker gunakan HISTORY_BACKEND dan RATE_LIMIT_BACKEND sqlite/redis
+  agar history dan limit dibagi antar worker.
+- ASGI_LIMIT_CONCURRENCY: batas koneksi/task bersamaan per worker sebelum 503.
+- ASGI_BACKLOG: panjang antrian koneksi TCP yang belum di-accept.
+- ASGI_KEEPALIVE: detik koneksi keep-alive idle dipertahankan.
+- ASGI_BLOCKING_THREADS: ukuran thread pool untuk I/O store sqlite/redis dan
+  menunggu matcher pool (MATCHER_POOL_WORKERS); backend memory dipanggil
+  langsung di event loop.
+- ADMISSION_*: admission control per worker untuk route chat/history (lihat
+  admission.py); request yang menunggu slot tidak menahan event loop.
+"""
+import asyncio
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qsl
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.http import dump_cookie, parse_etags
+import app as chatbot
+from app import (
+    create_app, chat_message, validate_chat_message, answer_chat, load_context, health_payload,
+    parse_history_query, history_etag, history_payload, chat_events
+)
+import analytics
+import sse
+import utils
+from compression import choose_encoding, compress
+from logger_config import logger, request_logger, start_queue_logging, stop_queue_logging
+from metrics import REQUESTS, REQUEST_LATENCY, STAGE_LATENCY
+from config import (
+    RATE_LIMIT_ENABLED, MAX_REQUESTS_PER_MINUTE, ADMISSION_ENABLED, METRICS_ENABLED, SSE_HEARTBEAT_INTERVAL, ASGI_HOST, ASGI_PORT, ASGI_WORKERS,
+    ASGI_LIMIT_CONCURRENCY, ASGI_BACKLOG, ASGI_KEEPALIVE, ASGI_BLOCKING_THREADS, COMPRESSION_ENABLED, COMPRESSION_MIN_SIZE
+)
+
+MAX_BODY_SIZE = 64 * 1024
+
+app = create_app()
+flask_app = WsgiToAsgi(app)
+_executor = ThreadPoolExecutor(max_workers=ASGI_BLOCKING_THREADS, thread_name_prefix="asgi-io")
+_session_serializer = app.session_interface.get_signing_serializer(app)
+
+
+async def run_in_thread(func, *args):
+    """Jalankan fungsi blocking di thread pool agar event loop tidak tertahan"""
+    return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+
+
+async def run_blocking(backend, func, *args):
+    """Jalankan operasi backend di thread pool jika backend melakukan I/O (sqlite/redis)"""
+    if not getattr(backend, "blocking", False):
+        return func(*args)
+    return await run_in_thread(func, *args)
+
+
+class Request:
+    """Request HTTP minimal di atas scope ASGI"""
+
+    def __init__(self, scope, receive):
+        self.scope = scope
+        self.receive = receive
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.headers = {
+            key.decode("latin-1").lower(): value.decode("latin-1")
+            for key, value in scope.get("headers", [])
+        }
+        self.session = self._load_session()
+        self.session_modified = False
+        self._body = None
+
+    @property
+    def query(self):
+        """Query string sebagai dict (nilai pertama per key)"""
+        params = {}
+        for key, value in parse_qsl(self.scope.get("query_string", b"").decode("latin-1")):
+            params.setdefault(key, value)
+        return params
+
+    @property
+    def client_ip(self):
+        client = self.scope.get("client")
+        return client[0] if client else None
+
+    @property
+    def is_json(self):
+        content_type = self.headers.get("content-type", "").split(";")[0].strip().lower()
+        return content_type == "application/json" or content_type.endswith("+json")
+
+    async def body(self):
+        """Baca seluruh body request (sekali, lalu dipakai ulang), ValueError jika melebihi MAX_BODY_SIZE"""
+        if self._body is not None:
+            return self._body
+        chunks = []
+        size = 0
+        while True:
+            message = await self.receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY_SIZE:
+                raise ValueError("Request body terlalu besar")
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        self._body = b"".join(chunks)
+        return self._body
+
+    def _load_session(self):
+        """Baca session cookie Flask (signed), dict kosong jika tidak ada/invalid/expired"""
+        raw = self.headers.get("cookie")
+        if not raw or _session_serializer is None:
+            return {}
+        cookie = SimpleCookie()
+        try:
+            cookie.load(raw)
+        except Exception:
+            return {}
+        morsel = cookie.get(app.config["SESSION_COOKIE_NAME"])
+        if morsel is None:
+            return {}
+        try:
+            max_age = int(app.permanent_session_lifetime.total_seconds())
+            return dict(_session_serializer.loads(morsel.value, max_age=max_age))
+        except Exception:
+            return {}
+
+    def get_or_create_session_id(self):
+        """Sama seperti app.get_or_create_session_id: session dibuat saat dibutuhkan saja"""
+        session_id = self.session.get("session_id")
+        if not session_id:
+            session_id = self.session["session_id"] = str(uuid.uuid4())
+            self.session["_permanent"] = True
+            request_logger.info("New session created: %s", session_id)
+        self.session_modified = True
+        return session_id
+
+    def session_cookie_header(self):
+        """Header Set-Cookie untuk session, None jika session tidak berubah"""
+        if not self.session_modified:
+            return None
+        expires = datetime.now(timezone.utc) + app.permanent_session_lifetime
+        value = dump_cookie(
+            app.config["SESSION_COOKIE_NAME"],
+            _session_serializer.dumps(self.session),
+            expires=expires,
+            path=app.config["SESSION_COOKIE_PATH"] or "/",
+            domain=app.config["SESSION_COOKIE_DOMAIN"],
+            secure=app.config["SESSION_COOKIE_SECURE"],
+            httponly=app.config["SESSION_COOKIE_HTTPONLY"],
+            samesite=app.config["SESSION_COOKIE_SAMESITE"]
+        )
+        return (b"set-cookie", value.encode("latin-1"))
+
+
+async def send_json(send, payload, status=200, headers=(), accept_encoding=None):
+    """
+    Kirim response JSON (encoder Flask, sama seperti jsonify), dikompres seperti
+    app.compress_response. payload None = tanpa body (304)
+    """
+    if payload is None:
+        body = b""
+        content_headers = []
+    else:
+        body = app.json.dumps(payload).encode("utf-8") + b"\n"
+        content_headers = [(b"content-type", b"application/json")]
+        if COMPRESSION_ENABLED and len(body) >= COMPRESSION_MIN_SIZE and 200 <= status < 300:
+            content_headers.append((b"vary", b"Accept-Encoding"))
+            encoding = choose_encoding(accept_encoding)
+            if encoding is not None:
+                body = compress(body, encoding)
+                content_headers.append((b"content-encoding", encoding.encode("latin-1")))
+        content_headers.append((b"content-length", str(len(body)).encode("latin-1")))
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": content_headers + [header for header in headers if header]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class EventStream:
+    """Body response SSE dari async generator event (dikirim oleh send_stream)"""
+
+    def __init__(self, events):
+        self.events = events
+
+
+async def send_stream(send, receive, stream, headers=()):
+    """Kirim response SSE per event; berhenti (dan membatalkan generator) saat client disconnect"""
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            *[(key.lower().encode("latin-1"), value.encode("latin-1")) for key, value in sse.HEADERS.items()],
+            *[header for header in headers if header]
+        ]
+    })
+
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        disconnected.set()
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        async for chunk in stream.events:
+            if disconnected.is_set():
+                break
+            await send({"type": "http.response.body", "body": chunk.encode("utf-8"), "more_body": True})
+        else:
+            await send({"type": "http.response.body", "body": b""})
+    except OSError:
+        # Server menolak menulis ke koneksi yang sudah ditutup client
+        pass
+    finally:
+        watcher.cancel()
+        await stream.events.aclose()
+
+
+async def check_rate_limit(request):
+    """Versi async dari decorator app.rate_limit. Mengembalikan (payload, status, headers) jika ditolak"""
+    if not RATE_LIMIT_ENABLED:
+        return None
+    try:
+        allowed, retry_after = await run_blocking(
+            chatbot.rate_limiter, chatbot.rate_limiter.hit, request.client_ip, MAX_REQUESTS_PER_MINUTE, 60
+        )
+        if not allowed:
+            logger.warning(f"Rate limit exceeded for IP: {request.client_ip}")
+            return (
+                {"error": "Terlalu banyak permintaan. Coba lagi nanti."}, 429,
+                [(b"retry-after", str(retry_after).encode("latin-1"))]
+            )
+    except Exception as e:
+        logger.error(f"Error dalam rate_limit: {str(e)}")
+    return None
+
+
+async def cached_chat(request):
+    """Prioritas /chat dan /chat/stream: jawaban sudah ada di RESPONSE_CACHE (lihat app.cached_chat_request)"""
+    try:
+        data = json.loads(await request.body())
+    except ValueError:
+        return False
+    message = data.get("message") if isinstance(data, dict) else None
+    if not isinstance(message, str):
+        return False
+    return utils.is_cached(message.strip())
+
+
+async def check_admission(request, priority=None):
+    """
+    Versi async dari decorator app.admission_control. Mengembalikan (admitted, rejected):
+    admitted True jika request memegang slot (wajib dilepas setelah response dikirim),
+    rejected (payload, status, headers) jika ditolak; request prioritas (False, None).
+    """
+    try:
+        if priority is not None and await priority(request):
+            return False, None
+    except Exception as e:
+        logger.error(f"Error dalam admission_control: {str(e)}")
+    if await chatbot.admission.acquire_async():
+        return True, None
+    payload, status, retry_after = chatbot.overloaded()
+    logger.warning(f"Request shed (503) untuk {request.path}: {chatbot.admission.stats()}")
+    return False, (payload, status, [(b"retry-after", str(retry_after).encode("latin-1"))])
+
+
+async def chat(request):
+    """Endpoint async untuk chat dengan bot"""
+    try:
+        if not request.is_json:
+            logger.warning("Invalid content type in chat request")
+            return {"error": "Content-Type harus application/json"}, 400
+
+        try:
+            data = json.loads(await request.body())
+        except ValueError:
+            logger.error("Invalid JSON in request")
+            return {"error": "Format JSON tidak valid"}, 400
+
+        user_msg, error = chat_message(data)
+        if error:
+            return error
+        session_id = request.get_or_create_session_id()
+
+        error = validate_chat_message(session_id, user_msg)
+        if error:
+            return error
+
+        context = await run_blocking(chatbot.history_store, load_context, session_id)
+        # Matching, logging, dan flush batch analytics selalu di thread pool, bukan di event loop
+        payload, conversation_record, context = await run_in_thread(answer_chat, session_id, user_msg, context)
+        start = time.perf_counter()
+        await run_blocking(
+            chatbot.history_store, chatbot.history_store.append, session_id, conversation_record, context
+        )
+        STAGE_LATENCY.observe(time.perf_counter() - start, "history_append")
+        return payload, 200
+
+    except Exception as e:
+        logger.error(f"Error in chat endpoint: {str(e)}", exc_info=True)
+        return {"error": "Maaf, terjadi kesalahan server."}, 500
+
+
+async def chat_stream(request):
+    """Endpoint async /chat/stream (Server-Sent Events), lihat app.chat_stream"""
+    try:
+        if not request.is_json:
+            logger.warning("Invalid content type in chat stream request")
+            return {"error": "Content-Type harus application/json"}, 400
+
+        try:
+            data = json.loads(await request.body())
+        except ValueError:
+            logger.error("Invalid JSON in request")
+            return {"error": "Format JSON tidak valid"}, 400
+
+        user_msg, error = chat_message(data)
+        if error:
+            return error
+        session_id = request.get_or_create_session_id()
+
+        error = validate_chat_message(session_id, user_msg)
+        if error:
+            return error
+
+        context = await run_blocking(chatbot.history_store, load_context, session_id)
+        events = sse.awith_heartbeat(chat_events(session_id, user_msg, context), SSE_HEARTBEAT_INTERVAL)
+        return EventStream(events), 200
+
+    except Exception as e:
+        logger.error(f"Error in chat stream endpoint: {str(e)}", exc_info=True)
+        return {"error": "Maaf, terjadi kesalahan server."}, 500
+
+
+async def get_history(request):
+    """Endpoint async untuk history percakapan per halaman (limit/before/since, ETag/304)"""
+    try:
+        session_id = request.session.get("session_id")
+        if not session_id:
+            logger.warning(f"History requested for invalid session: {session_id}")
+            return {"history": []}, 200
+
+        query, error = parse_history_query(request.query)
+        if error:
+            return error, 400
+
+        head = await run_blocking(chatbot.history_store, chatbot.history_store.head, session_id)
+        etag = history_etag(*head)
+        if parse_etags(request.headers.get("if-none-match")).contains_weak(etag):
+            payload, status = None, 304
+        else:
+            payload, etag = await run_blocking(chatbot.history_store, history_payload, session_id, query)
+            logger.debug("[%s] History retrieved: %s items", session_id, len(payload["history"]))
+            status = 200
+        headers = [
+            (b"etag", f'W/"{etag}"'.encode("latin-1")),
+            (b"cache-control", b"private, no-cache"),
+            (b"vary", b"Cookie")
+        ]
+        return payload, status, headers
+    except Exception as e:
+        logger.error(f"Error getting history: {str(e)}")
+        return {"error": "Gagal mengambil history"}, 500
+
+
+async def clear_history(request):
+    """Endpoint async untuk clear history percakapan"""
+    try:
+        session_id = request.session.get("session_id")
+        if session_id:
+            await run_blocking(chatbot.history_store, chatbot.history_store.clear, session_id)
+            request_logger.info("[%s] Conversation history cleared", session_id)
+        return {"success": True}, 200
+    except Exception as e:
+        logger.error(f"Error clearing history: {str(e)}")
+        return {"error": "Gagal menghapus history"}, 500
+
+
+async def health_check(request):
+    """Health check endpoint async"""
+    try:
+        # Statistik store dan rate limiter bisa membaca sqlite/redis
+        return await run_in_thread(health_payload), 200
+    except Exception as e:
+        logger.error(f"Error in health check: {str(e)}")
+        return {"status": "unhealthy"}, 500
+
+
+# path -> (method, handler, rate limited dan lewat admission control)
+ROUTES = {
+    "/chat": ("POST", chat, True),
+    "/chat/stream": ("POST", chat_stream, True),
+    "/history": ("GET", get_history, True),
+    "/clear": ("POST", clear_history, True),
+    "/health": ("GET", health_check, False),
+}
+# Cek prioritas admission per path: request yang lolos tidak butuh slot
+PRIORITY = {
+    "/chat": cached_chat,
+    "/chat/stream": cached_chat,
+}
+
+
+async def lifespan(receive, send):
+    """Startup: pastikan logging lewat queue. Shutdown: flush store dan analytics, tutup thread pool, stop listener"""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            start_queue_logging(logger)
+            chatbot.init_process()
+            # KB (dan matcher pool) siap sebelum request pertama, tanpa menahan event loop
+            await run_in_thread(utils.current_matcher)
+            logger.info("ASGI application started")
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            try:
+                chatbot.history_store.close()
+            except Exception as e:
+                logger.error(f"Error closing history store: {str(e)}")
+            analytics.close()
+            _executor.shutdown(wait=False)
+            stop_queue_logging()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    """Aplikasi ASGI: route chat async native, sisanya diteruskan ke Flask"""
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+
+    route = ROUTES.get(scope.get("path")) if scope["type"] == "http" else None
+    if route is None or route[0] != scope["method"]:
+        await flask_app(scope, receive, send)
+        return
+
+    method, handler, limited = route
+    start = time.perf_counter()
+    chatbot.init_process()
+    request = Request(scope, receive)
+    rejected = await check_rate_limit(request) if limited else None
+    admitted = False
+    if rejected is None and limited and ADMISSION_ENABLED:
+        admitted, rejected = await check_admission(request, PRIORITY.get(request.path))
+    admitted_at = time.perf_counter()
+    payload = None
+    try:
+        if rejected:
+            payload, status, headers = rejected
+        else:
+            payload, status, *extra = await handler(request)
+            headers = list(extra[0]) if extra else []
+        headers.append(request.session_cookie_header())
+        if isinstance(payload, EventStream):
+            await send_stream(send, receive, payload, headers)
+        else:
+            await send_json(send, payload, status, headers, request.headers.get("accept-encoding"))
+    finally:
+        if admitted:
+            # Stream: durasinya bergantung client, tidak dipakai menyesuaikan limit
+            chatbot.admission.release(
+                None if isinstance(payload, EventStream) else time.perf_counter() - admitted_at
+            )
+    if METRICS_ENABLED:
+        REQUEST_LATENCY.observe(time.perf_counter() - start, request.path, method)
+        REQUESTS.inc(request.path, method, str(status))
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    logger.info("Starting ASGI application...")
+    uvicorn.run(
+        "asgi:application",
+        host=ASGI_HOST,
+        port=ASGI_PORT,
+        workers=ASGI_WORKERS,
+        limit_concurrency=ASGI_LIMIT_CONCURRENCY,
+        backlog=ASGI_BACKLOG,
+        timeout_keep_alive=ASGI_KEEPALIVE,
+        log_level="warning"
+    )
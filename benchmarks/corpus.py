@@ -0,0 +1,75 @@
+"""
+Korpus query sintetis (bahasa Indonesia) untuk benchmark matching dan /chat.
+Dibangkitkan dengan seed tetap sehingga setiap run memakai query yang sama.
+"""
+import random
+
+SHORT = [
+    "jam buka", "aturan lab", "spek pc", "jadwal", "sanksi", "software", "lab", "pc",
+    "jam", "tutup", "hari kerja", "peraturan", "mysql", "hardware", "syarat masuk"
+]
+
+GREETING = [
+    "halo", "hai", "hallo", "hai kak", "selamat pagi", "selamat siang", "assalamualaikum",
+    "terima kasih", "makasih", "oke", "ok", "ok sip", "terima kasih banyak"
+]
+
+UNMATCHED = [
+    "xyz", "abc", "q", "apa kabar", "siapa kamu", "ruang lab dimana", "tdk tau",
+    "cuaca hari ini", "berita terbaru", "harga laptop murah", "resep nasi goreng"
+]
+
+WORDS = [
+    "jadwal", "buka", "tutup", "aturan", "sanksi", "pc", "lab", "apa", "berapa", "saja",
+    "kapan", "dimana", "komputer", "software", "mysql", "hari", "kerja", "jam", "boleh",
+    "tidak", "ya", "kak", "dong", "mau", "tanya", "spesifikasi", "sistem", "hardware",
+    "istirahat", "dilarang", "syarat", "peraturan", "makan", "minum", "ram", "processor"
+]
+
+FILLERS = ["saya", "mau", "tanya", "dong", "kak", "tolong", "info", "nya", "ya", "untuk", "besok"]
+
+
+def typo(word, rng):
+    """Satu kesalahan ketik acak: hapus, ganti, atau sisipkan huruf"""
+    if len(word) < 3:
+        return word
+    i = rng.randrange(len(word))
+    op = rng.choice("dsi")
+    if op == "d":
+        return word[:i] + word[i + 1:]
+    if op == "s":
+        return word[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + word[i + 1:]
+    return word[:i] + rng.choice("aeiou") + word[i:]
+
+
+def long_query(rng):
+    words = rng.sample(FILLERS, 4) + rng.sample(WORDS, rng.randint(3, 6))
+    rng.shuffle(words)
+    return " ".join(words) + rng.choice(["", "?", " ya?"])
+
+
+def build_corpus(size=500, seed=7):
+    """
+    Kembalikan dict jenis query -> list query: short, long, greeting, typo, unmatched.
+    Setiap jenis berisi `size` query.
+    """
+    rng = random.Random(seed)
+    corpus = {
+        "short": [rng.choice(SHORT) for _ in range(size)],
+        "long": [long_query(rng) for _ in range(size)],
+        "greeting": [rng.choice(GREETING) for _ in range(size)],
+        "typo": [
+            " ".join(typo(w, rng) for w in rng.choice(SHORT + GREETING).split())
+            for _ in range(size)
+        ],
+        "unmatched": [rng.choice(UNMATCHED) for _ in range(size)],
+    }
+    return corpus
+
+
+def mixed(corpus, seed=7):
+    """Gabungan semua jenis query dalam urutan acak (untuk benchmark end-to-end)"""
+    rng = random.Random(seed)
+    queries = [q for items in corpus.values() for q in items]
+    rng.shuffle(queries)
+    return queries
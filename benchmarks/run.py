@@ -0,0 +1,369 @@
+"""
+Benchmark matching dan jalur HTTP chatbot.
+
+Menjalankan (dari root repo):
+    python benchmarks/run.py                         # semua benchmark
+    python benchmarks/run.py --only match,chat       # sebagian saja
+    python benchmarks/run.py --baseline benchmarks/results/baseline.json
+    python benchmarks/run.py --url http://127.0.0.1:5000 --concurrency 32
+
+Benchmark:
+- match:  micro-benchmark match_category per jenis query (short, long, greeting,
+          typo, unmatched), tanpa cache respons.
+- chat:   /chat end-to-end lewat Flask test client, satu per satu.
+- load:   /chat dengan beberapa thread bersamaan (test client, atau server yang
+          sedang berjalan jika --url diberikan).
+- memory: pertumbuhan memory history store dan rate limiter untuk banyak
+          session/IP simulasi (tracemalloc).
+
+Hasil disimpan sebagai JSON (default benchmarks/results/<timestamp>.json). Dengan
+--baseline, metrik dibandingkan dan exit code 1 jika ada regresi > --threshold.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+# Benchmark mengukur biaya handler: rate limit, KB watcher, log INFO dan event
+# analytics dimatikan kecuali di-set eksplisit lewat environment
+os.environ.setdefault("RATE_LIMIT", "False")
+os.environ.setdefault("ANALYTICS", "False")
+os.environ.setdefault("KB_WATCH_INTERVAL", "0")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("FLASK_DEBUG", "False")
+
+import argparse
+import gc
+import http.client
+import json
+import platform
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from corpus import build_corpus, mixed
+
+BENCHMARKS = ("match", "chat", "load", "memory")
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+
+def percentile(sorted_values, pct):
+    """Persentil nearest-rank dari list yang sudah terurut"""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[k]
+
+
+def summarize(durations, elapsed=None):
+    """Ringkasan latency (mikrodetik) dan throughput dari list durasi dalam detik"""
+    values = sorted(d * 1e6 for d in durations)
+    total = elapsed if elapsed is not None else sum(durations)
+    return {
+        "count": len(values),
+        "mean_us": round(sum(values) / len(values), 2) if values else 0.0,
+        "p50_us": round(percentile(values, 50), 2),
+        "p95_us": round(percentile(values, 95), 2),
+        "p99_us": round(percentile(values, 99), 2),
+        "max_us": round(values[-1], 2) if values else 0.0,
+        "ops_per_sec": round(len(values) / total, 1) if total else 0.0,
+    }
+
+
+def timed(func, items, repeat=1):
+    durations = []
+    clock = time.perf_counter
+    for _ in range(repeat):
+        for item in items:
+            start = clock()
+            func(item)
+            durations.append(clock() - start)
+    return durations
+
+
+def bench_match(corpus, repeat):
+    """match_category per jenis query (langsung ke matcher, tanpa RESPONSE_CACHE)"""
+    import utils
+
+    results = {}
+    for kind, queries in corpus.items():
+        timed(utils.match_category, queries[:50])  # warm-up
+        results[kind] = summarize(timed(utils.match_category, queries, repeat))
+
+    queries = mixed(corpus)
+    start = time.perf_counter()
+    utils.ensure_knowledge_base().matcher.match_many(queries)
+    elapsed = time.perf_counter() - start
+    results["batch"] = {
+        "count": len(queries),
+        "total_ms": round(elapsed * 1000, 2),
+        "ops_per_sec": round(len(queries) / elapsed, 1) if elapsed else 0.0,
+    }
+    return results
+
+
+def _chat_client():
+    from app import app
+    return app.test_client()
+
+
+def _post_chat(client, message):
+    response = client.post("/chat", json={"message": message})
+    if response.status_code != 200:
+        raise RuntimeError(f"/chat status {response.status_code}: {response.get_data(as_text=True)}")
+
+
+def bench_chat(corpus, repeat):
+    """/chat end-to-end lewat test client, cache respons dingin vs hangat"""
+    from utils import RESPONSE_CACHE
+
+    client = _chat_client()
+    queries = mixed(corpus)
+
+    RESPONSE_CACHE.clear()
+    start = time.perf_counter()
+    cold = timed(lambda q: _post_chat(client, q), queries)
+    cold_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    warm = timed(lambda q: _post_chat(client, q), queries, repeat)
+    warm_elapsed = time.perf_counter() - start
+
+    return {
+        "cold_cache": summarize(cold, cold_elapsed),
+        "warm_cache": summarize(warm, warm_elapsed),
+    }
+
+
+def _url_worker(url, queries):
+    """Kirim query ke server yang berjalan lewat satu koneksi keep-alive"""
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    durations = []
+    errors = 0
+    cookie = None
+    for query in queries:
+        body = json.dumps({"message": query})
+        headers = {"Content-Type": "application/json"}
+        if cookie:
+            headers["Cookie"] = cookie
+        start = time.perf_counter()
+        try:
+            conn.request("POST", "/chat", body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+            cookie = cookie or (response.getheader("Set-Cookie") or "").split(";")[0] or None
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+        durations.append(time.perf_counter() - start)
+    conn.close()
+    return durations, errors
+
+
+def _client_worker(queries):
+    client = _chat_client()
+    durations = []
+    errors = 0
+    for query in queries:
+        start = time.perf_counter()
+        response = client.post("/chat", json={"message": query})
+        durations.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors += 1
+    return durations, errors
+
+
+def bench_load(corpus, concurrency, requests_per_worker, url=None):
+    """/chat dengan `concurrency` worker bersamaan, masing-masing satu session"""
+    queries = mixed(corpus)
+    batches = [
+        [queries[(w * requests_per_worker + i) % len(queries)] for i in range(requests_per_worker)]
+        for w in range(concurrency)
+    ]
+    if url is None:
+        _chat_client()  # import app sebelum thread mulai
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if url:
+            outcomes = list(pool.map(lambda batch: _url_worker(url, batch), batches))
+        else:
+            outcomes = list(pool.map(_client_worker, batches))
+    elapsed = time.perf_counter() - start
+
+    durations = [d for worker_durations, _ in outcomes for d in worker_durations]
+    result = summarize(durations, elapsed)
+    result.update({
+        "target": url or "test_client",
+        "concurrency": concurrency,
+        "errors": sum(errors for _, errors in outcomes),
+    })
+    return result
+
+
+def _traced(step, total, checkpoints, sample):
+    """Jalankan step(i) sebanyak total kali, catat memory tracemalloc di setiap checkpoint"""
+    every = max(1, total // checkpoints)
+    gc.collect()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    growth = []
+    for i in range(total):
+        step(i)
+        if (i + 1) % every == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            growth.append({"n": i + 1, "kib": round((current - base) / 1024, 1), **sample()})
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"samples": growth, "peak_kib": round((peak - base) / 1024, 1)}
+
+
+def bench_memory(sessions, messages_per_session, checkpoints=10):
+    """
+    Pertumbuhan memory history store (pengganti conversation_history) dan rate limiter
+    (pengganti request_count per IP) untuk session/IP simulasi yang terus bertambah.
+    """
+    from history_store import MemoryHistoryStore, HistoryRecord
+    from rate_limiter import MemoryRateLimiter
+
+    bot = "Lab buka Senin - Sabtu pukul 07:00 - 18:00 (istirahat 12:00 - 13:00)."
+    store = MemoryHistoryStore()
+
+    def add_session(i):
+        session_id = f"bench-{i}"
+        for n in range(messages_per_session):
+            # Teks user unik per pesan, teks bot sama seperti respons KB sungguhan
+            store.append(session_id, HistoryRecord(f"jam berapa lab buka {i}-{n}?", "".join(bot), "jadwal"))
+
+    history = _traced(add_session, sessions, checkpoints, lambda: {
+        "sessions": store.count(), "records": store.total_records
+    })
+    history.update({
+        "max_sessions": store.max_sessions,
+        "max_records": store.max_records,
+        "messages_per_session": messages_per_session,
+    })
+
+    limiter = MemoryRateLimiter()
+    limiter_result = _traced(
+        lambda i: limiter.hit(f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", 30, 60),
+        sessions, checkpoints, lambda: {"clients": len(limiter)}
+    )
+    limiter_result["max_clients"] = limiter.max_clients
+
+    return {"history_store": history, "rate_limiter": limiter_result}
+
+
+def flatten(results, prefix=""):
+    """Ratakan hasil menjadi {'match.short.p50_us': nilai, ...} untuk perbandingan"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(results, baseline, threshold):
+    """
+    Bandingkan metrik latency (*_us, *_ms, lebih kecil lebih baik), throughput
+    (ops_per_sec) dan peak memory dengan baseline. max_us tidak dibandingkan
+    karena terlalu dipengaruhi noise. Mengembalikan list regresi.
+    """
+    current = flatten(results["benchmarks"])
+    previous = flatten(baseline.get("benchmarks", {}))
+    regressions = []
+    print(f"\n{'metric':<45} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name in sorted(current.keys() & previous.keys()):
+        if name.endswith("max_us"):
+            continue
+        lower_is_better = name.endswith(("_us", "_ms", "peak_kib"))
+        if not lower_is_better and not name.endswith("ops_per_sec"):
+            continue
+        old, new = previous[name], current[name]
+        if not old:
+            continue
+        change = (new - old) / old
+        worse = change > threshold if lower_is_better else change < -threshold
+        if worse:
+            regressions.append(name)
+        flag = "  REGRESI" if worse else ""
+        print(f"{name:<45} {old:>12} {new:>12} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark chatbot matching dan /chat")
+    parser.add_argument("--only", default=",".join(BENCHMARKS),
+                        help=f"benchmark yang dijalankan, dipisah koma ({', '.join(BENCHMARKS)})")
+    parser.add_argument("--size", type=int, default=500, help="jumlah query per jenis di korpus")
+    parser.add_argument("--repeat", type=int, default=3, help="pengulangan korpus untuk match/chat")
+    parser.add_argument("--concurrency", type=int, default=8, help="worker bersamaan untuk load")
+    parser.add_argument("--requests", type=int, default=250, help="request per worker untuk load")
+    parser.add_argument("--url", help="target server yang berjalan untuk load (default test client)")
+    parser.add_argument("--sessions", type=int, default=20000, help="session/IP simulasi untuk memory")
+    parser.add_argument("--messages", type=int, default=5, help="pesan per session untuk memory")
+    parser.add_argument("--output", help="file JSON hasil (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="file JSON hasil sebelumnya untuk dibandingkan")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="perubahan relatif yang dianggap regresi (default 0.10)")
+    args = parser.parse_args(argv)
+
+    selected = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"benchmark tidak dikenal: {', '.join(sorted(unknown))}")
+
+    corpus = build_corpus(args.size)
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": vars(args),
+        "benchmarks": {}
+    }
+
+    for name in selected:
+        print(f"[bench] {name} ...", flush=True)
+        start = time.perf_counter()
+        if name == "match":
+            result = bench_match(corpus, args.repeat)
+        elif name == "chat":
+            result = bench_chat(corpus, args.repeat)
+        elif name == "load":
+            result = bench_load(corpus, args.concurrency, args.requests, args.url)
+        else:
+            result = bench_memory(args.sessions, args.messages)
+        results["benchmarks"][name] = result
+        print(json.dumps(result, indent=2))
+        print(f"[bench] {name} selesai dalam {time.perf_counter() - start:.1f}s", flush=True)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"[bench] hasil disimpan ke {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} metrik regresi melebihi {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
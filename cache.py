@@ -0,0 +1,105 @@
+"""
+Cache respons in-memory dengan batas ukuran (LRU) dan TTL
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    Cache LRU + TTL untuk hasil match_category/generate_response.
+    Key adalah query yang sudah dinormalisasi, value bebas (misal tuple kategori & respons).
+    """
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        # Naik setiap clear(); set() dengan generation lama diabaikan
+        self.generation = 0
+
+    @staticmethod
+    def normalize_key(text):
+        """Key cache: lowercase + strip, sama dengan normalisasi awal match_category"""
+        return text.lower().strip() if isinstance(text, str) else text
+
+    def get(self, key):
+        """Ambil value dari cache, None jika tidak ada atau sudah expired"""
+        if self.max_size <= 0:
+            return None
+
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if self.ttl and expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key):
+        """Value untuk key tanpa mengubah statistik dan urutan LRU, None jika tidak ada/expired"""
+        if self.max_size <= 0:
+            return None
+        entry = self._data.get(key)
+        if entry is None or (self.ttl and entry[0] < time.monotonic()):
+            return None
+        return entry[1]
+
+    def set(self, key, value, generation=None):
+        """
+        Simpan value ke cache, evict entry paling lama jika penuh.
+        Jika generation diberikan dan cache sudah di-clear sejak itu, value tidak disimpan.
+        """
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Kosongkan cache (dipanggil saat knowledge base di-reload)"""
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+            self.generation += 1
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Statistik cache untuk health check"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
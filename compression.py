@@ -0,0 +1,85 @@
+"""
+Kompresi response dan cache halaman yang sudah dirender.
+
+Encoding dipilih dari header Accept-Encoding: brotli jika paket `brotli` terpasang
+dan diterima client, selain itu gzip. Body di bawah COMPRESSION_MIN_SIZE dikirim
+apa adanya (overhead header kompresi lebih besar dari penghematannya).
+"""
+import gzip
+import hashlib
+import threading
+from config import COMPRESSION_ENABLED, COMPRESSION_MIN_SIZE, COMPRESSION_LEVEL, BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Urutan preferensi encoding server
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def parse_accept_encoding(header):
+    """'gzip, br;q=0.5' -> {'gzip': 1.0, 'br': 0.5}"""
+    codings = {}
+    for item in (header or "").split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[coding] = q
+    return codings
+
+
+def choose_encoding(header):
+    """Encoding yang dipakai untuk client ini, None jika tidak ada yang diterima"""
+    if not COMPRESSION_ENABLED or not header:
+        return None
+    codings = parse_accept_encoding(header)
+    for encoding in ENCODINGS:
+        if codings.get(encoding, codings.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    """Kompres bytes dengan encoding 'br' atau 'gzip'"""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0: hasil sama untuk body yang sama (tidak ada timestamp di header gzip)
+    return gzip.compress(body, compresslevel=COMPRESSION_LEVEL, mtime=0)
+
+
+class CachedPage:
+    """
+    Halaman yang dirender sekali: body asli plus varian terkompresi (dibuat saat
+    pertama diminta) dengan ETag kuat per varian.
+    """
+
+    def __init__(self, body, content_type):
+        self.body = body
+        self.content_type = content_type
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    def variant(self, accept_encoding):
+        """(body, encoding, etag) untuk client dengan Accept-Encoding ini"""
+        encoding = choose_encoding(accept_encoding) if len(self.body) >= COMPRESSION_MIN_SIZE else None
+        if encoding is None:
+            return self.body, None, self.etag
+        body = self._variants.get(encoding)
+        if body is None:
+            with self._lock:
+                body = self._variants.get(encoding)
+                if body is None:
+                    body = self._variants[encoding] = compress(self.body, encoding)
+        return body, encoding, f"{self.etag}-{encoding}"
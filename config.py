@@ -7,19 +7,117 @@ from datetime import timedelta
 # Flask Configuration
 DEBUG = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
 TESTING = os.getenv('FLASK_TESTING', 'False').lower() == 'true'
-SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
+# Key default ini publik: hanya untuk development (lihat juga kb_index.py)
+DEFAULT_SECRET_KEY = 'dev-secret-key-change-in-production'
+SECRET_KEY = os.getenv('SECRET_KEY', DEFAULT_SECRET_KEY)
 SESSION_LIFETIME = timedelta(hours=int(os.getenv('SESSION_LIFETIME', '1')))
 
 # Chatbot Configuration
 MIN_CONFIDENCE_SCORE = int(os.getenv('MIN_CONFIDENCE', '50'))
+# Di atas jumlah keyword ini, fuzzy scoring hanya pada kandidat teratas dari index BM25
+MATCHER_FULL_SCAN_LIMIT = int(os.getenv('MATCHER_FULL_SCAN_LIMIT', '2000'))
+MATCHER_CANDIDATES = int(os.getenv('MATCHER_CANDIDATES', '50'))
+# Koreksi ejaan token input sebelum matching (lihat spelling.py), jarak 0 = nonaktif
+SPELLING_MAX_DISTANCE = int(os.getenv('SPELLING_MAX_DISTANCE', '2'))
+SPELLING_PREFIX_LENGTH = int(os.getenv('SPELLING_PREFIX_LENGTH', '7'))
+SPELLING_MIN_LENGTH = int(os.getenv('SPELLING_MIN_LENGTH', '4'))  # token lebih pendek tidak dikoreksi
+SPELLING_MAX_WORDS = int(os.getenv('SPELLING_MAX_WORDS', '100000'))
+SPELLING_CACHE_SIZE = int(os.getenv('SPELLING_CACHE_SIZE', '10000'))  # token per proses
+# Konteks percakapan untuk pertanyaan lanjutan (lihat conversation.py)
+CONTEXT_ENABLED = os.getenv('CONTEXT_ENABLED', 'True').lower() == 'true'
+CONTEXT_TTL = int(os.getenv('CONTEXT_TTL', '600'))  # detik sejak giliran terakhir, 0 = tanpa batas
+CONTEXT_BIAS = int(os.getenv('CONTEXT_BIAS', '10'))  # poin skor fuzzy untuk kategori sebelumnya
+CONTEXT_MAX_ENTITIES = int(os.getenv('CONTEXT_MAX_ENTITIES', '5'))
+CONTEXT_FOLLOW_UP_MAX_TOKENS = int(os.getenv('CONTEXT_FOLLOW_UP_MAX_TOKENS', '6'))
+# Matching di process pool (lihat match_pool.py), 0 worker = matching di proses request
+MATCHER_POOL_WORKERS = int(os.getenv('MATCHER_POOL_WORKERS', '0'))
+MATCHER_POOL_MAX_PENDING = int(os.getenv('MATCHER_POOL_MAX_PENDING', '0'))  # 0 = 4 x worker
+MATCHER_POOL_CHUNK_SIZE = int(os.getenv('MATCHER_POOL_CHUNK_SIZE', '256'))  # input per task batch
+MATCHER_POOL_TIMEOUT = float(os.getenv('MATCHER_POOL_TIMEOUT', '2'))  # detik sebelum fallback
+MATCHER_POOL_START_METHOD = os.getenv('MATCHER_POOL_START_METHOD', 'fork')
 MAX_INPUT_LENGTH = int(os.getenv('MAX_INPUT_LENGTH', '500'))
 MAX_CONVERSATION_HISTORY = int(os.getenv('MAX_HISTORY', '100'))
+MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', '5000'))
 KB_FILE = os.getenv('KB_FILE', 'knowledge_base.json')
+KB_WATCH_INTERVAL = float(os.getenv('KB_WATCH_INTERVAL', '5'))  # detik, 0 = tanpa file watch
+# Artifact index KB dari `python -m utils build-index`, dipakai jika cocok dengan KB_FILE;
+# kosong = KB selalu dikompilasi dari JSON
+KB_SNAPSHOT = os.getenv('KB_SNAPSHOT', '')
+# Load KB di create_app (bukan saat request pertama), untuk gunicorn --preload
+KB_PRELOAD = os.getenv('KB_PRELOAD', 'False').lower() == 'true'
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')  # kosong = endpoint admin nonaktif
 
 # Logging Configuration
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 LOG_FILE = os.getenv('LOG_FILE', 'chatbot.log')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')  # text | json (JSON lines)
+LOG_QUEUE_ENABLED = os.getenv('LOG_QUEUE', 'True').lower() == 'true'
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+LOG_QUEUE_POLICY = os.getenv('LOG_QUEUE_POLICY', 'drop')  # drop | block saat antrian penuh
+LOG_SAMPLING = os.getenv('LOG_SAMPLING', '')  # contoh: "chatbot.requests=0.1"
+
+# Event analytics per giliran chat (JSON lines, lihat analytics.py)
+ANALYTICS_ENABLED = os.getenv('ANALYTICS', 'True').lower() == 'true'
+ANALYTICS_DIR = os.getenv('ANALYTICS_DIR', 'logs/analytics')
+ANALYTICS_SEGMENT_SIZE = int(os.getenv('ANALYTICS_SEGMENT_SIZE', str(5 * 1024 * 1024)))  # bytes per segmen
+ANALYTICS_BATCH_SIZE = int(os.getenv('ANALYTICS_BATCH_SIZE', '256'))
+ANALYTICS_FLUSH_INTERVAL = float(os.getenv('ANALYTICS_FLUSH_INTERVAL', '1'))  # detik
+ANALYTICS_MAX_PENDING = int(os.getenv('ANALYTICS_MAX_PENDING', '10000'))  # event di buffer sebelum dibuang
 
 # Rate limiting
 RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT', 'True').lower() == 'true'
 MAX_REQUESTS_PER_MINUTE = int(os.getenv('MAX_REQUESTS', '30'))
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')  # memory | sqlite | redis
+RATE_LIMIT_DB_PATH = os.getenv('RATE_LIMIT_DB_PATH', 'ratelimit.db')
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv('RATE_LIMIT_MAX_CLIENTS', '50000'))
+
+# Admission control dan load shedding per proses (lihat admission.py)
+ADMISSION_ENABLED = os.getenv('ADMISSION', 'True').lower() == 'true'
+ADMISSION_MAX_CONCURRENCY = int(os.getenv('ADMISSION_MAX_CONCURRENCY', '64'))  # request diproses bersamaan
+ADMISSION_MIN_CONCURRENCY = int(os.getenv('ADMISSION_MIN_CONCURRENCY', '4'))
+ADMISSION_QUEUE_SIZE = int(os.getenv('ADMISSION_QUEUE_SIZE', '128'))  # request menunggu slot
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '1'))  # detik menunggu sebelum 503
+ADMISSION_TARGET_LATENCY = float(os.getenv('ADMISSION_TARGET_LATENCY', '0.25'))  # detik, p90 latency layanan
+ADMISSION_WINDOW = int(os.getenv('ADMISSION_WINDOW', '50'))  # request selesai per penyesuaian limit
+
+# Streaming /chat/stream (Server-Sent Events)
+SSE_HEARTBEAT_INTERVAL = float(os.getenv('SSE_HEARTBEAT_INTERVAL', '15'))  # detik, 0 = tanpa heartbeat
+SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', '64'))  # thread generator jawaban bersamaan
+SSE_ITEM_TIMEOUT = float(os.getenv('SSE_ITEM_TIMEOUT', '30'))  # detik tanpa item sebelum stream diakhiri, 0 = tanpa batas
+
+# Kompresi response JSON/halaman (gzip, brotli jika paket brotli terpasang)
+COMPRESSION_ENABLED = os.getenv('COMPRESSION', 'True').lower() == 'true'
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '512'))  # bytes
+COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', '6'))  # gzip 1-9
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '4'))  # brotli 0-11
+# Cache-Control max-age untuk file /static (detik). URL asset tidak berversi, jadi
+# dibuat singkat; setelah itu browser revalidasi dengan ETag/Last-Modified (304)
+STATIC_MAX_AGE = int(os.getenv('STATIC_MAX_AGE', '300'))
+
+# Metrics Prometheus di /metrics
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+
+# Response cache
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '1024'))
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '300'))
+
+# History store: memory | sqlite | redis
+HISTORY_BACKEND = os.getenv('HISTORY_BACKEND', 'memory')
+HISTORY_DB_PATH = os.getenv('HISTORY_DB_PATH', 'history.db')
+HISTORY_BATCH_SIZE = int(os.getenv('HISTORY_BATCH_SIZE', '50'))
+HISTORY_FLUSH_INTERVAL = float(os.getenv('HISTORY_FLUSH_INTERVAL', '0.5'))
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+# Session expiry & batas history (memory: saat append, sqlite/redis: setiap cleanup)
+SESSION_CLEANUP_INTERVAL = int(os.getenv('SESSION_CLEANUP_INTERVAL', '60'))
+MAX_SESSIONS = int(os.getenv('MAX_SESSIONS', '10000'))
+MAX_HISTORY_RECORDS = int(os.getenv('MAX_HISTORY_RECORDS', '200000'))
+
+# ASGI serving mode (lihat asgi.py)
+ASGI_HOST = os.getenv('ASGI_HOST', '0.0.0.0')
+ASGI_PORT = int(os.getenv('ASGI_PORT', '5000'))
+ASGI_WORKERS = int(os.getenv('ASGI_WORKERS', '1'))
+ASGI_LIMIT_CONCURRENCY = int(os.getenv('ASGI_LIMIT_CONCURRENCY', '10000'))
+ASGI_BACKLOG = int(os.getenv('ASGI_BACKLOG', '4096'))
+ASGI_KEEPALIVE = int(os.getenv('ASGI_KEEPALIVE', '30'))
+ASGI_BLOCKING_THREADS = int(os.getenv('ASGI_BLOCKING_THREADS', '32'))
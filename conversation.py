@@ -0,0 +1,83 @@
+"""
+Konteks percakapan per session untuk pertanyaan lanjutan.
+
+Setelah giliran yang kategorinya dikenali, session menyimpan state ringkas di
+history store, di samping history-nya: kategori terakhir dan entity (token
+keyword/trigger varian kategori itu yang disebut user). Giliran berikutnya
+membaca state itu dalam O(1), tanpa membaca ulang history, lalu:
+
+- bias: jika input cocok ke beberapa kategori, kategori sebelumnya didahulukan
+  (exact hit seri, atau skor fuzzy-nya ditambah CONTEXT_BIAS poin)
+- follow-up: input pendek yang diawali kata lanjutan ("kalau sanksinya?",
+  "terus yang lain?", "gimana kalau telat?") dan tidak menyebut keyword kategori lain (tidak ada exact
+  hit) dijawab dengan kategori sebelumnya; jika input tidak menyebut entity baru,
+  entity sebelumnya ikut dipakai memilih varian respons
+
+Sapaan dan giliran yang tidak dikenali tidak mengubah konteks.
+"""
+import re
+import time
+from config import CONTEXT_TTL, CONTEXT_MAX_ENTITIES, CONTEXT_FOLLOW_UP_MAX_TOKENS
+
+# Pembuka anaforik di awal pesan ("kalau ...?", "terus ...?", "gimana kalau ...?"); kata
+# umum seperti "yang", "untuk" atau "bagaimana" saja tidak menandai pertanyaan lanjutan
+FOLLOW_UP_PATTERN = re.compile(
+    r"^\W*(?:(?:bagaimana|gimana|gmn)\s+(?:kalau|kalo|dengan|dgn)|kalau|kalo|klo|terus|trus|trs|lalu|lantas)\b"
+)
+_WORD = re.compile(r'\b\w+\b')
+
+
+class ConversationContext:
+    """State percakapan satu session: kategori terakhir, entity, dan waktu giliran terakhir"""
+
+    __slots__ = ("category", "entities", "updated")
+
+    def __init__(self, category, entities=(), updated=None):
+        self.category = category
+        self.entities = tuple(entities)
+        self.updated = time.time() if updated is None else updated
+
+    @classmethod
+    def from_dict(cls, data):
+        """Konteks dari dict store, None jika tidak ada, formatnya tidak valid, atau sudah kedaluwarsa"""
+        if not isinstance(data, dict) or not isinstance(data.get("category"), str):
+            return None
+        try:
+            context = cls(data["category"], [str(x) for x in data.get("entities", ())], float(data["updated"]))
+        except (KeyError, TypeError, ValueError):
+            return None
+        return context if context.is_fresh() else None
+
+    def to_dict(self):
+        return {"category": self.category, "entities": list(self.entities), "updated": self.updated}
+
+    def is_fresh(self, now=None):
+        if CONTEXT_TTL <= 0:
+            return True
+        return (time.time() if now is None else now) - self.updated <= CONTEXT_TTL
+
+
+def is_follow_up(user_input_lower):
+    """Input pendek yang diawali kata lanjutan ("kalau ...", "terus ...")"""
+    return (
+        FOLLOW_UP_PATTERN.match(user_input_lower) is not None
+        and len(_WORD.findall(user_input_lower)) <= CONTEXT_FOLLOW_UP_MAX_TOKENS
+    )
+
+
+def carried_entities(context, category, user_input_lower, entities):
+    """
+    Entity konteks yang dipakai untuk giliran ini: hanya pada follow-up ke kategori
+    yang sama dan jika user tidak menyebut entity baru.
+    """
+    if (context is None or entities or category != context.category
+            or not is_follow_up(user_input_lower)):
+        return ()
+    return context.entities
+
+
+def next_context(context, category, entities):
+    """Konteks setelah giliran ini; sapaan dan giliran tidak dikenali tidak mengubah konteks"""
+    if not category or category == "greeting":
+        return context
+    return ConversationContext(category, list(entities)[:CONTEXT_MAX_ENTITIES])
@@ -0,0 +1,703 @@
+"""
+Penyimpanan history percakapan dengan beberapa backend:
+- memory: dict per-proses (default, untuk development)
+- sqlite: file SQLite mode WAL dengan batched writes
+- redis: server Redis (atau fakeredis untuk lokal), bisa dibagi antar worker/node
+
+Setiap record punya id yang naik terus per session (cursor untuk pagination
+before/since); record dikembalikan sebagai dict {id, user, bot, category, timestamp}.
+Di samping history, setiap session bisa menyimpan satu state konteks percakapan
+(dict kecil, lihat conversation.py) yang ditulis bersama append dan dibaca per giliran.
+"""
+import itertools
+import json
+from abc import ABC, abstractmethod
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from logger_config import logger
+from config import (
+    MAX_CONVERSATION_HISTORY, HISTORY_BACKEND, HISTORY_DB_PATH,
+    HISTORY_BATCH_SIZE, HISTORY_FLUSH_INTERVAL, REDIS_URL, SESSION_LIFETIME,
+    MAX_SESSIONS, MAX_HISTORY_RECORDS
+)
+
+
+def _seconds(value):
+    """Konversi timedelta/angka ke detik (int)"""
+    return int(value.total_seconds()) if hasattr(value, "total_seconds") else int(value)
+
+
+def connect_redis(url=REDIS_URL):
+    """
+    Buat client Redis dari URL; 'fakeredis://' memakai fakeredis in-process.
+    Paket redis/fakeredis opsional (lihat requirements.txt), hanya di-import di sini.
+    """
+    package = "fakeredis" if url.startswith("fakeredis://") else "redis"
+    try:
+        module = __import__(package)
+    except ImportError as e:
+        raise ImportError(
+            f"Backend redis butuh paket '{package}' (pip install {package}), "
+            f"atau pakai backend memory/sqlite"
+        ) from e
+    if package == "fakeredis":
+        return module.FakeRedis()
+    return module.Redis.from_url(url)
+
+
+class HistoryRecord:
+    """
+    Satu giliran percakapan dalam bentuk ringkas (__slots__, waktu sebagai float epoch).
+    Teks bot dan kategori di-intern karena respons yang sama berulang di banyak record.
+    """
+
+    __slots__ = ("id", "user", "bot", "category", "created")
+
+    def __init__(self, user, bot, category, created=None, id=0):
+        self.id = id
+        self.user = user
+        self.bot = sys.intern(bot) if type(bot) is str else bot
+        self.category = sys.intern(category) if type(category) is str else category
+        self.created = time.time() if created is None else created
+
+    @classmethod
+    def from_dict(cls, data, id=0):
+        """Buat record dari dict (format lama dengan timestamp ISO juga diterima)"""
+        created = data.get("created")
+        if created is None and data.get("timestamp"):
+            try:
+                created = datetime.fromisoformat(data["timestamp"]).timestamp()
+            except (TypeError, ValueError):
+                created = None
+        return cls(data.get("user"), data.get("bot"), data.get("category"), created, data.get("id", id))
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "user": self.user,
+            "bot": self.bot,
+            "category": self.category,
+            "timestamp": datetime.fromtimestamp(self.created).isoformat()
+        }
+
+    def to_json(self):
+        """Isi record untuk backend sqlite/redis (id dan waktu disimpan terpisah)"""
+        return json.dumps({"user": self.user, "bot": self.bot, "category": self.category}, ensure_ascii=False)
+
+
+def as_record(record):
+    """Terima HistoryRecord atau dict record lama"""
+    return record if isinstance(record, HistoryRecord) else HistoryRecord.from_dict(record)
+
+
+def select_page(records, limit, before=None, since=None):
+    """
+    Pilih satu halaman dari records (urut id naik). Dengan since: record setelah id
+    tersebut, dari yang terlama. Tanpa since: `limit` record terbaru (sebelum id before).
+    Mengembalikan (records, has_more).
+    """
+    if since is not None:
+        records = [r for r in records if r["id"] > since]
+    if before is not None:
+        records = [r for r in records if r["id"] < before]
+    if len(records) <= limit:
+        return records, False
+    if since is not None:
+        return records[:limit], True
+    return records[-limit:], True
+
+
+class HistoryStore(ABC):
+    """
+    Interface penyimpanan history percakapan per session.
+    Session idle = tidak ada append selama idle_timeout (membaca history tidak dihitung
+    sebagai aktivitas, sama di semua backend). Session idle tidak pernah dikembalikan,
+    meskipun belum dihapus oleh cleanup(). Batas max_sessions dan max_records (0 = tanpa batas)
+    dijaga dengan meng-evict session paling lama tidak aktif: backend memory saat append,
+    backend sqlite/redis setiap cleanup().
+    """
+
+    # True jika operasi store melakukan I/O (dijalankan di thread pool pada mode ASGI)
+    blocking = False
+
+    def __init__(self, max_history=MAX_CONVERSATION_HISTORY, idle_timeout=SESSION_LIFETIME,
+                 max_sessions=MAX_SESSIONS, max_records=MAX_HISTORY_RECORDS):
+        self.max_history = max_history
+        self.idle_timeout = _seconds(idle_timeout)
+        self.max_sessions = max_sessions
+        self.max_records = max_records
+        self.expired = 0
+        self.evicted = 0
+
+    @abstractmethod
+    def append(self, session_id, record, context=None):
+        """
+        Tambah satu record ke history session (dipotong ke max_history di sisi store).
+        context: state konteks percakapan (dict) yang menggantikan state sebelumnya, atau None.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_context(self, session_id):
+        """State konteks percakapan terakhir session (dict), None jika tidak ada"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, session_id):
+        """Ambil seluruh history session sebagai list record (urut lama -> baru)"""
+        raise NotImplementedError
+
+    def page(self, session_id, limit, before=None, since=None):
+        """Satu halaman history (lihat select_page). Mengembalikan (records, has_more, latest_id, count)"""
+        records = self.get(session_id)
+        latest = records[-1]["id"] if records else None
+        return (*select_page(records, limit, before, since), latest, len(records))
+
+    def head(self, session_id):
+        """(id record terbaru, jumlah record) session, untuk ETag tanpa mengambil isi history"""
+        records = self.get(session_id)
+        return (records[-1]["id"] if records else None), len(records)
+
+    @abstractmethod
+    def clear(self, session_id):
+        """Hapus history session"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def count(self):
+        """Jumlah session yang memiliki history"""
+        raise NotImplementedError
+
+    def cleanup(self):
+        """
+        Hapus session yang idle lebih lama dari idle_timeout (mengembalikan jumlahnya)
+        dan evict session terlama yang melewati max_sessions/max_records.
+        """
+        return 0
+
+    def flush(self):
+        """Tulis semua perubahan yang masih di-buffer"""
+
+    def close(self):
+        """Tutup koneksi backend"""
+        self.flush()
+
+    def stats(self):
+        """Statistik store untuk health check"""
+        return {
+            "backend": self.name,
+            "sessions": self.count(),
+            "expired_sessions": self.expired,
+            "evicted_sessions": self.evicted
+        }
+
+
+class MemoryHistoryStore(HistoryStore):
+    """
+    History di memory proses, satu deque berukuran tetap per session.
+    Session disimpan berurutan menurut append terakhir (LRU) sehingga
+    session idle bisa di-expire dan session terlama di-evict saat melewati
+    batas jumlah session (max_sessions) atau total record (max_records).
+    """
+
+    name = "memory"
+
+    def __init__(self, max_history=MAX_CONVERSATION_HISTORY, idle_timeout=SESSION_LIFETIME,
+                 max_sessions=MAX_SESSIONS, max_records=MAX_HISTORY_RECORDS):
+        super().__init__(max_history, idle_timeout, max_sessions, max_records)
+        self.total_records = 0
+        self._data = OrderedDict()
+        self._contexts = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def _is_expired(self, last_seen, now):
+        return self.idle_timeout > 0 and now - last_seen > self.idle_timeout
+
+    def _drop(self, session_id):
+        _, history = self._data.pop(session_id)
+        self._contexts.pop(session_id, None)
+        self.total_records -= len(history)
+
+    def _expire(self, now):
+        """Hapus session idle dari ujung LRU, berhenti di session pertama yang masih aktif"""
+        removed = 0
+        while self._data:
+            session_id, (last_seen, _) = next(iter(self._data.items()))
+            if not self._is_expired(last_seen, now):
+                break
+            self._drop(session_id)
+            removed += 1
+        self.expired += removed
+        return removed
+
+    def _evict(self, keep):
+        """Evict session paling lama tidak aktif sampai jumlah session dan record di bawah batas"""
+        while len(self._data) > 1 and (
+            (self.max_sessions > 0 and len(self._data) > self.max_sessions)
+            or (self.max_records > 0 and self.total_records > self.max_records)
+        ):
+            session_id = next(iter(self._data))
+            if session_id == keep:
+                break
+            self._drop(session_id)
+            self.evicted += 1
+
+    def append(self, session_id, record, context=None):
+        record = as_record(record)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._data.get(session_id)
+            if entry is None:
+                history = deque(maxlen=self.max_history)
+            else:
+                history = entry[1]
+                self._data.move_to_end(session_id)
+
+            if len(history) < self.max_history:
+                self.total_records += 1
+            record.id = next(self._ids)
+            history.append(record)
+            self._data[session_id] = (now, history)
+            if context is not None:
+                self._contexts[session_id] = context
+            self._evict(keep=session_id)
+
+    def get_context(self, session_id):
+        with self._lock:
+            entry = self._data.get(session_id)
+            if entry is None or self._is_expired(entry[0], time.monotonic()):
+                return None
+            return self._contexts.get(session_id)
+
+    def _history(self, session_id):
+        """History session (deque), None jika tidak ada/expired. Dipanggil di dalam lock"""
+        entry = self._data.get(session_id)
+        if entry is None:
+            return None
+        if self._is_expired(entry[0], time.monotonic()):
+            self._drop(session_id)
+            self.expired += 1
+            return None
+        return entry[1]
+
+    def get(self, session_id):
+        with self._lock:
+            history = self._history(session_id)
+            return [record.to_dict() for record in history] if history else []
+
+    def page(self, session_id, limit, before=None, since=None):
+        with self._lock:
+            history = self._history(session_id)
+            if not history:
+                return [], False, None, 0
+            latest, count = history[-1].id, len(history)
+            records = [
+                record for record in history
+                if (since is None or record.id > since) and (before is None or record.id < before)
+            ]
+        has_more = len(records) > limit
+        if has_more:
+            records = records[:limit] if since is not None else records[-limit:]
+        return [record.to_dict() for record in records], has_more, latest, count
+
+    def head(self, session_id):
+        with self._lock:
+            history = self._history(session_id)
+            if not history:
+                return None, 0
+            return history[-1].id, len(history)
+
+    def clear(self, session_id):
+        with self._lock:
+            if session_id in self._data:
+                self._drop(session_id)
+
+    def count(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            return len(self._data)
+
+    def cleanup(self):
+        with self._lock:
+            return self._expire(time.monotonic())
+
+    def stats(self):
+        stats = super().stats()
+        stats["records"] = self.total_records
+        return stats
+
+
+class SQLiteHistoryStore(HistoryStore):
+    """
+    History di SQLite (WAL). Append masuk buffer dan ditulis per batch,
+    baik saat buffer penuh maupun secara periodik oleh thread flusher.
+    Session idle disaring saat dibaca (waktu record terakhir) dan dihapus oleh cleanup().
+    """
+
+    name = "sqlite"
+    blocking = True
+
+    def __init__(self, path=HISTORY_DB_PATH, max_history=MAX_CONVERSATION_HISTORY,
+                 idle_timeout=SESSION_LIFETIME, batch_size=HISTORY_BATCH_SIZE,
+                 flush_interval=HISTORY_FLUSH_INTERVAL, max_sessions=MAX_SESSIONS,
+                 max_records=MAX_HISTORY_RECORDS):
+        super().__init__(max_history, idle_timeout, max_sessions, max_records)
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._pending_contexts = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "session_id TEXT NOT NULL, "
+            "created REAL NOT NULL, "
+            "record TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_history_session ON history(session_id, id)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS context ("
+            "session_id TEXT PRIMARY KEY, "
+            "updated REAL NOT NULL, "
+            "context TEXT NOT NULL)"
+        )
+
+        self._stop = threading.Event()
+        self._flusher = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="history-flusher", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing history ke SQLite: {str(e)}")
+
+    def _write_batch(self, batch, contexts):
+        """Tulis batch (dan konteks session) dalam satu transaksi lalu potong history session yang terkena"""
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                "INSERT INTO history (session_id, created, record) VALUES (?, ?, ?)",
+                [(sid, record.created, record.to_json()) for sid, record in batch]
+            )
+            if contexts:
+                now = time.time()
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO context (session_id, updated, context) VALUES (?, ?, ?)",
+                    [(sid, now, json.dumps(context, ensure_ascii=False)) for sid, context in contexts.items()]
+                )
+            for sid in {item[0] for item in batch}:
+                self._conn.execute(
+                    "DELETE FROM history WHERE session_id = ? AND id <= ("
+                    "SELECT id FROM history WHERE session_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (sid, sid, self.max_history)
+                )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def flush(self):
+        with self._lock:
+            if not self._pending and not self._pending_contexts:
+                return
+            batch, self._pending = self._pending, []
+            contexts, self._pending_contexts = self._pending_contexts, {}
+            self._write_batch(batch, contexts)
+
+    def _cutoff(self):
+        """Waktu record terakhir paling lama untuk session yang belum idle (0 = tanpa idle timeout)"""
+        return time.time() - self.idle_timeout if self.idle_timeout > 0 else 0
+
+    @staticmethod
+    def _row_to_dict(row):
+        record_id, created, data = row
+        record = HistoryRecord.from_dict(json.loads(data), record_id)
+        record.created = created
+        return record.to_dict()
+
+    def append(self, session_id, record, context=None):
+        record = as_record(record)
+        with self._lock:
+            self._pending.append((session_id, record))
+            if context is not None:
+                self._pending_contexts[session_id] = context
+            if len(self._pending) < self.batch_size:
+                return
+            batch, self._pending = self._pending, []
+            contexts, self._pending_contexts = self._pending_contexts, {}
+            self._write_batch(batch, contexts)
+
+    def get_context(self, session_id):
+        # Konteks yang belum di-flush dibaca dari buffer, tanpa menunggu batch ditulis
+        with self._lock:
+            context = self._pending_contexts.get(session_id)
+            if context is not None:
+                return context
+            row = self._conn.execute(
+                "SELECT context FROM context WHERE session_id = ? AND updated >= ?", (session_id, self._cutoff())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get(self, session_id):
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, created, record FROM history WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, self.max_history)
+            ).fetchall()
+        if rows and rows[0][1] < self._cutoff():
+            return []
+        return [self._row_to_dict(row) for row in reversed(rows)]
+
+    def page(self, session_id, limit, before=None, since=None):
+        self.flush()
+        conditions = ["session_id = ?"]
+        params = [session_id]
+        if since is not None:
+            conditions.append("id > ?")
+            params.append(since)
+        if before is not None:
+            conditions.append("id < ?")
+            params.append(before)
+        order = "ASC" if since is not None else "DESC"
+        with self._lock:
+            latest, count, last_created = self._conn.execute(
+                "SELECT MAX(id), COUNT(*), MAX(created) FROM history WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if not count or last_created < self._cutoff():
+                return [], False, None, 0
+            rows = self._conn.execute(
+                f"SELECT id, created, record FROM history WHERE {' AND '.join(conditions)} "
+                f"ORDER BY id {order} LIMIT ?",
+                (*params, limit + 1)
+            ).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if since is None:
+            rows.reverse()
+        return [self._row_to_dict(row) for row in rows], has_more, latest, count
+
+    def head(self, session_id):
+        self.flush()
+        with self._lock:
+            latest, count, last_created = self._conn.execute(
+                "SELECT MAX(id), COUNT(*), MAX(created) FROM history WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if not count or last_created < self._cutoff():
+            return None, 0
+        return latest, count
+
+    def clear(self, session_id):
+        self.flush()
+        with self._lock:
+            self._conn.execute("DELETE FROM history WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM context WHERE session_id = ?", (session_id,))
+
+    def count(self):
+        self.flush()
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM (SELECT 1 FROM history GROUP BY session_id HAVING MAX(created) >= ?)",
+                (self._cutoff(),)
+            ).fetchone()[0]
+
+    def _delete_sessions(self, session_ids):
+        """Hapus history dan konteks session (dipanggil dengan _lock)"""
+        params = [(sid,) for sid in session_ids]
+        self._conn.executemany("DELETE FROM history WHERE session_id = ?", params)
+        self._conn.executemany("DELETE FROM context WHERE session_id = ?", params)
+
+    def cleanup(self):
+        self.flush()
+        with self._lock:
+            expired = []
+            if self.idle_timeout > 0:
+                cutoff = self._cutoff()
+                expired = [row[0] for row in self._conn.execute(
+                    "SELECT session_id FROM history GROUP BY session_id HAVING MAX(created) < ?",
+                    (cutoff,)
+                )]
+                self._delete_sessions(expired)
+                self._conn.execute("DELETE FROM context WHERE updated < ?", (cutoff,))
+                self.expired += len(expired)
+
+            if self.max_sessions > 0 or self.max_records > 0:
+                # Urut dari session paling baru aktif; session terbaru selalu disimpan
+                evicted = [row[0] for row in self._conn.execute(
+                    "SELECT session_id FROM ("
+                    "SELECT session_id, ROW_NUMBER() OVER w AS position, SUM(COUNT(*)) OVER w AS records "
+                    "FROM history GROUP BY session_id WINDOW w AS (ORDER BY MAX(id) DESC)"
+                    ") WHERE position > 1 AND ((? > 0 AND position > ?) OR (? > 0 AND records > ?))",
+                    (self.max_sessions, self.max_sessions, self.max_records, self.max_records)
+                )]
+                self._delete_sessions(evicted)
+                self.evicted += len(evicted)
+        return len(expired)
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+class RedisHistoryStore(HistoryStore):
+    """
+    History di Redis: satu list per session (RPUSH + LTRIM dalam satu transaksi)
+    dengan TTL idle sesuai SESSION_LIFETIME, plus sorted set session -> waktu aktivitas
+    terakhir untuk menghitung session aktif. Counter per session menghitung total append;
+    id record = counter - panjang list + posisi. Menerima client redis-py atau fakeredis.
+    Session idle hilang sendiri lewat TTL; batas session/record dijaga oleh cleanup().
+    """
+
+    name = "redis"
+    blocking = True
+
+    def __init__(self, client=None, url=REDIS_URL, max_history=MAX_CONVERSATION_HISTORY,
+                 idle_timeout=SESSION_LIFETIME, prefix="chatbot:history:", max_sessions=MAX_SESSIONS,
+                 max_records=MAX_HISTORY_RECORDS):
+        super().__init__(max_history, idle_timeout, max_sessions, max_records)
+        self.client = client if client is not None else connect_redis(url)
+        self.prefix = prefix
+        self.sessions_key = f"{prefix}sessions"
+
+    def _key(self, session_id):
+        return f"{self.prefix}{session_id}"
+
+    def _seq_key(self, session_id):
+        return f"{self.prefix}{session_id}:seq"
+
+    def _context_key(self, session_id):
+        return f"{self.prefix}{session_id}:context"
+
+    def append(self, session_id, record, context=None):
+        record = as_record(record)
+        key, seq_key = self._key(session_id), self._seq_key(session_id)
+        data = json.loads(record.to_json())
+        data["created"] = record.created
+        pipe = self.client.pipeline(transaction=True)
+        pipe.rpush(key, json.dumps(data, ensure_ascii=False))
+        pipe.incr(seq_key)
+        pipe.ltrim(key, -self.max_history, -1)
+        pipe.zadd(self.sessions_key, {session_id: time.time()})
+        if self.idle_timeout > 0:
+            pipe.expire(key, self.idle_timeout)
+            pipe.expire(seq_key, self.idle_timeout)
+        if context is not None:
+            pipe.set(self._context_key(session_id), json.dumps(context, ensure_ascii=False),
+                     ex=self.idle_timeout or None)
+        length, seq = pipe.execute()[:2]
+        if seq < length:
+            # List dari versi lama tanpa counter: samakan counter dengan isi list
+            self.client.set(seq_key, length, ex=self.idle_timeout or None)
+
+    def get(self, session_id):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.get(self._seq_key(session_id))
+        pipe.lrange(self._key(session_id), 0, -1)
+        seq, items = pipe.execute()
+        first_id = max(int(seq or 0), len(items)) - len(items) + 1
+        return [
+            HistoryRecord.from_dict(json.loads(item), first_id + i).to_dict()
+            for i, item in enumerate(items)
+        ]
+
+    def get_context(self, session_id):
+        raw = self.client.get(self._context_key(session_id))
+        return json.loads(raw) if raw else None
+
+    def head(self, session_id):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.get(self._seq_key(session_id))
+        pipe.llen(self._key(session_id))
+        seq, length = pipe.execute()
+        if not length:
+            return None, 0
+        return max(int(seq or 0), length), length
+
+    def clear(self, session_id):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.delete(self._key(session_id), self._context_key(session_id))
+        pipe.zrem(self.sessions_key, session_id)
+        pipe.execute()
+
+    def count(self):
+        if self.idle_timeout <= 0:
+            return self.client.zcard(self.sessions_key)
+        return self.client.zcount(self.sessions_key, time.time() - self.idle_timeout, "+inf")
+
+    def _evict(self):
+        """Evict session paling lama tidak aktif sampai jumlah session dan record di bawah batas"""
+        if self.max_sessions <= 0 and self.max_records <= 0:
+            return
+        # Urut dari session paling baru aktif; session terbaru selalu disimpan
+        sessions = [
+            sid.decode() if isinstance(sid, bytes) else sid
+            for sid in self.client.zrevrange(self.sessions_key, 0, -1)
+        ]
+        lengths = [0] * len(sessions)
+        if self.max_records > 0:
+            pipe = self.client.pipeline(transaction=False)
+            for sid in sessions:
+                pipe.llen(self._key(sid))
+            lengths = pipe.execute()
+
+        evicted = []
+        records = 0
+        for position, (sid, length) in enumerate(zip(sessions, lengths), 1):
+            records += length
+            if position > 1 and (
+                (self.max_sessions > 0 and position > self.max_sessions)
+                or (self.max_records > 0 and records > self.max_records)
+            ):
+                evicted.append(sid)
+        if not evicted:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for sid in evicted:
+            pipe.delete(self._key(sid), self._seq_key(sid), self._context_key(sid))
+        pipe.zrem(self.sessions_key, *evicted)
+        pipe.execute()
+        self.evicted += len(evicted)
+
+    def cleanup(self):
+        """List session sudah expired lewat TTL Redis; bersihkan index sessions lalu jaga batas session/record"""
+        removed = 0
+        if self.idle_timeout > 0:
+            removed = self.client.zremrangebyscore(self.sessions_key, "-inf", time.time() - self.idle_timeout)
+            self.expired += removed
+        self._evict()
+        return removed
+
+    def close(self):
+        self.client.close()
+
+
+def create_history_store(backend=HISTORY_BACKEND):
+    """Buat history store sesuai konfigurasi HISTORY_BACKEND"""
+    backend = (backend or "memory").lower()
+    if backend == "sqlite":
+        store = SQLiteHistoryStore()
+    elif backend == "redis":
+        store = RedisHistoryStore()
+    else:
+        if backend != "memory":
+            logger.warning(f"History backend tidak dikenali: {backend}, memakai memory")
+        store = MemoryHistoryStore()
+
+    logger.info(f"History store: {store.name}")
+    return store
@@ -0,0 +1,227 @@
+"""
+Artifact index knowledge base: hasil `python -m utils build-index` yang dimuat worker
+tanpa parse JSON, validasi, maupun kompilasi ulang.
+
+Layout file (format INDEX_FORMAT):
+
+    [8 byte MAGIC][uint32 format][uint32 panjang header]
+    [header JSON: source_sha256, sections {nama: [offset, panjang]}]
+    [section "tables"]     pickle: keyword, matcher (keyword ternormalisasi + inverted
+                           index), teks tidak dipahami, offset respons per kategori
+    [section "responses"]  respons pre-rendered per kategori (JSON UTF-8)
+    [32 byte HMAC-SHA256 dengan key SECRET_KEY atas semua byte sebelumnya]
+
+Worker membuka file dengan mmap read-only. Respons satu kategori di-decode dari mapping
+saat pertama dibutuhkan lalu disimpan, sehingga kategori yang tidak pernah ditanyakan
+tidak dimuat dan respons berikutnya tanpa parsing sama sekali.
+Tabel matcher di-unpickle ke memori proses (RapidFuzz butuh objek str Python); agar
+tabel itu juga dibagi antar worker, muat KB sekali di proses induk sebelum fork
+(KB_PRELOAD=true + gunicorn --preload, lihat app.create_app yang memanggil gc.freeze).
+
+Section tables memakai pickle, jadi HMAC diperiksa sebelum apa pun di-unpickle:
+artifact yang tidak ditandatangani dengan SECRET_KEY yang sama (build-index dan
+worker harus memakai SECRET_KEY yang sama) atau yang isinya berubah ditolak.
+Dengan SECRET_KEY default (publik) siapa pun bisa membuat tanda tangan yang valid,
+jadi artifact tidak dibangun maupun dimuat; KB dikompilasi dari JSON.
+"""
+import gc
+import hashlib
+import hmac
+import json
+import mmap
+import os
+import pickle
+import struct
+from collections.abc import Mapping
+from datetime import datetime
+from logger_config import logger
+from knowledge import CompiledKB, CompiledResponse
+from config import DEFAULT_SECRET_KEY, SECRET_KEY
+
+MAGIC = b"CHATKBI\x00"
+INDEX_FORMAT = 4
+_PREFIX = struct.Struct("<8sII")
+_MAC_SIZE = hashlib.sha256().digest_size
+
+
+def key_problem(key):
+    """Alasan key tidak boleh dipakai untuk tanda tangan artifact, None jika boleh"""
+    if not key:
+        return "SECRET_KEY kosong"
+    if key == DEFAULT_SECRET_KEY:
+        return "SECRET_KEY masih default (publik), set SECRET_KEY yang rahasia"
+    return None
+
+
+def _signature(data, key):
+    """HMAC-SHA256 isi artifact dengan key (str atau bytes)"""
+    if isinstance(key, str):
+        key = key.encode("utf-8")
+    return hmac.new(key, data, hashlib.sha256).digest()
+
+
+class MappedResponses(Mapping):
+    """Respons per kategori dari mmap artifact, di-decode sekali per kategori saat pertama diakses"""
+
+    def __init__(self, buffer, base, index):
+        self._buffer = buffer
+        self._base = base
+        self._index = index
+        self._decoded = {}
+
+    def __getitem__(self, category):
+        response = self._decoded.get(category)
+        if response is None:
+            offset, length = self._index[category]
+            start = self._base + offset
+            default, variants = json.loads(self._buffer[start:start + length])
+            # Dua thread yang decode bersamaan menghasilkan nilai sama, yang terakhir disimpan
+            response = self._decoded[category] = CompiledResponse(default, [tuple(variant) for variant in variants])
+        return response
+
+    def __contains__(self, category):
+        return category in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+
+def _encode_responses(responses):
+    """Gabungkan respons menjadi satu blob; kembalikan (blob, {kategori: (offset, panjang)})"""
+    chunks = []
+    index = {}
+    offset = 0
+    for category, response in responses.items():
+        data = json.dumps(
+            [response.default, [list(variant) for variant in response.variants]],
+            ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        index[category] = (offset, len(data))
+        chunks.append(data)
+        offset += len(data)
+    return b"".join(chunks), index
+
+
+def write_index(compiled, path, source_sha256, key=SECRET_KEY):
+    """
+    Tulis CompiledKB ke artifact index yang ditandatangani dengan key (file sementara
+    lalu rename atomik). Mengembalikan header yang ditulis; ValueError jika key
+    tidak boleh dipakai (lihat key_problem).
+    """
+    problem = key_problem(key)
+    if problem:
+        raise ValueError(f"artifact index tidak dibuat: {problem}")
+    responses, response_index = _encode_responses(compiled.responses)
+    tables = pickle.dumps({
+        "keywords": compiled.keywords,
+        "matcher": compiled.matcher,
+        "not_understood": compiled.not_understood,
+        "responses": response_index
+    }, protocol=pickle.HIGHEST_PROTOCOL)
+    body = tables + responses
+
+    header = {
+        "format": INDEX_FORMAT,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "source_sha256": source_sha256,
+        "categories": len(compiled.responses),
+        "keywords": len(compiled.matcher),
+        "sections": {"tables": [0, len(tables)], "responses": [len(tables), len(responses)]}
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    content = _PREFIX.pack(MAGIC, INDEX_FORMAT, len(header_bytes)) + header_bytes + body
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+            f.write(_signature(content, key))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return header
+
+
+def read_header(buffer):
+    """Header artifact dan offset awal body; ValueError jika bukan artifact format ini"""
+    if len(buffer) < _PREFIX.size:
+        raise ValueError("file terlalu pendek")
+    magic, version, header_length = _PREFIX.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError("bukan artifact index KB")
+    if version != INDEX_FORMAT:
+        raise ValueError(f"format {version} tidak didukung (butuh {INDEX_FORMAT})")
+    body_start = _PREFIX.size + header_length
+    header = json.loads(buffer[_PREFIX.size:body_start])
+    return header, body_start
+
+
+def load_index(path, source_sha256=None, key=SECRET_KEY):
+    """
+    CompiledKB dari artifact index, atau None jika file tidak ada, formatnya lain,
+    tanda tangannya tidak cocok dengan key (rusak, diubah, atau dibangun dengan
+    SECRET_KEY lain), atau dibangun dari file KB lain (source_sha256 tidak cocok).
+    source_sha256 None: tidak dicocokkan (deploy tanpa file KB JSON).
+    """
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Index KB {path} tidak bisa dibuka: {str(e)}")
+        return None
+
+    problem = key_problem(key)
+    if problem:
+        # Tanda tangan dengan key publik bisa dipalsukan: jangan unpickle apa pun
+        logger.warning(f"Index KB {path} tidak dimuat ({problem}), KB dikompilasi dari JSON")
+        buffer.close()
+        return None
+
+    try:
+        header, body_start = read_header(buffer)
+        if source_sha256 is not None and header.get("source_sha256") != source_sha256:
+            logger.warning(
+                f"Index KB {path} tidak sesuai file KB saat ini, KB dikompilasi ulang "
+                f"(jalankan `python -m utils build-index`)"
+            )
+            return None
+
+        # Tanda tangan diperiksa sebelum pickle.loads: pickle dari file asing bisa menjalankan kode
+        content_end = len(buffer) - _MAC_SIZE
+        with memoryview(buffer) as view:
+            valid = content_end >= body_start and hmac.compare_digest(
+                _signature(view[:content_end], key), view[content_end:]
+            )
+        if not valid:
+            logger.error(f"Tanda tangan index KB {path} tidak valid, KB dikompilasi ulang")
+            return None
+
+        offset, length = header["sections"]["tables"]
+        start = body_start + offset
+        # Unpickle membuat banyak objek kecil; GC dijeda agar tidak berkali-kali memindai semuanya
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            tables = pickle.loads(buffer[start:start + length])
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+        offset, _ = header["sections"]["responses"]
+        responses = MappedResponses(buffer, body_start + offset, tables["responses"])
+        return CompiledKB(
+            None, responses, tables["keywords"], tables["matcher"], tables["not_understood"],
+            empty=not responses
+        )
+    except Exception as e:
+        logger.warning(f"Index KB {path} tidak bisa dibaca, KB dikompilasi ulang: {str(e)}")
+        return None
@@ -0,0 +1,384 @@
+"""
+Kompilasi knowledge base menjadi template respons siap saji, plus watcher file KB
+untuk hot reload. Hasil kompilasi tidak pernah diubah setelah dibuat; reload membuat
+objek baru lalu menukar referensinya sehingga pembaca tidak butuh lock.
+
+Format KB (data-driven), setiap entry membawa keyword dan jawabannya sendiri:
+
+    {
+      "entries": [
+        {
+          "category": "jadwal",                      # id unik, dikembalikan ke client
+          "keywords": ["jadwal", "jam", "buka"],     # untuk matching
+          "questions": ["jam berapa lab buka?"],     # opsional, teks tambahan untuk index retrieval
+          "data": {"jam_buka": "07:00"},             # opsional, nilai untuk template answer
+          "answer": "Lab buka pukul {jam_buka}.",    # template, atau:
+          "title": "Aturan lab", "items": ["..."],   # daftar bullet
+          "empty": "Maaf, data tidak tersedia.",     # opsional, jika items kosong
+          "variants": [                              # opsional, dipilih jika trigger ada di input
+            {"trigger": "sanksi", "title": "Sanksi", "items": ["..."]}
+          ]
+        }
+      ]
+    }
+
+Format lama (objek jadwal/aturan/spesifikasi tanpa "entries") tetap didukung
+dengan keyword bawaan LEGACY_KEYWORDS.
+
+validate_knowledge_base() memeriksa KB secara ketat untuk langkah build
+(`python -m utils build-index`, lihat kb_index.py); kompilasi saat serving tetap
+longgar: entry yang tidak valid dilewati dengan warning.
+"""
+import os
+import string
+import threading
+from logger_config import logger
+
+NO_INFO_RESPONSE = "Maaf, saya tidak memiliki informasi tentang pertanyaan Anda."
+GREETING_RESPONSE = (
+    "Halo! Saya asisten Lab ICLABS. Anda bisa menanyakan: 'jam buka', 'aturan lab', "
+    "atau 'spesifikasi PC'. Ada yang ingin ditanyakan?"
+)
+MAX_SUGGESTED_CATEGORIES = 10
+
+LEGACY_KEYWORDS = {
+    "jadwal": ["jadwal", "buka", "tutup", "istirahat", "hari kerja", "jam", "berapa"],
+    "aturan": ["aturan", "sanksi", "syarat", "peraturan", "dilarang", "boleh"],
+    "spesifikasi": ["spesifikasi", "pc", "komputer", "software", "hardware", "mysql", "sistem"],
+    "greeting": ["halo", "hai", "hallo", "selamat", "pagi", "siang", "sore", "assalamualaikum", "terima kasih", "makasih", "oke", "ok"]
+}
+
+
+class CompiledResponse:
+    """Respons default satu kategori plus varian yang dipilih jika trigger muncul di input"""
+
+    __slots__ = ("default", "variants")
+
+    def __init__(self, default, variants=()):
+        self.default = default
+        self.variants = tuple(variants)
+
+    def render(self, user_input_lower):
+        for trigger, text in self.variants:
+            if trigger in user_input_lower:
+                return text
+        return self.default
+
+
+class CompiledKB:
+    """
+    Knowledge base yang sudah dikompilasi: data mentah, respons per kategori,
+    keyword per kategori dan matcher yang dibangun dari keyword tersebut.
+    data None jika dimuat dari artifact index (KB mentah tidak ikut disimpan).
+    """
+
+    __slots__ = ("data", "responses", "keywords", "matcher", "not_understood", "version", "empty")
+
+    def __init__(self, data, responses, keywords, matcher, not_understood, version=None, empty=None):
+        self.data = data
+        self.responses = responses
+        self.keywords = keywords
+        self.matcher = matcher
+        self.not_understood = not_understood
+        self.version = version
+        self.empty = not data if empty is None else empty
+
+
+class _TemplateValues(dict):
+    """Nilai template answer; field yang tidak ada dirender 'tidak tersedia'"""
+
+    def __missing__(self, key):
+        return "tidak tersedia"
+
+
+def suggestion_text(categories):
+    """Teks saran kategori yang tersedia (dibatasi MAX_SUGGESTED_CATEGORIES)"""
+    categories = list(categories)
+    if not categories:
+        return "Maaf, tidak ada kategori yang tersedia."
+    shown = ", ".join(categories[:MAX_SUGGESTED_CATEGORIES])
+    if len(categories) > MAX_SUGGESTED_CATEGORIES:
+        shown += ", ..."
+    return f"Kategori yang tersedia: {shown}"
+
+
+def _bullets(items):
+    return "\n".join(f"• {x}" for x in items if x)
+
+
+def render_answer(spec, values):
+    """Render jawaban entry/varian: 'title' + 'items' sebagai bullet list, atau template 'answer'"""
+    if "items" in spec:
+        items = spec.get("items")
+        s = _bullets(items) if isinstance(items, list) else ""
+        if not s:
+            return spec.get("empty", NO_INFO_RESPONSE)
+        title = spec.get("title")
+        return f"{title}:\n{s}" if title else s
+
+    answer = spec.get("answer")
+    if not isinstance(answer, str) or not answer:
+        return spec.get("empty", NO_INFO_RESPONSE)
+    return answer.format_map(values) if values else answer
+
+
+def compile_entry(entry):
+    """Kompilasi satu entry KB menjadi CompiledResponse"""
+    data = entry.get("data") or {}
+    values = _TemplateValues({
+        key: ", ".join(str(v) for v in value) if isinstance(value, list) else value
+        for key, value in data.items()
+    })
+    variants = [
+        (variant["trigger"].lower(), render_answer(variant, values))
+        for variant in entry.get("variants", [])
+        if variant.get("trigger")
+    ]
+    return CompiledResponse(render_answer(entry, values), variants)
+
+
+def _compile_jadwal(jadwal_data):
+    hari_kerja = jadwal_data.get("hari_kerja", "tidak tersedia")
+    jam_buka = jadwal_data.get("jam_buka", "tidak tersedia")
+    jam_tutup = jadwal_data.get("jam_tutup", "tidak tersedia")
+    istirahat = jadwal_data.get("istirahat", "tidak tersedia")
+    return CompiledResponse(f"Lab buka {hari_kerja} pukul {jam_buka} - {jam_tutup} (istirahat {istirahat}).")
+
+
+def _compile_aturan(aturan_data):
+    sanksi = aturan_data.get("sanksi", [])
+    if not sanksi or not isinstance(sanksi, list):
+        sanksi_response = "Maaf, saya tidak memiliki informasi tentang sanksi."
+    else:
+        s = _bullets(sanksi)
+        sanksi_response = f"Sanksi:\n{s}" if s else "Maaf, data sanksi tidak tersedia."
+
+    syarat = aturan_data.get("syarat", [])
+    if not syarat or not isinstance(syarat, list):
+        syarat_response = "Maaf, saya tidak memiliki informasi tentang aturan."
+    else:
+        s = _bullets(syarat)
+        syarat_response = f"Aturan lab:\n{s}" if s else "Maaf, data aturan tidak tersedia."
+
+    return CompiledResponse(syarat_response, [("sanksi", sanksi_response)])
+
+
+def _compile_spesifikasi(spesifikasi_data):
+    pc_data = spesifikasi_data.get("pc", {})
+    software_list = spesifikasi_data.get("software", [])
+    if not pc_data or not software_list:
+        return CompiledResponse("Maaf, data spesifikasi tidak lengkap.")
+
+    jumlah = pc_data.get("jumlah", "tidak tersedia")
+    processor = pc_data.get("processor", "tidak tersedia")
+    ram = pc_data.get("ram", "tidak tersedia")
+    os_name = pc_data.get("os", "tidak tersedia")
+    sw = ", ".join(software_list) if isinstance(software_list, list) else "tidak tersedia"
+    return CompiledResponse(f"Spesifikasi: {jumlah} PC, {processor}, RAM {ram}, {os_name}. Software: {sw}")
+
+
+LEGACY_COMPILERS = {
+    "jadwal": _compile_jadwal,
+    "aturan": _compile_aturan,
+    "spesifikasi": _compile_spesifikasi,
+}
+
+
+def _compile_legacy(kb):
+    """Kompilasi KB format lama (objek per kategori, keyword dari LEGACY_KEYWORDS)"""
+    responses = {}
+    for category in LEGACY_KEYWORDS:
+        if category == "greeting":
+            responses[category] = CompiledResponse(GREETING_RESPONSE)
+            continue
+
+        data = kb.get(category)
+        if not data:
+            logger.warning(f"Data {category} tidak ditemukan")
+            responses[category] = CompiledResponse(NO_INFO_RESPONSE)
+            continue
+
+        try:
+            responses[category] = LEGACY_COMPILERS[category](data)
+        except Exception as e:
+            logger.error(f"Error processing {category}: {str(e)}")
+            responses[category] = CompiledResponse(NO_INFO_RESPONSE)
+
+    return responses, dict(LEGACY_KEYWORDS), {}
+
+
+def _compile_entries(entries):
+    """Kompilasi KB format entries. Entry tanpa category/keywords atau duplikat dilewati"""
+    responses = {}
+    keywords = {}
+    documents = {}
+    for i, entry in enumerate(entries):
+        category = entry.get("category") if isinstance(entry, dict) else None
+        if not category or not isinstance(entry.get("keywords"), list):
+            logger.warning(f"Entry KB #{i} tidak valid (butuh 'category' dan 'keywords'), dilewati")
+            continue
+        if category in responses:
+            logger.warning(f"Kategori duplikat di KB: {category}, entry #{i} dilewati")
+            continue
+
+        try:
+            responses[category] = compile_entry(entry)
+        except Exception as e:
+            logger.error(f"Error processing {category}: {str(e)}")
+            responses[category] = CompiledResponse(NO_INFO_RESPONSE)
+        keywords[category] = [kw for kw in entry["keywords"] if isinstance(kw, str)]
+        documents[category] = [q for q in entry.get("questions", []) if isinstance(q, str)]
+
+    return responses, keywords, documents
+
+
+def compile_knowledge_base(kb, version=None):
+    """
+    Kompilasi dict KB menjadi CompiledKB. Semua string respons dirender dan matcher
+    dibangun di sini, sehingga saat melayani request cukup lookup dict.
+    """
+    if isinstance(kb, dict) and isinstance(kb.get("entries"), list):
+        responses, keywords, documents = _compile_entries(kb["entries"])
+    else:
+        responses, keywords, documents = _compile_legacy(kb if isinstance(kb, dict) else {})
+
+    # Import di sini: rapidfuzz/retrieval baru dibutuhkan saat KB dikompilasi
+    from matcher import IntentMatcher
+    matcher = IntentMatcher(keywords, documents=documents)
+    not_understood = f"Maaf, saya tidak paham pertanyaan Anda. {suggestion_text(keywords)}"
+    return CompiledKB(kb, responses, keywords, matcher, not_understood, version)
+
+
+def _is_text_list(value, allow_empty=False):
+    return (
+        isinstance(value, list) and (allow_empty or bool(value))
+        and all(isinstance(item, str) and item.strip() for item in value)
+    )
+
+
+def _validate_answer(spec, where, data, errors):
+    """Validasi field jawaban entry/varian: template 'answer' atau 'items' (+ 'title', 'empty')"""
+    for field in ("answer", "title", "empty"):
+        if field in spec and not isinstance(spec[field], str):
+            errors.append(f"{where}.{field}: harus berupa string")
+    if "items" in spec:
+        if not _is_text_list(spec["items"], allow_empty=True):
+            errors.append(f"{where}.items: harus berupa list string")
+    elif not isinstance(spec.get("answer"), str) or not spec["answer"].strip():
+        errors.append(f"{where}: butuh 'answer' atau 'items'")
+        return
+
+    if isinstance(spec.get("answer"), str):
+        try:
+            fields = {
+                name.split(".")[0].split("[")[0]
+                for _, name, _, _ in string.Formatter().parse(spec["answer"]) if name
+            }
+        except ValueError as e:
+            errors.append(f"{where}.answer: template tidak valid ({e})")
+            return
+        missing = sorted(fields - set(data))
+        if missing:
+            errors.append(f"{where}.answer: field template tidak ada di 'data': {', '.join(missing)}")
+
+
+def validate_knowledge_base(kb):
+    """
+    Validasi ketat struktur KB (langkah build index). Mengembalikan list pesan error,
+    kosong jika valid. Format lama hanya diperiksa bagian yang dipakai kompilasi.
+    """
+    if not isinstance(kb, dict):
+        return ["KB harus berupa object JSON"]
+
+    if "entries" not in kb:
+        return [
+            f"{category}: harus berupa object yang tidak kosong"
+            for category in LEGACY_COMPILERS
+            if not isinstance(kb.get(category), dict) or not kb[category]
+        ]
+
+    entries = kb["entries"]
+    if not isinstance(entries, list) or not entries:
+        return ["entries: harus berupa list yang tidak kosong"]
+
+    errors = []
+    seen = set()
+    for i, entry in enumerate(entries):
+        where = f"entries[{i}]"
+        if not isinstance(entry, dict):
+            errors.append(f"{where}: harus berupa object")
+            continue
+
+        category = entry.get("category")
+        if not isinstance(category, str) or not category.strip():
+            errors.append(f"{where}.category: harus berupa string yang tidak kosong")
+        elif category in seen:
+            errors.append(f"{where}.category: kategori duplikat '{category}'")
+        else:
+            seen.add(category)
+            where = f"entries[{i}] ({category})"
+
+        if not _is_text_list(entry.get("keywords")):
+            errors.append(f"{where}.keywords: harus berupa list string yang tidak kosong")
+        if "questions" in entry and not _is_text_list(entry["questions"], allow_empty=True):
+            errors.append(f"{where}.questions: harus berupa list string")
+
+        data = entry.get("data", {})
+        if not isinstance(data, dict):
+            errors.append(f"{where}.data: harus berupa object")
+            data = {}
+        _validate_answer(entry, where, data, errors)
+
+        variants = entry.get("variants", [])
+        if not isinstance(variants, list):
+            errors.append(f"{where}.variants: harus berupa list")
+            continue
+        for j, variant in enumerate(variants):
+            variant_where = f"{where}.variants[{j}]"
+            if not isinstance(variant, dict):
+                errors.append(f"{variant_where}: harus berupa object")
+                continue
+            if not isinstance(variant.get("trigger"), str) or not variant["trigger"].strip():
+                errors.append(f"{variant_where}.trigger: harus berupa string yang tidak kosong")
+            _validate_answer(variant, variant_where, data, errors)
+
+    return errors
+
+
+class KnowledgeBaseWatcher:
+    """Thread yang memantau mtime file KB dan memanggil reload() saat file berubah"""
+
+    def __init__(self, path, reload, interval):
+        self.path = path
+        self.reload = reload
+        self.interval = interval
+        self._mtime = self._current_mtime()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _current_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            mtime = self._current_mtime()
+            if mtime is None or mtime == self._mtime:
+                continue
+            self._mtime = mtime
+            logger.info(f"Perubahan knowledge base terdeteksi: {self.path}")
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"Error reload knowledge base: {str(e)}")
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="kb-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
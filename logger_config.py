@@ -1,46 +1,212 @@
 """
 Logging configuration untuk chatbot
 """
+import atexit
+import itertools
+import json
 import logging
 import logging.handlers
 import os
-from config import LOG_LEVEL, LOG_FILE
+import queue
+from config import (
+    LOG_LEVEL, LOG_FILE, LOG_FORMAT, LOG_QUEUE_ENABLED, LOG_QUEUE_SIZE,
+    LOG_QUEUE_POLICY, LOG_SAMPLING
+)
+
+_listener = None
+_queue_handler = None
+_configured = False
+
+
+class JsonFormatter(logging.Formatter):
+    """Format satu record sebagai satu baris JSON (JSON lines)"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": record.filename,
+            "line": record.lineno,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Loloskan hanya sebagian record INFO dari logger bervolume tinggi.
+    rates: dict nama logger -> rasio (0.1 = 1 dari 10 record). Level lain selalu lolos.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+        self._counters = {name: itertools.count() for name in rates}
+
+    def filter(self, record):
+        if record.levelno != logging.INFO:
+            return True
+        rate = self.rates.get(record.name)
+        if rate is None or rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+        return next(self._counters[record.name]) % round(1 / rate) == 0
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler dengan antrian terbatas: saat penuh record di-drop atau pemanggil menunggu"""
+
+    def __init__(self, log_queue, policy="drop"):
+        super().__init__(log_queue)
+        self.policy = policy
+        self.dropped = 0
+
+    def enqueue(self, record):
+        if self.policy == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sampling(spec):
+    """Parse 'chatbot.requests=0.1,chatbot.other=0.5' menjadi dict"""
+    rates = {}
+    for item in (spec or "").split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+def start_queue_logging(logger):
+    """
+    Pindahkan handler logger ke thread listener lewat BoundedQueueHandler/QueueListener
+    sehingga pemanggil log tidak menunggu I/O console/file. Aman dipanggil berulang;
+    mengembalikan listener yang aktif.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return _listener
+
+    handlers = [h for h in logger.handlers if not isinstance(h, logging.handlers.QueueHandler)]
+    for handler in handlers:
+        logger.removeHandler(handler)
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _queue_handler = BoundedQueueHandler(log_queue, policy=LOG_QUEUE_POLICY)
+    logger.addHandler(_queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_queue_logging():
+    """Hentikan listener dan tulis semua record yang masih di antrian"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def queue_logging_stats():
+    """Statistik antrian logging untuk health check"""
+    if _queue_handler is None:
+        return {"enabled": False}
+    return {
+        "enabled": _listener is not None,
+        "policy": _queue_handler.policy,
+        "queued": _queue_handler.queue.qsize(),
+        "dropped": _queue_handler.dropped
+    }
+
+
+def _restart_queue_logging_after_fork():
+    """
+    Thread listener tidak ikut ter-fork. Worker hasil fork (gunicorn --preload)
+    mendapat antrian dan listener baru dengan handler yang sama.
+    """
+    global _listener
+    if _listener is None:
+        return
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _queue_handler.queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
 
 def setup_logging():
-    """Setup logging dengan file dan console handlers"""
-    
+    """
+    Setup logging dengan file dan console handlers. Dipanggil oleh create_app/entry
+    point, bukan saat import; panggilan berikutnya tidak menambah handler lagi.
+    """
+    global _configured
+    logger = logging.getLogger('chatbot')
+    if _configured:
+        return logger
+    _configured = True
+
     # Create logs directory jika tidak ada
     if not os.path.exists('logs'):
         os.makedirs('logs')
-    
+
     # Setup logger
-    logger = logging.getLogger('chatbot')
     logger.setLevel(getattr(logging, LOG_LEVEL))
-    
+
     # Format logging
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
+    if LOG_FORMAT == 'json':
+        formatter = JsonFormatter(datefmt='%Y-%m-%d %H:%M:%S')
+    else:
+        formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
+
     # Console Handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(getattr(logging, LOG_LEVEL))
     console_handler.setFormatter(formatter)
     logger.addHandler(console_handler)
-    
-    # File Handler dengan rotation
+
+    # File Handler dengan rotation, file baru dibuka saat record pertama ditulis
     log_path = f'logs/{LOG_FILE}'
     file_handler = logging.handlers.RotatingFileHandler(
         log_path,
         maxBytes=5*1024*1024,  # 5MB
-        backupCount=5
+        backupCount=5,
+        delay=True
     )
     file_handler.setLevel(getattr(logging, LOG_LEVEL))
     file_handler.setFormatter(formatter)
     logger.addHandler(file_handler)
-    
+
+    # Sampling dipasang di logger yang di-sampling, sehingga berlaku dengan atau tanpa
+    # antrian dan record yang dibuang tidak sempat masuk antrian
+    rates = parse_sampling(LOG_SAMPLING)
+    if rates:
+        sampling = SamplingFilter(rates)
+        for name in rates:
+            logging.getLogger(name).addFilter(sampling)
+
+    # Console/file I/O dikerjakan thread listener, request thread hanya enqueue
+    if LOG_QUEUE_ENABLED:
+        start_queue_logging(logger)
+        atexit.register(stop_queue_logging)
+
     return logger
 
-# Initialize logger
-logger = setup_logging()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_queue_logging_after_fork)
+
+# Logger aplikasi; handler dipasang oleh setup_logging()
+logger = logging.getLogger('chatbot')
+
+# Logger untuk baris INFO per-request (bisa di-sampling lewat LOG_SAMPLING)
+request_logger = logging.getLogger('chatbot.requests')
@@ -0,0 +1,184 @@
+"""
+Mode matching multi-core: fuzzy scoring dikirim ke process pool yang sudah
+di-warm-up, sehingga deployment threaded tidak tertahan GIL di satu core.
+
+Setiap worker memegang salinan IntentMatcher sendiri yang dikirim sekali saat
+worker start (initializer), bukan di-pickle per task. Task hanya membawa teks
+input. Jika antrian pool penuh, task timeout, atau pool rusak, matching
+dijalankan di proses ini sebagai fallback.
+
+Catatan start method: 'fork' (default di Linux) mewarisi matcher tanpa pickle.
+'spawn'/'forkserver' meng-import ulang modul __main__ di setiap worker; pakai
+hanya jika server dijalankan lewat gunicorn/uvicorn, bukan `python app.py`.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from logger_config import logger
+from config import (
+    MATCHER_POOL_WORKERS, MATCHER_POOL_MAX_PENDING, MATCHER_POOL_CHUNK_SIZE,
+    MATCHER_POOL_TIMEOUT, MATCHER_POOL_START_METHOD
+)
+
+# Matcher milik proses worker, diisi oleh _init_worker
+_worker_matcher = None
+
+
+def _init_worker(matcher):
+    global _worker_matcher
+    _worker_matcher = matcher
+
+
+def _worker_ready(delay):
+    time.sleep(delay)
+    return os.getpid()
+
+
+def _worker_match(user_input, prefer=None):
+    return _worker_matcher.match(user_input, prefer)
+
+
+def _worker_match_detail(user_input, prefer=None):
+    return _worker_matcher.match_detail(user_input, prefer)
+
+
+def _worker_match_many(inputs):
+    return _worker_matcher.match_many(inputs)
+
+
+class MatcherPool:
+    """
+    Process pool untuk IntentMatcher.match/match_many dengan back-pressure:
+    paling banyak max_pending task berjalan/antri; selebihnya dihitung di proses ini.
+    """
+
+    # Caller di event loop (ASGI) sebaiknya memanggil lewat thread pool
+    blocking = True
+
+    def __init__(self, matcher, workers=MATCHER_POOL_WORKERS, max_pending=MATCHER_POOL_MAX_PENDING,
+                 chunk_size=MATCHER_POOL_CHUNK_SIZE, timeout=MATCHER_POOL_TIMEOUT,
+                 start_method=MATCHER_POOL_START_METHOD):
+        self.matcher = matcher
+        self.workers = workers
+        self.max_pending = max_pending if max_pending > 0 else workers * 4
+        self.chunk_size = max(1, chunk_size)
+        self.timeout = timeout if timeout > 0 else None
+        self.start_method = start_method
+        self.submitted = 0
+        self.saturated = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.restarts = 0
+        self._closed = False
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._executor = self._create_executor()
+        self._warm_up()
+
+    def _create_executor(self):
+        methods = multiprocessing.get_all_start_methods()
+        method = self.start_method if self.start_method in methods else methods[0]
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(method),
+            initializer=_init_worker,
+            initargs=(self.matcher,)
+        )
+
+    def _warm_up(self):
+        """Start semua worker sekarang (bukan saat request pertama) dan tunggu sampai siap"""
+        start = time.perf_counter()
+        futures = [self._executor.submit(_worker_ready, 0.05) for _ in range(self.workers)]
+        pids = {future.result() for future in futures}
+        logger.info(f"Matcher pool siap: {len(pids)} worker dalam {time.perf_counter() - start:.2f}s")
+
+    def _restart(self, executor, error):
+        """Ganti executor yang rusak (worker mati); task berikutnya memakai pool baru"""
+        with self._lock:
+            if self._closed or self._executor is not executor:
+                return
+            logger.error(f"Matcher pool rusak, worker dibuat ulang: {str(error)}")
+            self.restarts += 1
+            self._executor = self._create_executor()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, func, *args):
+        """Kirim task ke pool, None jika pool penuh/sudah ditutup (caller menghitung sendiri)"""
+        if self._closed:
+            return None
+        if not self._slots.acquire(blocking=False):
+            self.saturated += 1
+            return None
+        executor = self._executor
+        try:
+            future = executor.submit(func, *args)
+        except (BrokenProcessPool, RuntimeError) as e:
+            self._slots.release()
+            self._restart(executor, e)
+            return None
+        self.submitted += 1
+        future.add_done_callback(lambda _: self._slots.release())
+        future.executor = executor
+        return future
+
+    def _result(self, future, fallback, *args):
+        """Hasil task, atau hasil fallback(*args) di proses ini jika task gagal/timeout"""
+        if future is not None:
+            try:
+                return future.result(timeout=self.timeout)
+            except FuturesTimeout:
+                self.timeouts += 1
+                future.cancel()
+            except BrokenProcessPool as e:
+                self._restart(future.executor, e)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Error di matcher pool: {str(e)}")
+        return fallback(*args)
+
+    def match(self, user_input, prefer=None):
+        """Sama seperti IntentMatcher.match, dihitung di worker"""
+        return self._result(
+            self._submit(_worker_match, user_input, prefer), self.matcher.match, user_input, prefer
+        )
+
+    def match_detail(self, user_input, prefer=None):
+        """Sama seperti IntentMatcher.match_detail, dihitung di worker"""
+        return self._result(
+            self._submit(_worker_match_detail, user_input, prefer), self.matcher.match_detail, user_input, prefer
+        )
+
+    def match_many(self, inputs):
+        """
+        Sama seperti IntentMatcher.match_many. Input unik dibagi per chunk_size ke
+        beberapa worker sekaligus; chunk yang tidak mendapat slot dihitung di proses ini.
+        """
+        unique = list(dict.fromkeys(user_input.lower().strip() for user_input in inputs))
+        chunks = [unique[i:i + self.chunk_size] for i in range(0, len(unique), self.chunk_size)]
+        futures = [self._submit(_worker_match_many, chunk) for chunk in chunks]
+
+        results = {}
+        for chunk, future in zip(chunks, futures):
+            results.update(zip(chunk, self._result(future, self.matcher.match_many, chunk)))
+        return [results[user_input.lower().strip()] for user_input in inputs]
+
+    def shutdown(self, wait=False):
+        """Tutup pool (misal setelah KB di-reload); task yang sedang berjalan tetap diselesaikan"""
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=wait)
+
+    def stats(self):
+        """Statistik pool untuk health check dan metrics"""
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "submitted": self.submitted,
+            "saturated": self.saturated,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "restarts": self.restarts
+        }
@@ -0,0 +1,413 @@
+"""
+Intent matcher yang dikompilasi sekali dari tabel keyword
+"""
+import re
+from rapidfuzz import fuzz, process
+from retrieval import BM25Index
+from spelling import SpellingIndex
+from config import (
+    MIN_CONFIDENCE_SCORE, MATCHER_FULL_SCAN_LIMIT, MATCHER_CANDIDATES, SPELLING_MAX_DISTANCE, CONTEXT_BIAS
+)
+
+GREETING_PATTERN = re.compile(
+    r"\b(halo|hai|hallo|selamat|pagi|siang|sore|assalamualaikum|makasih|terima kasih)\b"
+)
+# Partikel/klitik yang menempel di kata: "sanksinya" -> "sanksi", "jadwalnya" -> "jadwal"
+CLITICS = ("nya", "lah", "kah", "pun")
+_NON_WORD = re.compile(r"(?ui)\W")
+_WORD = re.compile(r'\b\w+\b')
+
+
+def normalize(text):
+    """Normalisasi teks seperti full_process fuzzywuzzy (ASCII, lowercase, non-alnum -> spasi)"""
+    if not text:
+        return ""
+    text = text.encode('ascii', 'ignore').decode('ascii')
+    return _NON_WORD.sub(" ", text).lower().strip()
+
+
+class IntentMatcher:
+    """
+    Matcher kategori yang menyimpan keyword dalam bentuk siap pakai:
+    - keyword sudah dinormalisasi dan di-tokenize
+    - inverted index token -> keyword untuk kecocokan penuh (skor 100)
+    - klitik (-nya/-lah/-kah/-pun) dilepas dari token yang kata dasarnya token keyword
+    - koreksi ejaan token input ke token keyword, hanya jika input apa adanya tidak
+      cocok ke kategori mana pun, sehingga salah ketik tetap kena inverted index
+    - scoring fuzzy batch via rapidfuzz.process untuk sisanya
+    - jika jumlah keyword melebihi full_scan_limit, fuzzy scoring hanya dilakukan
+      pada kategori kandidat teratas dari index BM25 (keyword + teks tambahan per kategori)
+    - kategori prefer (konteks percakapan, lihat conversation.py) didahulukan jika
+      exact hit seri, dan skor fuzzy-nya ditambah bias
+    """
+
+    def __init__(self, keywords, min_score=MIN_CONFIDENCE_SCORE, documents=None,
+                 full_scan_limit=MATCHER_FULL_SCAN_LIMIT, candidate_limit=MATCHER_CANDIDATES,
+                 spelling_distance=SPELLING_MAX_DISTANCE):
+        self.min_score = min_score
+        self.candidate_limit = candidate_limit
+        self.categories = []
+        self.raw_keywords = {}
+        self.normalized_keywords = {}
+        self._choices = []
+        self._choice_category = []
+        self._choice_size = []
+        self._category_choices = []
+        self._token_index = {}
+        self._retrieval = None
+        self._spelling = None
+
+        for cat, words in keywords.items():
+            if not words or not isinstance(words, list):
+                continue
+            cat_idx = len(self.categories)
+            self.categories.append(cat)
+            self.raw_keywords[cat] = [kw.lower() for kw in words]
+            self.normalized_keywords[cat] = [normalize(kw) for kw in words]
+
+            self._category_choices.append([])
+
+            for kw in self.normalized_keywords[cat]:
+                tokens = set(kw.split())
+                if not tokens:
+                    continue
+                kid = len(self._choices)
+                self._category_choices[cat_idx].append(kid)
+                self._choices.append(kw)
+                self._choice_category.append(cat_idx)
+                self._choice_size.append(len(tokens))
+                for token in tokens:
+                    self._token_index.setdefault(token, []).append(kid)
+
+        documents = documents or {}
+        if spelling_distance > 0:
+            self._spelling = SpellingIndex(
+                (token for kw in self._choices for token in kw.split()),
+                # Kata dari teks pertanyaan KB adalah kata sungguhan: tidak dikoreksi, bukan target
+                (token for texts in documents.values() for text in texts for token in normalize(text).split()),
+                max_distance=spelling_distance
+            )
+
+        if len(self._choices) > full_scan_limit:
+            self._retrieval = BM25Index([
+                " ".join(self.normalized_keywords[cat] + [normalize(text) for text in documents.get(cat, ())])
+                for cat in self.categories
+            ])
+
+    def __len__(self):
+        return len(self._choices)
+
+    def strip_clitics(self, normalized):
+        """Lepas klitik dari token yang kata dasarnya token keyword ("kalau sanksinya" -> "kalau sanksi")"""
+        tokens = normalized.split()
+        stripped = []
+        for token in tokens:
+            if token not in self._token_index:
+                for clitic in CLITICS:
+                    if token.endswith(clitic) and token[:-len(clitic)] in self._token_index:
+                        token = token[:-len(clitic)]
+                        break
+            stripped.append(token)
+        return " ".join(stripped) if stripped != tokens else normalized
+
+    def correct(self, user_input_lower, normalized):
+        """
+        (user_input_lower, normalized) setelah koreksi ejaan. Jika ada token yang
+        dikoreksi, keduanya diganti teks hasil koreksi agar scoring dan single-token
+        safeguard menilai kata yang dimaksud user; selain itu dikembalikan apa adanya.
+        """
+        if self._spelling is None:
+            return user_input_lower, normalized
+        tokens = normalized.split()
+        corrected = [self._spelling.correct(token) for token in tokens]
+        if corrected == tokens:
+            return user_input_lower, normalized
+        corrected = " ".join(corrected)
+        return corrected, corrected
+
+    def tokens(self, user_input):
+        """Token input setelah normalisasi, pelepasan klitik, dan koreksi ejaan"""
+        user_input_lower = user_input.lower().strip()
+        return self.correct(user_input_lower, self.strip_clitics(normalize(user_input_lower)))[1].split()
+
+    def _exact_hits(self, tokens):
+        """
+        Index kategori (urut) yang punya keyword dengan skor token_set_ratio 100 lewat
+        inverted index. Skor 100 terjadi jika token keyword subset dari input atau sebaliknya.
+        """
+        counts = {}
+        for token in tokens:
+            for kid in self._token_index.get(token, ()):
+                counts[kid] = counts.get(kid, 0) + 1
+        return sorted({
+            self._choice_category[kid] for kid, count in counts.items()
+            if count == self._choice_size[kid] or count == len(tokens)
+        })
+
+    def _exact_hit(self, tokens, prefer=None):
+        """Kategori exact hit: kategori prefer jika ikut kena, selain itu yang paling awal"""
+        hits = self._exact_hits(tokens)
+        for cat_idx in hits:
+            if self.categories[cat_idx] == prefer:
+                return cat_idx
+        return hits[0] if hits else None
+
+    def best_category(self, normalized_input, prefer=None, bias=CONTEXT_BIAS):
+        """
+        Kembalikan (kategori, skor) terbaik untuk input yang sudah dinormalisasi.
+        Skor di bawah min_score tidak dihitung dan dikembalikan sebagai (None, 0).
+        Skor kategori prefer ditambah bias (maks 100) dan menang jika seri.
+        """
+        return self._rank(normalized_input, prefer, bias)[:2]
+
+    def _rank(self, normalized_input, prefer=None, bias=CONTEXT_BIAS):
+        """
+        best_category plus contenders: kategori lain yang akan menang jika menjadi
+        kategori prefer (ikut exact hit, atau skor + bias >= skor terbaik), dan skor
+        pemenang tanpa bias.
+        """
+        tokens = set(normalized_input.split())
+        if not tokens or not self._choices:
+            return None, 0, (), 0
+
+        hits = [self.categories[cat_idx] for cat_idx in self._exact_hits(tokens)]
+        if hits:
+            best = prefer if prefer in hits else hits[0]
+            return best, 100, tuple(category for category in hits if category != best), 100
+
+        if self._retrieval is None:
+            choice_ids = None
+            choices = self._choices
+        else:
+            # KB besar: fuzzy scoring hanya untuk keyword kategori kandidat
+            candidates = sorted(doc for doc, _ in self._retrieval.search(normalized_input, self.candidate_limit))
+            choice_ids = [kid for doc in candidates for kid in self._category_choices[doc]]
+            choices = [self._choices[kid] for kid in choice_ids]
+
+        # Cutoff selalu diturunkan sebesar bias agar kategori yang bisa menang dengan konteks ikut terlihat
+        results = process.extract(
+            normalized_input,
+            choices,
+            scorer=fuzz.token_set_ratio,
+            processor=None,
+            limit=None,
+            score_cutoff=self.min_score - bias - 0.5
+        )
+
+        # Skor mentah terbaik per kategori
+        raw = {}
+        for _, score, kid in results:
+            if choice_ids is not None:
+                kid = choice_ids[kid]
+            cat_idx = self._choice_category[kid]
+            if score > raw.get(cat_idx, -1.0):
+                raw[cat_idx] = score
+
+        # Skor tertinggi menang; jika seri, kategori prefer lalu kategori paling awal
+        floor = self.min_score - (bias if prefer is not None else 0) - 0.5
+        best = None
+        for cat_idx, score in raw.items():
+            if score < floor:
+                continue
+            score = int(round(score))
+            preferred = prefer is not None and self.categories[cat_idx] == prefer
+            if preferred:
+                score = min(100, score + bias)
+            rank = (score, preferred, -cat_idx)
+            if best is None or rank > best:
+                best = rank
+
+        best_idx = -best[2] if best is not None else None
+        threshold = best[0] if best is not None else self.min_score
+        contenders = tuple(
+            self.categories[cat_idx] for cat_idx, score in sorted(raw.items())
+            if cat_idx != best_idx and int(round(score)) + bias >= threshold
+        )
+        if best is None:
+            return None, 0, contenders, 0
+        return self.categories[best_idx], best[0], contenders, int(round(raw[best_idx]))
+
+    def is_strong_token(self, token, category):
+        """Cek apakah satu token cocok kuat (exact, substring, atau similarity >= 90) dengan kategori"""
+        for kw in self.raw_keywords.get(category, ()):
+            if token == kw or token in kw or kw in token:
+                return True
+
+        normalized_token = normalize(token)
+        if not normalized_token:
+            return False
+        strong = process.extractOne(
+            normalized_token,
+            self.normalized_keywords.get(category, ()),
+            scorer=fuzz.token_set_ratio,
+            processor=None,
+            score_cutoff=89.5
+        )
+        return strong is not None and int(round(strong[1])) >= 90
+
+    def _decide(self, user_input_lower, best_cat, best_score):
+        """Aturan akhir setelah scoring: input pendek, single-token safeguard, threshold"""
+        # Input sangat pendek butuh threshold lebih tinggi
+        if len(user_input_lower) <= 4 and best_score < max(80, self.min_score):
+            return None, best_score
+
+        # Single-token safeguard: satu kata harus cocok sangat kuat
+        tokens = _WORD.findall(user_input_lower)
+        if len(tokens) == 1 and best_cat is not None:
+            if not self.is_strong_token(tokens[0], best_cat):
+                return None, best_score
+
+        if best_score < self.min_score:
+            return None, best_score
+        return best_cat, best_score
+
+    def match(self, user_input, prefer=None):
+        """
+        Cocokkan input dengan kategori. Mengembalikan (kategori, skor);
+        kategori None berarti ambiguous atau tidak dikenali.
+        prefer: kategori giliran sebelumnya di percakapan ini, atau None.
+        """
+        return self.match_detail(user_input, prefer)[:2]
+
+    def match_detail(self, user_input, prefer=None):
+        """
+        match() plus contenders: kategori yang bisa menggantikan hasil ini jika menjadi
+        kategori prefer (konteks percakapan). Hasil tanpa prefer berlaku untuk session
+        yang kategori konteksnya bukan contender.
+        """
+        user_input_lower = user_input.lower().strip()
+
+        # Sapaan eksplisit langsung jadi 'greeting'
+        if GREETING_PATTERN.search(user_input_lower):
+            return "greeting", 100, ()
+
+        normalized = self.strip_clitics(normalize(user_input_lower))
+        best_cat, best_score, contenders, raw_score = self._rank(normalized, prefer)
+        result = self._decide(user_input_lower, best_cat, best_score)
+        if result[0] is not None:
+            # Bias konteks hanya menentukan pemenang; skor yang dilaporkan tetap skor input
+            return result[0], raw_score, contenders
+
+        # Koreksi ejaan hanya untuk input yang apa adanya tidak cocok ke kategori mana pun
+        corrected_lower, corrected = self.correct(user_input_lower, normalized)
+        if corrected_lower is user_input_lower:
+            return result + (contenders,)
+        # Sapaan yang salah ketik ("trima kasih") baru terlihat setelah dikoreksi
+        if GREETING_PATTERN.search(corrected):
+            return "greeting", 100, contenders
+        best_cat, best_score, corrected_contenders, raw_score = self._rank(corrected, prefer)
+        contenders = tuple(dict.fromkeys(contenders + corrected_contenders))
+        corrected_result = self._decide(corrected_lower, best_cat, best_score)
+        if corrected_result[0] is not None:
+            return corrected_result[0], raw_score, contenders
+        return result + (contenders,)
+
+    def category_score(self, user_input, category):
+        """Skor input (setelah koreksi ejaan) terhadap keyword satu kategori, 0 jika di bawah min_score"""
+        normalized = " ".join(self.tokens(user_input))
+        keywords = self.normalized_keywords.get(category)
+        if not normalized or not keywords:
+            return 0
+        tokens = set(normalized.split())
+        if any(self.categories[cat_idx] == category for cat_idx in self._exact_hits(tokens)):
+            return 100
+        best = process.extractOne(
+            normalized, keywords, scorer=fuzz.token_set_ratio, processor=None, score_cutoff=self.min_score - 0.5
+        )
+        return int(round(best[1])) if best is not None else 0
+
+    def match_many(self, inputs):
+        """
+        Versi batch dari match(). Input identik (setelah lowercase/strip) hanya dihitung sekali,
+        dan semua input yang butuh fuzzy scoring dinilai sekaligus dengan rapidfuzz.process.cdist.
+        Mengembalikan list (kategori, skor) sesuai urutan input.
+        """
+        if self._retrieval is not None:
+            # KB besar: cdist terhadap semua keyword terlalu mahal, pakai jalur kandidat per input
+            unique = {}
+            for user_input in inputs:
+                key = user_input.lower().strip()
+                if key not in unique:
+                    unique[key] = self.match(user_input)
+            return [unique[user_input.lower().strip()] for user_input in inputs]
+
+        unique = {}
+        for user_input in inputs:
+            unique.setdefault(user_input.lower().strip(), None)
+
+        pending = {}
+        for key in unique:
+            if GREETING_PATTERN.search(key):
+                unique[key] = ("greeting", 100)
+            else:
+                pending[key] = (key, self.strip_clitics(normalize(key)))
+        self._score_batch(pending, unique)
+
+        # Koreksi ejaan hanya untuk input yang apa adanya tidak cocok (sama seperti match)
+        corrected = {}
+        for key, (user_input_lower, normalized) in pending.items():
+            if unique[key][0] is not None:
+                continue
+            corrected_lower, corrected_normalized = self.correct(user_input_lower, normalized)
+            if corrected_lower is user_input_lower:
+                continue
+            if GREETING_PATTERN.search(corrected_normalized):
+                unique[key] = ("greeting", 100)
+            else:
+                corrected[key] = (corrected_lower, corrected_normalized)
+        if corrected:
+            results = {}
+            self._score_batch(corrected, results)
+            for key, result in results.items():
+                if result[0] is not None:
+                    unique[key] = result
+
+        return [unique[user_input.lower().strip()] for user_input in inputs]
+
+    def _score_batch(self, items, results):
+        """
+        Isi results[key] = (kategori, skor) untuk items {key: (user_input_lower, normalized)}:
+        exact hit lewat inverted index, sisanya dinilai sekaligus dengan rapidfuzz.process.cdist.
+        """
+        pending = []
+        for key, (user_input_lower, normalized) in items.items():
+            tokens = set(normalized.split())
+            if not tokens or not self._choices:
+                results[key] = self._decide(user_input_lower, None, 0)
+                continue
+
+            cat_idx = self._exact_hit(tokens)
+            if cat_idx is not None:
+                results[key] = self._decide(user_input_lower, self.categories[cat_idx], 100)
+            else:
+                pending.append((key, user_input_lower, normalized))
+
+        if not pending:
+            return
+        # numpy hanya dibutuhkan jalur batch; tidak di-import saat startup
+        import numpy as np
+        scores = process.cdist(
+            [normalized for _, _, normalized in pending],
+            self._choices,
+            scorer=fuzz.token_set_ratio,
+            processor=None,
+            score_cutoff=self.min_score - 0.5,
+            dtype=np.float32,
+            workers=-1
+        )
+        scores = np.rint(scores)
+        choice_category = np.asarray(self._choice_category)
+        # Skor terbaik per kategori, argmax memilih kategori paling awal jika seri (sama seperti match)
+        per_category = np.stack(
+            [scores[:, choice_category == idx].max(axis=1) if np.any(choice_category == idx)
+             else np.zeros(len(pending), dtype=scores.dtype)
+             for idx in range(len(self.categories))],
+            axis=1
+        )
+        best_idx = per_category.argmax(axis=1)
+        best_scores = per_category.max(axis=1)
+
+        for row, (key, user_input_lower, _) in enumerate(pending):
+            best_score = int(best_scores[row])
+            best_cat = self.categories[best_idx[row]] if best_score > 0 else None
+            results[key] = self._decide(user_input_lower, best_cat, best_score)
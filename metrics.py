@@ -0,0 +1,271 @@
+"""
+Metrics ringan dengan format teks Prometheus (untuk endpoint /metrics).
+
+Counter dan histogram menyimpan nilainya per thread (shard), sehingga jalur
+request tidak mengambil lock dan tidak menulis log; shard baru dijumlahkan saat
+/metrics di-scrape. Shard milik thread yang sudah selesai (server threaded membuat
+thread per request) digabung ke satu shard dasar, jadi jumlah shard mengikuti
+jumlah thread yang masih hidup. Nilai yang sudah dihitung di tempat lain (stats cache, store,
+rate limiter) diekspos lewat callback saat render.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Bucket latency (detik): 50us - 10s
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_START_TIME = time.time()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Shards:
+    """
+    Satu dict per thread; collect() mengembalikan semua dict untuk dijumlahkan.
+    combine(a, b) menjumlahkan dua nilai per label tanpa mengubah keduanya.
+    """
+
+    def __init__(self, combine):
+        self._combine = combine
+        self._local = threading.local()
+        self._all = []
+        self._base = {}
+        self._lock = threading.Lock()
+
+    def _prune(self):
+        """Gabungkan shard thread yang sudah selesai ke shard dasar (dipanggil dengan _lock)"""
+        live = []
+        for thread, shard in self._all:
+            if thread.is_alive():
+                live.append((thread, shard))
+                continue
+            # Thread sudah selesai, shard-nya tidak akan berubah lagi
+            for labels, value in shard.items():
+                base = self._base.get(labels)
+                self._base[labels] = value if base is None else self._combine(base, value)
+        self._all = live
+
+    def get(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._prune()
+                self._all.append((threading.current_thread(), shard))
+            return shard
+
+    def collect(self):
+        with self._lock:
+            self._prune()
+            return [dict(self._base)] + [dict(shard) for _, shard in self._all]
+
+    def __len__(self):
+        """Jumlah shard thread yang masih disimpan terpisah"""
+        with self._lock:
+            return len(self._all)
+
+
+def _add_states(a, b):
+    return [x + y for x, y in zip(a, b)]
+
+
+class Counter:
+    """Counter monoton dengan label opsional"""
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._shards = _Shards(lambda a, b: a + b)
+
+    def inc(self, *labels, amount=1):
+        shard = self._shards.get()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self):
+        totals = {}
+        for shard in self._shards.collect():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def render(self):
+        return [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+            for labels, value in sorted(self.values().items())
+        ]
+
+
+class Histogram:
+    """Histogram dengan bucket tetap; state per label = [count per bucket..., +Inf, sum]"""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._shards = _Shards(_add_states)
+
+    def observe(self, value, *labels):
+        shard = self._shards.get()
+        state = shard.get(labels)
+        if state is None:
+            state = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def values(self):
+        totals = {}
+        for shard in self._shards.collect():
+            for labels, state in shard.items():
+                total = totals.get(labels)
+                if total is None:
+                    totals[labels] = list(state)
+                else:
+                    for i, value in enumerate(state):
+                        total[i] += value
+        return totals
+
+    def render(self):
+        lines = []
+        for labels, state in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                le = f'le="{_number(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(state[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Callback:
+    """
+    Metric yang nilainya diambil dari func() saat render. func mengembalikan angka,
+    atau dict {tuple nilai label: angka} jika labelnames diisi.
+    """
+
+    def __init__(self, name, documentation, func, labelnames=(), type="gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.func = func
+        self.labelnames = tuple(labelnames)
+        self.type = type
+
+    def render(self):
+        values = self.func()
+        if values is None:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+            for labels, value in sorted(values.items())
+            if value is not None
+        ]
+
+
+class MetricsRegistry:
+    """Kumpulan metric yang dirender bersama ke format teks Prometheus"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, func, labelnames=(), type="gauge"):
+        return self.register(Callback(name, documentation, func, labelnames, type))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.render()
+            except Exception:
+                # Satu callback yang gagal (misal redis down) tidak boleh menggagalkan scrape
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+def process_rss_bytes():
+    """Resident set size proses saat ini (Linux /proc), fallback ke peak RSS dari getrusage"""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        import sys
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+    except Exception:
+        return None
+
+
+REGISTRY = MetricsRegistry()
+
+REQUESTS = REGISTRY.counter(
+    "chatbot_http_requests_total", "Jumlah request HTTP per route, method dan status",
+    ("route", "method", "status")
+)
+REQUEST_LATENCY = REGISTRY.histogram(
+    "chatbot_http_request_duration_seconds", "Latency request HTTP per route",
+    ("route", "method")
+)
+STAGE_LATENCY = REGISTRY.histogram(
+    "chatbot_stage_duration_seconds",
+    "Latency per tahap pemrosesan chat (match, generate, history_append, logging)",
+    ("stage",)
+)
+CATEGORIES = REGISTRY.counter(
+    "chatbot_responses_total", "Jumlah respons chat per kategori (none = tidak dikenali/ambigu)",
+    ("category",)
+)
+
+REGISTRY.callback("process_resident_memory_bytes", "Resident memory proses (bytes)", process_rss_bytes)
+REGISTRY.callback("process_cpu_seconds_total", "Waktu CPU proses (detik)", time.process_time, type="counter")
+REGISTRY.callback("process_start_time_seconds", "Waktu start proses (unix epoch)", lambda: _START_TIME)
@@ -0,0 +1,231 @@
+"""
+Rate limiter sliding-window-counter dengan memory tetap per client.
+Backend:
+- memory: per-proses, waktu monotonic, client idle di-evict
+- sqlite: file SQLite yang dibagi semua worker di satu node
+- redis: server Redis, dibagi antar worker dan node
+"""
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from logger_config import logger
+from history_store import connect_redis
+from config import RATE_LIMIT_BACKEND, RATE_LIMIT_DB_PATH, RATE_LIMIT_MAX_CLIENTS, REDIS_URL
+
+
+def _estimate(prev_count, curr_count, now, window):
+    """Perkiraan jumlah request dalam window geser: sisa bobot window sebelumnya + window sekarang"""
+    elapsed = (now % window) / window
+    return prev_count * (1 - elapsed) + curr_count
+
+
+def _retry_after(prev_count, curr_count, now, window, limit):
+    """Detik sampai perkiraan request turun di bawah limit"""
+    if prev_count <= 0:
+        return max(1, math.ceil(window - now % window))
+    # prev * (1 - (t / window)) + curr < limit  ->  t > window * (1 - (limit - curr) / prev)
+    needed = window * (1 - (limit - curr_count) / prev_count) - now % window
+    if needed <= 0 or curr_count >= limit:
+        needed = window - now % window
+    return max(1, math.ceil(needed))
+
+
+class RateLimiter:
+    """Interface rate limiter: hit() mencatat request dan memutuskan diizinkan atau tidak"""
+
+    # True jika hit() melakukan I/O (dijalankan di thread pool pada mode ASGI)
+    blocking = False
+
+    def __init__(self):
+        self.rejected = 0
+
+    def hit(self, key, limit, window):
+        """Catat satu request untuk key. Mengembalikan (allowed, retry_after_detik)"""
+        raise NotImplementedError
+
+    def __len__(self):
+        return 0
+
+    def stats(self):
+        """Statistik limiter untuk health check"""
+        return {"backend": self.name, "clients": len(self), "rejected": self.rejected}
+
+
+class MemoryRateLimiter(RateLimiter):
+    """
+    Sliding window counter per-proses. Tiap client hanya menyimpan
+    (index window, jumlah window sebelumnya, jumlah window sekarang, terakhir dilihat);
+    client yang idle lebih dari dua window atau melewati max_clients di-evict (LRU).
+    """
+
+    name = "memory"
+
+    def __init__(self, max_clients=RATE_LIMIT_MAX_CLIENTS, clock=time.monotonic):
+        super().__init__()
+        self.max_clients = max_clients
+        self.clock = clock
+        self.evicted = 0
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        while self._clients:
+            key, state = next(iter(self._clients.items()))
+            window, last_seen = state[4], state[3]
+            idle = now - last_seen > 2 * window
+            if not idle and (self.max_clients <= 0 or len(self._clients) <= self.max_clients):
+                break
+            del self._clients[key]
+            self.evicted += 1
+
+    def hit(self, key, limit, window):
+        now = self.clock()
+        index = int(now // window)
+        with self._lock:
+            state = self._clients.pop(key, None)
+            if state is None or state[0] < index - 1:
+                prev_count, curr_count = 0, 0
+            elif state[0] == index - 1:
+                prev_count, curr_count = state[2], 0
+            else:
+                prev_count, curr_count = state[1], state[2]
+
+            allowed = _estimate(prev_count, curr_count, now, window) < limit
+            if allowed:
+                curr_count += 1
+            else:
+                self.rejected += 1
+
+            self._clients[key] = (index, prev_count, curr_count, now, window)
+            self._evict(now)
+
+        if allowed:
+            return True, 0
+        return False, _retry_after(prev_count, curr_count, now, window, limit)
+
+    def __len__(self):
+        return len(self._clients)
+
+    def stats(self):
+        stats = super().stats()
+        stats["evicted"] = self.evicted
+        return stats
+
+
+class SQLiteRateLimiter(RateLimiter):
+    """
+    Sliding window counter di SQLite sehingga limit berlaku untuk semua worker
+    di satu node. Memakai wall-clock karena monotonic clock tidak bisa dibandingkan antar proses.
+    """
+
+    name = "sqlite"
+    blocking = True
+
+    def __init__(self, path=RATE_LIMIT_DB_PATH, cleanup_every=1000):
+        super().__init__()
+        self.path = path
+        self.cleanup_every = cleanup_every
+        self._hits = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit ("
+            "key TEXT NOT NULL, "
+            "window_index INTEGER NOT NULL, "
+            "count INTEGER NOT NULL, "
+            "PRIMARY KEY (key, window_index)) WITHOUT ROWID"
+        )
+
+    def hit(self, key, limit, window):
+        now = time.time()
+        index = int(now // window)
+        key = f"{key}:{window}"
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                counts = dict(self._conn.execute(
+                    "SELECT window_index, count FROM rate_limit WHERE key = ? AND window_index >= ?",
+                    (key, index - 1)
+                ).fetchall())
+                prev_count, curr_count = counts.get(index - 1, 0), counts.get(index, 0)
+                allowed = _estimate(prev_count, curr_count, now, window) < limit
+                if allowed:
+                    self._conn.execute(
+                        "INSERT INTO rate_limit (key, window_index, count) VALUES (?, ?, 1) "
+                        "ON CONFLICT(key, window_index) DO UPDATE SET count = count + 1",
+                        (key, index)
+                    )
+
+                # Hapus window lama sesekali agar tabel tidak tumbuh
+                self._hits += 1
+                if self._hits % self.cleanup_every == 0:
+                    self._conn.execute("DELETE FROM rate_limit WHERE window_index < ?", (index - 1,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if allowed:
+            return True, 0
+        self.rejected += 1
+        return False, _retry_after(prev_count, curr_count, now, window, limit)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(DISTINCT key) FROM rate_limit").fetchone()[0]
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Sliding window counter di Redis: satu counter per (client, window) dengan
+    INCR + EXPIRE, dibagi semua worker dan node. Menerima client redis-py atau fakeredis.
+    Counter dinaikkan lebih dulu (atomik) dan keputusan diambil dari nilai hasil INCR,
+    sehingga request bersamaan tidak bisa lolos melewati limit; request yang ditolak
+    dikembalikan dengan DECR.
+    """
+
+    name = "redis"
+    blocking = True
+
+    def __init__(self, client=None, url=REDIS_URL, prefix="chatbot:ratelimit:"):
+        super().__init__()
+        self.client = client if client is not None else connect_redis(url)
+        self.prefix = prefix
+
+    def hit(self, key, limit, window):
+        now = time.time()
+        index = int(now // window)
+        base = f"{self.prefix}{key}:{window}:"
+
+        pipe = self.client.pipeline(transaction=True)
+        pipe.get(f"{base}{index - 1}")
+        pipe.incr(f"{base}{index}")
+        pipe.expire(f"{base}{index}", int(2 * window) + 1)
+        prev_raw, counted, _ = pipe.execute()
+        # Request lain yang bersamaan mendapat nilai INCR yang berbeda
+        prev_count, curr_count = int(prev_raw or 0), int(counted) - 1
+        if _estimate(prev_count, curr_count, now, window) >= limit:
+            self.client.decr(f"{base}{index}")
+            self.rejected += 1
+            return False, _retry_after(prev_count, curr_count, now, window, limit)
+        return True, 0
+
+
+def create_rate_limiter(backend=RATE_LIMIT_BACKEND):
+    """Buat rate limiter sesuai konfigurasi RATE_LIMIT_BACKEND"""
+    backend = (backend or "memory").lower()
+    if backend == "sqlite":
+        limiter = SQLiteRateLimiter()
+    elif backend == "redis":
+        limiter = RedisRateLimiter()
+    else:
+        if backend != "memory":
+            logger.warning(f"Rate limit backend tidak dikenali: {backend}, memakai memory")
+        limiter = MemoryRateLimiter()
+
+    logger.info(f"Rate limiter: {limiter.name}")
+    return limiter
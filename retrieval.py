@@ -0,0 +1,64 @@
+"""
+Index retrieval BM25 untuk knowledge base besar.
+Term dokumen = token kata + trigram karakter per token, sehingga query dengan typo
+tetap menemukan kandidat walau tidak ada token yang sama persis.
+"""
+import heapq
+import math
+from collections import Counter
+from operator import itemgetter
+
+
+def analyze(text):
+    """Pecah teks (sudah dinormalisasi) menjadi term: token kata dan trigram karakter"""
+    terms = []
+    for token in text.split():
+        terms.append(token)
+        padded = f"#{token}#"
+        terms.extend(f"~{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return terms
+
+
+class BM25Index:
+    """
+    Inverted index BM25. Bobot BM25 tiap (term, dokumen) dihitung saat build,
+    jadi query cukup menjumlahkan bobot dari posting list term yang muncul di query.
+    Term yang muncul di terlalu banyak dokumen (> stop_df) diabaikan saat query
+    karena bobotnya kecil tapi posting list-nya panjang.
+    """
+
+    def __init__(self, documents, k1=1.2, b=0.75, stop_df_ratio=0.1, min_stop_df=1000):
+        self.size = len(documents)
+        self._postings = {}
+
+        counts = [Counter(analyze(text)) for text in documents]
+        lengths = [sum(c.values()) for c in counts]
+        avg_length = (sum(lengths) / self.size) if self.size else 0.0
+
+        document_frequency = Counter()
+        for c in counts:
+            document_frequency.update(c.keys())
+
+        for doc_id, c in enumerate(counts):
+            norm = k1 * (1 - b + b * lengths[doc_id] / avg_length) if avg_length else k1
+            for term, tf in c.items():
+                df = document_frequency[term]
+                idf = math.log(1 + (self.size - df + 0.5) / (df + 0.5))
+                weight = idf * tf * (k1 + 1) / (tf + norm)
+                self._postings.setdefault(term, []).append((doc_id, weight))
+
+        self.stop_df = max(min_stop_df, int(stop_df_ratio * self.size))
+
+    def __len__(self):
+        return self.size
+
+    def search(self, text, limit=50):
+        """Kembalikan sampai `limit` pasangan (doc_id, skor) terbaik untuk teks query"""
+        scores = {}
+        for term in set(analyze(text)):
+            postings = self._postings.get(term)
+            if not postings or len(postings) > self.stop_df:
+                continue
+            for doc_id, weight in postings:
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+        return heapq.nlargest(limit, scores.items(), key=itemgetter(1))
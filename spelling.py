@@ -0,0 +1,162 @@
+"""
+Koreksi ejaan token input (gaya SymSpell) untuk input yang tidak cocok ke kategori mana pun.
+
+Saat KB dikompilasi, setiap token keyword intent didaftarkan bersama semua
+variannya yang dihapus 1..max_distance huruf dari prefix-nya. Saat lookup, token
+yang tidak dikenal dibuat varian hapusnya dengan cara yang sama; keyword yang
+berbagi varian adalah kandidat, lalu dipilih yang jarak edit-nya (OSA: sisip,
+hapus, ganti, tukar huruf bersebelahan) paling kecil. Jumlah varian per token
+tetap (bergantung prefix_length dan max_distance, bukan ukuran KB), sehingga
+lookup O(1) rata-rata.
+
+Hanya token yang bukan kata sungguhan yang dikoreksi: kata umum bahasa Indonesia
+(COMMON_WORDS) dan kata dari teks pertanyaan KB tidak pernah diubah, sehingga
+"bukan" tidak menjadi "buka" dan "saya" tidak menjadi "saja". Target koreksi
+hanya token keyword intent.
+
+Memori dibatasi oleh prefix_length, max_distance dan max_words: hanya max_words
+token keyword paling sering yang didaftarkan. Hasil koreksi token yang tidak
+dikenal disimpan di cache per proses (paling banyak cache_size token), karena
+salah ketik yang sama cenderung berulang.
+"""
+from itertools import chain
+from rapidfuzz.distance import OSA
+from config import (
+    SPELLING_MAX_DISTANCE, SPELLING_PREFIX_LENGTH, SPELLING_MIN_LENGTH, SPELLING_MAX_WORDS, SPELLING_CACHE_SIZE
+)
+
+# Partikel/klitik yang menempel di kata sungguhan ("bukannya", "sayapun")
+_SUFFIXES = ("nya", "lah", "kah", "pun")
+
+# Kata umum bahasa Indonesia (kata fungsi, ganti, kerja dan benda sehari-hari):
+# kata sungguhan yang jaraknya dekat ke keyword ("bukan"/"buku" ke "buka",
+# "masih" ke "kasih") dan tidak boleh dikoreksi
+COMMON_WORDS = frozenset("""
+    ada adalah agak agar akan akhir aku amat anda antara apa apakah apalagi atas atau awal bagaimana bagi bahkan
+    bahwa baik banyak baru bawah beberapa begini begitu belakang belum benar berapa besar beri bisa boleh buat
+    bukan buku bulan cara cukup cuma dalam dan dapat dari datang dekat demi dengan depan di dia diri dulu
+    gimana guna hal hampir hanya harus hilang hingga ia ingin ini itu jadi jangan jauh jelas juga kalau
+    kali kalian kami kamu kan kapan karena kata ke kecil kembali kemudian kenapa kepada kini kita kok
+    kurang lagi lain lalu lama lambat lantas lebih lewat luar maka makan mana masa masalah masih mau
+    melalui memang mengapa menjadi menurut merasa mereka minta minum misal mulai mungkin naik nama nanti
+    oleh orang pada padahal paling panjang pasti pendek perlu pernah pertama pikir pulang punya pusat
+    rumah sama sambil sampai sana sangat satu saat saya sebab sebagai sebelum sedang sedikit segera sejak
+    sekali sekarang sekitar selalu selama seluruh semua sendiri seperti serta sesudah setelah setiap
+    siapa sini suatu sudah supaya tadi tahu tahun tak tanpa tapi telah tempat tentang tetapi tiap tidak
+    tinggal turun untuk waktu yang
+    adik anak bapak barang baca bawa beli bilang bikin buang cari dengar duduk ganti hidup ibu jalan
+    jawab kakak kamar kawan kelas kenal kirim kota lihat main mahasiswa masuk mati minggu murid nilai
+    pakai pergi pinjam pintu rusak sakit sekolah simpan suka surat tanya teman tidur tugas tulis uang
+    """.split())
+
+
+def _deletes(word, max_distance):
+    """Semua varian word dengan 1..max_distance huruf dihapus"""
+    found = set()
+    level = {word}
+    for _ in range(max_distance):
+        level = {item[:i] + item[i + 1:] for item in level if len(item) > 1 for i in range(len(item))}
+        found |= level
+    return found
+
+
+class SpellingIndex:
+    """Dictionary deletion-neighborhood untuk mengoreksi token ke kata kosakata KB terdekat"""
+
+    def __init__(self, keyword_tokens, known_words=(), max_distance=SPELLING_MAX_DISTANCE,
+                 prefix_length=SPELLING_PREFIX_LENGTH, min_length=SPELLING_MIN_LENGTH,
+                 max_words=SPELLING_MAX_WORDS, cache_size=SPELLING_CACHE_SIZE):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.min_length = min_length
+        self.cache_size = cache_size
+        self._cache = {}
+        self.words = []
+        self._frequency = {}
+        self._deletes = {}
+
+        # Target koreksi: token keyword, yang paling sering didahulukan
+        counts = {}
+        for token in keyword_tokens:
+            if len(token) >= min_length and token.isalpha():
+                counts[token] = counts.get(token, 0) + 1
+        ranked = sorted(counts, key=lambda token: (-counts[token], token))[:max_words]
+        # Kata sungguhan yang tidak pernah dikoreksi (termasuk keyword pendek/non-alfabet)
+        self._known = COMMON_WORDS.union(known_words, ranked)
+
+        for word in ranked:
+            word_id = len(self.words)
+            self.words.append(word)
+            self._frequency[word] = counts[word]
+            prefix = word[:prefix_length]
+            for key in chain((prefix,), _deletes(prefix, self._distance(len(word)))):
+                # Satu kata per key disimpan sebagai int, list hanya jika ada tabrakan
+                existing = self._deletes.get(key)
+                if existing is None:
+                    self._deletes[key] = word_id
+                elif isinstance(existing, int):
+                    self._deletes[key] = [existing, word_id]
+                else:
+                    existing.append(word_id)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __getstate__(self):
+        # Cache koreksi tidak ikut di-pickle (artifact index, worker matcher pool)
+        state = self.__dict__.copy()
+        state["_cache"] = {}
+        return state
+
+    def _distance(self, length):
+        """Jarak edit maksimum untuk kata sepanjang ini: kata pendek hanya 1 huruf"""
+        if length < self.min_length:
+            return 0
+        return min(self.max_distance, 1 if length < 8 else 2)
+
+    def correct(self, token):
+        """Keyword terdekat untuk token, atau token itu sendiri jika kata sungguhan/tidak ada kandidat"""
+        if token in self._known:
+            return token
+        corrected = self._cache.get(token)
+        if corrected is None:
+            corrected = self._lookup(token)
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[token] = corrected
+        return corrected
+
+    def _lookup(self, token):
+        for suffix in _SUFFIXES:
+            if token.endswith(suffix) and token[:-len(suffix)] in self._known:
+                # Kata sungguhan + klitik, bukan salah ketik
+                return token
+
+        distance = self._distance(len(token))
+        if distance == 0 or not token.isalpha():
+            return token
+
+        prefix = token[:self.prefix_length]
+        candidates = set()
+        for key in chain((prefix,), _deletes(prefix, distance)):
+            ids = self._deletes.get(key)
+            if ids is None:
+                continue
+            if isinstance(ids, int):
+                candidates.add(ids)
+            else:
+                candidates.update(ids)
+
+        best = None
+        best_key = None
+        for word_id in candidates:
+            word = self.words[word_id]
+            if abs(len(word) - len(token)) > distance:
+                continue
+            d = OSA.distance(token, word, score_cutoff=distance)
+            if d > distance:
+                continue
+            key = (d, -self._frequency[word], word)
+            if best_key is None or key < best_key:
+                best, best_key = word, key
+        return best if best is not None else token
@@ -0,0 +1,145 @@
+"""
+Helper Server-Sent Events untuk /chat/stream.
+
+Generator event dijalankan di thread pool dan hasilnya diteruskan lewat antrian,
+sehingga pengirim bisa menyisipkan heartbeat selama generator jawaban lambat dan
+bisa berhenti (membatalkan generator) saat client disconnect.
+
+Batas: thread Python tidak bisa dihentikan dari luar, jadi pembatalan hanya dicek
+di antara item. Generator yang macet di dalam satu next() tetap memegang thread
+pool (SSE_MAX_STREAMS) sampai next() kembali, baru kemudian ditutup. Agar client
+tidak ikut tertahan oleh heartbeat tanpa akhir, stream diakhiri dengan event error
+jika tidak ada item selama SSE_ITEM_TIMEOUT detik.
+"""
+import asyncio
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logger_config import logger
+from config import SSE_MAX_STREAMS, SSE_ITEM_TIMEOUT
+
+# Komentar SSE: diabaikan client, menjaga koneksi tetap hidup melewati proxy
+HEARTBEAT = ": ping\n\n"
+HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no"
+}
+
+_DONE = object()
+_executor = ThreadPoolExecutor(max_workers=SSE_MAX_STREAMS, thread_name_prefix="sse")
+
+
+def format_event(event, data):
+    """Satu event SSE dengan data JSON satu baris"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+# Event terakhir stream yang generatornya tidak menghasilkan item selama timeout
+TIMEOUT_EVENT = format_event("error", {"error": "Maaf, respons terlalu lama. Silakan coba lagi."})
+
+
+def _wait_time(interval, deadline):
+    """Lama menunggu item berikutnya: sampai heartbeat atau deadline timeout (None = tanpa batas)"""
+    if deadline is None:
+        return interval if interval > 0 else None
+    remaining = max(deadline - time.monotonic(), 0)
+    return min(interval, remaining) if interval > 0 else remaining
+
+
+def _produce(events, put, cancelled):
+    """Jalankan generator event di thread pool, berhenti jika stream dibatalkan"""
+    try:
+        for item in events:
+            if cancelled.is_set():
+                break
+            put(item)
+    except Exception as e:
+        put(e)
+    finally:
+        events.close()
+        put(_DONE)
+
+
+def with_heartbeat(events, interval, timeout=SSE_ITEM_TIMEOUT):
+    """
+    Teruskan item dari generator `events`, kirim HEARTBEAT jika tidak ada item
+    selama `interval` detik. Jika stream ditutup sebelum selesai (client disconnect),
+    generator dibatalkan sebelum item berikutnya. Tanpa item selama `timeout` detik
+    (0 = tanpa batas): TIMEOUT_EVENT lalu stream selesai. interval <= 0 dan timeout <= 0:
+    generator dijalankan langsung, tanpa heartbeat/thread.
+    """
+    if interval <= 0 and timeout <= 0:
+        yield from events
+        return
+
+    items = queue.Queue()
+    cancelled = threading.Event()
+    finished = False
+    _executor.submit(_produce, events, items.put, cancelled)
+    deadline = time.monotonic() + timeout if timeout > 0 else None
+    try:
+        while True:
+            try:
+                item = items.get(timeout=_wait_time(interval, deadline))
+            except queue.Empty:
+                if deadline is not None and time.monotonic() >= deadline:
+                    cancelled.set()
+                    logger.warning("SSE stream diakhiri: tidak ada item selama %s detik", timeout)
+                    finished = True
+                    yield TIMEOUT_EVENT
+                    return
+                yield HEARTBEAT
+                continue
+            if item is _DONE:
+                finished = True
+                return
+            if isinstance(item, Exception):
+                raise item
+            if deadline is not None:
+                deadline = time.monotonic() + timeout
+            yield item
+    finally:
+        if not finished:
+            cancelled.set()
+            logger.info("SSE stream ditutup sebelum selesai (client disconnect)")
+
+
+async def awith_heartbeat(events, interval, timeout=SSE_ITEM_TIMEOUT):
+    """Versi async with_heartbeat untuk ASGI: generator event tetap di thread pool"""
+    loop = asyncio.get_running_loop()
+    items = asyncio.Queue()
+    cancelled = threading.Event()
+    finished = False
+
+    def put(item):
+        loop.call_soon_threadsafe(items.put_nowait, item)
+
+    loop.run_in_executor(_executor, _produce, events, put, cancelled)
+    deadline = time.monotonic() + timeout if timeout > 0 else None
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(items.get(), _wait_time(interval, deadline))
+            except asyncio.TimeoutError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    cancelled.set()
+                    logger.warning("SSE stream diakhiri: tidak ada item selama %s detik", timeout)
+                    finished = True
+                    yield TIMEOUT_EVENT
+                    return
+                yield HEARTBEAT
+                continue
+            if item is _DONE:
+                finished = True
+                return
+            if isinstance(item, Exception):
+                raise item
+            if deadline is not None:
+                deadline = time.monotonic() + timeout
+            yield item
+    finally:
+        if not finished:
+            cancelled.set()
+            logger.info("SSE stream ditutup sebelum selesai (client disconnect)")
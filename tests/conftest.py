@@ -0,0 +1,17 @@
+"""
+Test dijalankan dari root repo (python -m pytest); modul aplikasi di-import
+langsung dan KB dibaca dari knowledge_base.json.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+# Test tidak menulis log/analytics ke repo dan tidak menjalankan thread watcher
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("LOG_QUEUE", "False")
+os.environ.setdefault("ANALYTICS", "False")
+os.environ.setdefault("KB_WATCH_INTERVAL", "0")
+os.environ.setdefault("RATE_LIMIT", "False")
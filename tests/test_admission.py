@@ -0,0 +1,177 @@
+"""Admission control: slot diserahkan FIFO, shedding, tenggat yang berpapasan dengan grant, dan limit AIMD"""
+import asyncio
+import threading
+import time
+from admission import AdmissionController, _Waiter, _QUEUED, _SHED
+
+
+def _controller(**kwargs):
+    kwargs.setdefault("max_limit", 1)
+    kwargs.setdefault("min_limit", 1)
+    kwargs.setdefault("queue_size", 10)
+    kwargs.setdefault("queue_timeout", 2)
+    return AdmissionController(**kwargs)
+
+
+def _wait(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_slot_diserahkan_fifo():
+    controller = _controller()
+    assert controller.acquire()
+    order = []
+
+    def request(i):
+        assert controller.acquire()
+        order.append(i)
+        controller.release()
+
+    threads = []
+    for i in range(4):
+        thread = threading.Thread(target=request, args=(i,))
+        thread.start()
+        threads.append(thread)
+        _wait(lambda: controller.stats()["waiting"] == i + 1)
+    controller.release()
+    for thread in threads:
+        thread.join()
+    assert order == [0, 1, 2, 3]
+    stats = controller.stats()
+    assert (stats["inflight"], stats["admitted"], stats["queued"], stats["shed"]) == (0, 5, 4, 0)
+
+
+def test_request_baru_tidak_menyerobot_slot_yang_diserahkan():
+    controller = _controller()
+    assert controller.acquire()
+    waiter = _Waiter(lambda: None)
+    assert controller._enter(waiter) is _QUEUED
+    controller.release()
+    # Slot sudah milik waiter meski thread-nya belum bangun
+    assert waiter.granted and controller.inflight == 1
+    assert controller._enter(_Waiter(lambda: None)) is _QUEUED
+
+
+def test_shed_saat_antrian_penuh():
+    controller = _controller(queue_size=2)
+    assert controller.acquire()
+    assert controller._enter(_Waiter(lambda: None)) is _QUEUED
+    assert controller._enter(_Waiter(lambda: None)) is _QUEUED
+    start = time.monotonic()
+    assert not controller.acquire()
+    # Ditolak langsung, tidak menunggu queue_timeout
+    assert time.monotonic() - start < 0.5
+    assert controller.stats()["shed"] == 1
+
+
+def test_shed_saat_perkiraan_tunggu_terlalu_lama():
+    controller = _controller(queue_timeout=1)
+    assert controller.acquire()
+    controller.release(0.6)
+    assert controller.acquire()
+    # Posisi 1: 0.6 detik, masih di bawah queue_timeout
+    assert controller._enter(_Waiter(lambda: None)) is _QUEUED
+    # Posisi 2: 1.2 detik
+    assert controller._enter(_Waiter(lambda: None)) is _SHED
+    assert controller.retry_after() == 2
+    assert controller.stats()["shed"] == 1
+
+
+def test_tenggat_habis_keluar_dari_antrian():
+    controller = _controller(queue_timeout=0.05)
+    assert controller.acquire()
+    assert not controller.acquire()
+    stats = controller.stats()
+    assert (stats["waiting"], stats["timeouts"], stats["shed"], stats["inflight"]) == (0, 1, 1, 1)
+
+
+def test_cancel_setelah_grant_slot_tetap_dipakai():
+    controller = _controller()
+    assert controller.acquire()
+    waiter = _Waiter(lambda: None)
+    assert controller._enter(waiter) is _QUEUED
+    controller.release()
+    # Tenggat habis tepat setelah release memberikan slot: request tetap diproses
+    assert controller._cancel(waiter)
+    stats = controller.stats()
+    assert (stats["inflight"], stats["waiting"], stats["timeouts"], stats["shed"]) == (1, 0, 0, 0)
+
+
+def test_acquire_async_dibatalkan_mengembalikan_slot():
+    controller = _controller()
+
+    async def scenario(order):
+        assert controller.acquire()
+        task = asyncio.ensure_future(controller.acquire_async())
+        while controller.stats()["waiting"] == 0:
+            await asyncio.sleep(0.001)
+        steps = {"cancel": task.cancel, "release": controller.release}
+        for step in order:
+            steps[step]()
+        try:
+            if await task:
+                # Grant lebih dulu dari pembatalan (wait_for Python < 3.12): pemanggil memegang slot
+                assert order == ("release", "cancel")
+                controller.release()
+        except asyncio.CancelledError:
+            pass
+        if "release" not in order:
+            controller.release()
+
+    # Dibatalkan saat menunggu; dibatalkan tepat ketika slot diberikan; slot diberikan lalu dibatalkan
+    for order in (("cancel",), ("cancel", "release"), ("release", "cancel")):
+        asyncio.run(scenario(order))
+        stats = controller.stats()
+        assert (stats["inflight"], stats["waiting"]) == (0, 0), order
+    assert controller.acquire()
+
+
+def test_acquire_async_menunggu_release():
+    controller = _controller()
+
+    async def scenario():
+        assert controller.acquire()
+        task = asyncio.ensure_future(controller.acquire_async())
+        while controller.stats()["waiting"] == 0:
+            await asyncio.sleep(0.001)
+        threading.Thread(target=controller.release).start()
+        assert await task
+        controller.release()
+
+    asyncio.run(scenario())
+    assert controller.stats()["inflight"] == 0
+
+
+def test_limit_aimd():
+    controller = AdmissionController(max_limit=10, min_limit=2, queue_size=10, queue_timeout=1,
+                                     target_latency=0.1, window=5)
+    for _ in range(5):
+        assert controller.acquire()
+        controller.release(0.2)
+    assert controller.limit == 9.0
+
+    for _ in range(20):
+        for _ in range(5):
+            assert controller.acquire()
+            controller.release(0.2)
+    assert controller.limit == 2.0
+
+    # Di bawah target tapi limit tidak pernah penuh: tidak naik
+    for _ in range(5):
+        assert controller.acquire()
+        controller.release(0.01)
+    assert controller.limit == 2.0
+
+    # Limit sempat penuh dan latency di bawah target: limit naik satu
+    assert controller.acquire() and controller.acquire()
+    assert controller._enter(_Waiter(lambda: None)) is _QUEUED
+    for _ in range(3):
+        controller.release(0.01)
+    for _ in range(2):
+        assert controller.acquire()
+        controller.release(0.01)
+    assert controller.limit == 3.0
+    assert controller.stats()["inflight"] == 0
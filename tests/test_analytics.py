@@ -0,0 +1,125 @@
+"""Event analytics ditulis oleh flusher, segmen dirotasi per ukuran, dan report merangkum semua segmen"""
+import gzip
+import json
+import threading
+import time
+import pytest
+import analytics
+from analytics import EventSink
+
+
+def _event(query, category="jadwal", latency_ms=1.0, ts=None):
+    return {"ts": ts or round(time.time(), 3), "session": "s", "route": "chat",
+            "category": category, "score": 100, "latency_ms": latency_ms, "query": query}
+
+
+@pytest.fixture
+def sink(tmp_path):
+    def create(**kwargs):
+        kwargs.setdefault("flush_interval", 0)
+        sink = EventSink(str(tmp_path / "events"), **kwargs)
+        sinks.append(sink)
+        return sink
+
+    sinks = []
+    yield create
+    for sink in sinks:
+        sink.close()
+
+
+def _wait(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_emit_tidak_menulis_di_thread_request(sink):
+    sink = sink(batch_size=2)
+    writers = []
+    write = sink._write
+
+    def record(batch):
+        writers.append(threading.current_thread())
+        write(batch)
+
+    sink._write = record
+    sink.emit(_event("jam buka lab"))
+    sink.emit(_event("jam buka lab"))
+    _wait(lambda: sink.stats()["written"] == 2)
+    assert writers == [sink._flusher]
+
+
+def test_segmen_dirotasi_per_ukuran(sink):
+    sink = sink(segment_size=200, batch_size=1000)
+    for i in range(10):
+        sink.emit(_event(f"query nomor {i}"))
+        sink.flush()
+    sink.close()
+
+    paths = analytics.segment_paths(sink.directory)
+    assert len(paths) == sink.segments > 1
+    queries = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        # Segmen baru dibuka sebelum write, jadi satu batch tidak pernah terbelah
+        assert all(json.loads(line)["route"] == "chat" for line in lines)
+        queries += [json.loads(line)["query"] for line in lines]
+    assert queries == [f"query nomor {i}" for i in range(10)]
+
+
+def test_event_dibuang_saat_buffer_penuh(sink):
+    sink = sink(batch_size=1000, max_pending=3)
+    for i in range(5):
+        sink.emit(_event(f"q{i}"))
+    stats = sink.stats()
+    assert (stats["pending"], stats["dropped"]) == (3, 2)
+    sink.flush()
+    assert sink.stats()["written"] == 3
+
+
+def test_write_gagal_dihitung_dibuang(tmp_path):
+    blocker = tmp_path / "bukan-direktori"
+    blocker.write_text("")
+    sink = EventSink(str(blocker / "events"), batch_size=1000, flush_interval=0)
+    try:
+        sink.emit(_event("halo"))
+        sink.flush()
+        stats = sink.stats()
+        assert (stats["errors"], stats["dropped"], stats["written"]) == (1, 1, 0)
+    finally:
+        sink.close()
+
+
+def test_report_cli(sink, capsys):
+    sink = sink(batch_size=1000)
+    for _ in range(3):
+        sink.emit(_event("jam buka lab", latency_ms=2.0))
+    sink.emit(_event("xyz", category=None))
+    sink.emit(_event("lama", ts=1000.0))
+    sink.close()
+    with open(f"{sink.directory}/events-0-rusak.jsonl", "w", encoding="utf-8") as f:
+        f.write('{"ts": 1\n')
+    with gzip.open(f"{sink.directory}/events-1-arsip.jsonl.gz", "wt", encoding="utf-8") as f:
+        f.write(json.dumps(_event("aturan lab", category="aturan")) + "\n")
+
+    assert analytics.main(["report", "--dir", sink.directory, "--since", "2000-01-01", "--json"]) == 0
+    summary = json.loads(capsys.readouterr().out)
+    assert summary["segments"] == 3
+    assert summary["events"] == 5
+    assert summary["invalid_lines"] == 1
+    assert (summary["ambiguous"], summary["ambiguous_rate"]) == (1, 0.2)
+    assert summary["top_queries"][0] == {"query": "jam buka lab", "count": 3, "category": "jadwal"}
+    assert summary["top_unmatched"] == [{"query": "xyz", "count": 1, "category": None}]
+    jadwal = next(row for row in summary["categories"] if row["category"] == "jadwal")
+    assert (jadwal["count"], jadwal["p50_ms"]) == (3, 2.0)
+
+    assert analytics.main(["report", "--dir", sink.directory]) == 0
+    # Tanpa --since event lama ikut terhitung
+    assert "6 event dari 3 segmen" in capsys.readouterr().out
+
+
+def test_report_tanpa_segmen(tmp_path, capsys):
+    assert analytics.main(["report", "--dir", str(tmp_path)]) == 1
+    assert "tidak ada segmen" in capsys.readouterr().out
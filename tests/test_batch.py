@@ -0,0 +1,10 @@
+"""Validasi per pesan di get_responses (/chat/batch)"""
+import utils
+
+
+def test_pesan_bukan_string():
+    results = utils.get_responses(["jam buka lab", 123, None, ["x"], ""])
+    assert results[0]["category"] == "jadwal"
+    assert [r["response"] for r in results[1:4]] == ["Error: message harus berupa string"] * 3
+    assert results[4]["response"] == "Error: Input kosong"
+    assert all(r["score"] == 0 and r["category"] is None for r in results[1:])
@@ -0,0 +1,50 @@
+"""Body /chat dan /chat/stream yang bukan object JSON atau message bukan string: 400, bukan 500"""
+import asyncio
+import json
+import pytest
+import app as chatbot
+import asgi
+
+BAD_BODIES = [[1, 2], "halo", 5, {"message": 123}, {"message": ["x"]}, {"message": None}]
+
+
+def asgi_post(path, body):
+    """Kirim satu POST JSON ke asgi.application; mengembalikan (status, body)"""
+    messages = []
+    raw = json.dumps(body).encode()
+    scope = {
+        "type": "http", "method": "POST", "path": path, "query_string": b"",
+        "headers": [(b"content-type", b"application/json")], "client": ("127.0.0.1", 1234)
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": raw, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi.application(scope, receive, send))
+    status = next(m["status"] for m in messages if m["type"] == "http.response.start")
+    return status, b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+
+
+@pytest.mark.parametrize("path", ["/chat", "/chat/stream"])
+@pytest.mark.parametrize("body", BAD_BODIES)
+def test_asgi_body_tidak_valid(path, body):
+    status, payload = asgi_post(path, body)
+    assert status == 400
+    assert json.loads(payload) == {"error": "Format JSON tidak valid"}
+
+
+@pytest.mark.parametrize("path", ["/chat", "/chat/stream"])
+@pytest.mark.parametrize("body", BAD_BODIES)
+def test_flask_body_tidak_valid(path, body):
+    response = chatbot.app.test_client().post(path, json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Format JSON tidak valid"}
+
+
+def test_asgi_chat_valid():
+    status, payload = asgi_post("/chat", {"message": "jam buka lab"})
+    assert status == 200
+    assert json.loads(payload)["category"] == "jadwal"
@@ -0,0 +1,64 @@
+"""Konteks percakapan hanya mengubah jawaban (dan key cache) untuk input yang bergantung padanya"""
+import pytest
+import utils
+from conversation import ConversationContext, is_follow_up
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    utils.RESPONSE_CACHE.clear()
+    yield
+    utils.RESPONSE_CACHE.clear()
+
+
+@pytest.mark.parametrize("text", ["kalau sanksinya?", "terus yang lain?", "gimana kalau telat?", "lalu?"])
+def test_pembuka_anaforik_follow_up(text):
+    assert is_follow_up(text)
+
+
+@pytest.mark.parametrize("text", ["yang penting jam buka", "untuk apa", "bagaimana cara pinjam alat", "saya juga"])
+def test_kata_umum_bukan_follow_up(text):
+    assert not is_follow_up(text)
+
+
+def test_klitik_dilepas_sebelum_matching():
+    context = ConversationContext("jadwal")
+    assert utils.match_with_score("kalau sanksinya?", context) == ("aturan", 100)
+
+
+def test_jawaban_tanpa_konteks_dipakai_bersama_session():
+    first = utils.get_response("jam buka lab")
+    size = len(utils.RESPONSE_CACHE)
+    assert utils.get_response("jam buka lab", ConversationContext("aturan")) == first
+    assert len(utils.RESPONSE_CACHE) == size
+    assert utils.is_cached("jam buka lab")
+
+
+def test_follow_up_bukan_jalur_prioritas():
+    # Jawabannya bisa bergantung pada konteks session yang belum dibaca dari store
+    utils.get_response("kalau telat?")
+    assert not utils.is_cached("kalau telat?")
+
+
+def test_skor_follow_up_skor_kategori_konteks():
+    context = ConversationContext("aturan")
+    category, score = utils.match_with_score("kalau telat?", context)
+    assert category == "aturan"
+    assert score == utils.current_matcher().category_score("kalau telat?", "aturan")
+
+
+def test_cache_tidak_mengubah_jawaban():
+    turns = ["aturan lab apa saja?", "kalau sanksinya?", "terus yang lain?", "jam buka?", "kalau telat?", "halo"]
+    expected = []
+    context = None
+    for text in turns:
+        category, score = utils.match_with_score(text, context)
+        entities = utils.follow_up_entities(context, category, text)
+        expected.append((category, utils.generate_response(category, text, entities), score))
+        context = utils.advance_context(context, text, category)
+
+    for _ in range(2):
+        context = None
+        for text, answer in zip(turns, expected):
+            assert utils.get_response(text, context) == answer
+            context = utils.advance_context(context, text, answer[0])
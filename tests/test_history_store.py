@@ -0,0 +1,98 @@
+"""Session idle tidak dikembalikan sebelum cleanup, dan batas session/record berlaku di semua backend"""
+import time
+import pytest
+import history_store
+from history_store import HistoryRecord, MemoryHistoryStore, RedisHistoryStore, SQLiteHistoryStore
+
+
+@pytest.fixture
+def sqlite_store(tmp_path):
+    def create(name="history.db", **kwargs):
+        store = SQLiteHistoryStore(str(tmp_path / name), batch_size=1, flush_interval=0, **kwargs)
+        stores.append(store)
+        return store
+
+    stores = []
+    yield create
+    for store in stores:
+        store.close()
+
+
+def test_sqlite_session_idle_tidak_dibaca(sqlite_store):
+    store = sqlite_store(idle_timeout=60)
+    store.append("lama", HistoryRecord("halo", "hai", "greeting", created=time.time() - 120), {"category": "jadwal"})
+    store.append("baru", HistoryRecord("halo", "hai", "greeting"))
+    assert store.get("lama") == []
+    assert store.page("lama", 10) == ([], False, None, 0)
+    assert store.head("lama") == (None, 0)
+    assert store.count() == 1
+    assert store.head("baru")[1] == 1
+
+
+def test_memory_head_dan_count_expire(monkeypatch):
+    store = MemoryHistoryStore(idle_timeout=60)
+    store.append("s", HistoryRecord("halo", "hai", "greeting"))
+    assert store.head("s")[1] == 1
+    now = time.monotonic() + 120
+    monkeypatch.setattr(history_store.time, "monotonic", lambda: now)
+    assert store.head("s") == (None, 0)
+    assert store.count() == 0
+
+
+def _fill(store, sessions, records=1):
+    for i in range(sessions):
+        for _ in range(records):
+            store.append(f"s{i}", HistoryRecord("halo", "hai", "greeting"))
+
+
+def test_sqlite_batas_session_dan_record(sqlite_store):
+    store = sqlite_store(max_sessions=3, max_records=0)
+    _fill(store, 5)
+    store.cleanup()
+    assert store.count() == 3
+    assert store.get("s0") == [] and len(store.get("s4")) == 1
+
+    store = sqlite_store("records.db", max_sessions=0, max_records=4)
+    _fill(store, 4, records=2)
+    store.cleanup()
+    assert store.count() == 2
+    assert store.evicted == 2
+
+
+def test_redis_batas_session_dan_record():
+    fakeredis = pytest.importorskip("fakeredis")
+    store = RedisHistoryStore(client=fakeredis.FakeRedis(), max_sessions=0, max_records=4)
+    _fill(store, 4, records=2)
+    store.cleanup()
+    assert store.count() == 2
+    assert store.get("s0") == [] and len(store.get("s3")) == 2
+
+    store.max_sessions, store.max_records = 1, 0
+    store.cleanup()
+    assert store.count() == 1
+    assert store.evicted == 3
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def any_store(request, tmp_path):
+    if request.param == "memory":
+        store = MemoryHistoryStore(idle_timeout=1)
+    elif request.param == "sqlite":
+        store = SQLiteHistoryStore(str(tmp_path / "idle.db"), idle_timeout=1, batch_size=1, flush_interval=0)
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        store = RedisHistoryStore(client=fakeredis.FakeRedis(), idle_timeout=1)
+    yield store
+    store.close()
+
+
+def test_idle_dihitung_dari_append_terakhir(any_store):
+    # Aturan sama di semua backend: membaca history tidak memperpanjang session
+    any_store.append("s", HistoryRecord("halo", "hai", "greeting"))
+    time.sleep(0.7)
+    assert len(any_store.get("s")) == 1
+    assert any_store.head("s")[1] == 1
+    time.sleep(0.7)
+    assert any_store.get("s") == []
+    assert any_store.head("s") == (None, 0)
+    assert any_store.count() == 0
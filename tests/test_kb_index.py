@@ -0,0 +1,57 @@
+"""Artifact index KB hanya di-unpickle jika tanda tangan HMAC-nya valid"""
+import pytest
+import kb_index
+import utils
+
+
+@pytest.fixture
+def artifact(tmp_path):
+    path = str(tmp_path / "kb.idx")
+    kb_index.write_index(utils.ensure_knowledge_base(), path, "sumber", key="rahasia")
+    return path
+
+
+@pytest.fixture
+def no_unpickle(monkeypatch):
+    def fail(data):
+        raise AssertionError("pickle.loads dipanggil untuk artifact yang tidak valid")
+    monkeypatch.setattr(kb_index.pickle, "loads", fail)
+
+
+def test_artifact_valid_dimuat(artifact):
+    compiled = kb_index.load_index(artifact, "sumber", key="rahasia")
+    assert compiled is not None
+    assert compiled.matcher.match("jam buka lab")[0] == "jadwal"
+
+
+def test_key_lain_ditolak(artifact, no_unpickle):
+    assert kb_index.load_index(artifact, "sumber", key="key-lain") is None
+
+
+@pytest.mark.parametrize("position", [20, -40, -1])
+def test_isi_diubah_ditolak(artifact, no_unpickle, position):
+    with open(artifact, "r+b") as f:
+        data = bytearray(f.read())
+        data[position] ^= 0xFF
+        f.seek(0)
+        f.write(data)
+    assert kb_index.load_index(artifact, key="rahasia") is None
+
+
+def test_secret_key_default_ditolak(tmp_path, artifact, no_unpickle):
+    assert kb_index.load_index(artifact, key=kb_index.DEFAULT_SECRET_KEY) is None
+    with pytest.raises(ValueError):
+        kb_index.write_index(utils.ensure_knowledge_base(), str(tmp_path / "dev.idx"), "sumber",
+                             key=kb_index.DEFAULT_SECRET_KEY)
+    assert not (tmp_path / "dev.idx").exists()
+
+
+def test_respons_di_decode_sekali(artifact, monkeypatch):
+    compiled = kb_index.load_index(artifact, key="rahasia")
+    first = compiled.responses["jadwal"]
+
+    def fail(data):
+        raise AssertionError("respons di-decode ulang")
+    monkeypatch.setattr(kb_index.json, "loads", fail)
+    assert compiled.responses["jadwal"] is first
+    assert compiled.responses.get("jadwal") is first
@@ -0,0 +1,127 @@
+"""Metrics: bucket histogram, agregasi shard antar thread, latency per tahap dan endpoint /metrics"""
+import asyncio
+import threading
+import app as chatbot
+import asgi
+import utils
+from metrics import STAGE_LATENCY, Counter, Histogram, MetricsRegistry
+
+
+def _run_threads(target, count):
+    for _ in range(count):
+        thread = threading.Thread(target=target)
+        thread.start()
+        thread.join()
+
+
+def test_shard_thread_selesai_digabung():
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("t_total", "test", ("route",)))
+    histogram = registry.register(Histogram("t_seconds", "test", buckets=(0.1, 1.0)))
+
+    def request():
+        counter.inc("/chat")
+        histogram.observe(0.05)
+
+    _run_threads(request, 2000)
+    text = registry.render()
+    assert 't_total{route="/chat"} 2000' in text
+    assert "t_seconds_count 2000" in text
+    assert len(counter._shards) <= 1 and len(histogram._shards) <= 1
+
+
+def test_bucket_histogram_batas_atas_inklusif():
+    histogram = Histogram("t_seconds", "test", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.1000001, 1.0, 5.0):
+        histogram.observe(value, "match")
+    lines = histogram.render()
+    assert lines == [
+        't_seconds_bucket{stage="match",le="0.1"} 2',
+        't_seconds_bucket{stage="match",le="1"} 4',
+        't_seconds_bucket{stage="match",le="+Inf"} 5',
+        't_seconds_sum{stage="match"} 6.2500001',
+        't_seconds_count{stage="match"} 5',
+    ]
+
+
+def test_agregasi_thread_yang_masih_hidup():
+    counter = Counter("t_total", "test", ("route",))
+    histogram = Histogram("t_seconds", "test", buckets=(0.1,))
+    observed = threading.Barrier(9)
+    done = threading.Event()
+
+    def request():
+        for _ in range(100):
+            counter.inc("/chat")
+            counter.inc("/health", amount=2)
+            histogram.observe(0.5)
+        observed.wait()
+        done.wait()
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    observed.wait()
+    try:
+        # Semua shard masih milik thread hidup: dijumlahkan saat collect, bukan digabung
+        assert len(counter._shards) == 8
+        assert counter.values() == {("/chat",): 800, ("/health",): 1600}
+        assert histogram.values()[()] == [0, 800, 400.0]
+    finally:
+        done.set()
+        for thread in threads:
+            thread.join()
+    assert counter.values() == {("/chat",): 800, ("/health",): 1600}
+    assert histogram.values()[()] == [0, 800, 400.0]
+
+
+def _stage_counts():
+    return {labels[0]: sum(state[:-1]) for labels, state in STAGE_LATENCY.values().items()}
+
+
+def test_latency_per_tahap_setelah_chat():
+    utils.RESPONSE_CACHE.clear()
+    before = _stage_counts()
+    response = chatbot.app.test_client().post("/chat", json={"message": "jam buka lab"})
+    assert response.status_code == 200
+    after = _stage_counts()
+    for stage in ("match", "generate", "history_append", "logging"):
+        assert after.get(stage, 0) == before.get(stage, 0) + 1, stage
+
+
+def test_endpoint_metrics_flask():
+    client = chatbot.app.test_client()
+    client.post("/chat", json={"message": "jam buka lab"})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    text = response.get_data(as_text=True)
+    assert "# TYPE chatbot_http_requests_total counter" in text
+    assert 'chatbot_http_requests_total{route="/chat",method="POST",status="200"}' in text
+    assert 'chatbot_stage_duration_seconds_bucket{stage="match",le="+Inf"}' in text
+    assert "process_resident_memory_bytes" in text
+
+
+def test_endpoint_metrics_nonaktif(monkeypatch):
+    monkeypatch.setattr(chatbot, "METRICS_ENABLED", False)
+    assert chatbot.app.test_client().get("/metrics").status_code == 404
+
+
+def test_endpoint_metrics_asgi():
+    messages = []
+    scope = {
+        "type": "http", "method": "GET", "path": "/metrics", "query_string": b"",
+        "headers": [], "client": ("127.0.0.1", 1234), "scheme": "http", "server": ("testserver", 80),
+        "http_version": "1.1", "root_path": ""
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi.application(scope, receive, send))
+    assert next(m["status"] for m in messages if m["type"] == "http.response.start") == 200
+    text = b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body").decode()
+    assert "# TYPE chatbot_stage_duration_seconds histogram" in text
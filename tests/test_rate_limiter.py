@@ -0,0 +1,30 @@
+"""Rate limiter tidak boleh meloloskan lebih dari limit request per window"""
+import threading
+import pytest
+from rate_limiter import MemoryRateLimiter, RedisRateLimiter
+
+
+def test_memory_limit():
+    limiter = MemoryRateLimiter()
+    allowed = [limiter.hit("ip", 5, 60)[0] for _ in range(8)]
+    assert allowed.count(True) == 5
+
+
+def test_redis_hit_bersamaan_tidak_melewati_limit():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeRedis()
+    limiter = RedisRateLimiter(client=client)
+    allowed = []
+
+    def burst():
+        for _ in range(20):
+            allowed.append(limiter.hit("ip", 50, 3600)[0])
+
+    threads = [threading.Thread(target=burst) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert allowed.count(True) == 50
+    # Request yang ditolak tidak ikut dihitung
+    assert [int(client.get(key)) for key in client.keys()] == [50]
@@ -0,0 +1,38 @@
+"""Koreksi ejaan tidak boleh mengubah kata umum bahasa Indonesia menjadi keyword"""
+import pytest
+import utils
+from spelling import SpellingIndex
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return utils.current_matcher()
+
+
+@pytest.mark.parametrize("word", ["bukan", "buku", "saya", "masih"])
+def test_kata_umum_tidak_dikoreksi(matcher, word):
+    assert matcher.tokens(word) == [word]
+
+
+@pytest.mark.parametrize("text", ["saya bukan mahasiswa", "buku saya hilang", "masih"])
+def test_kata_umum_tidak_jadi_false_positive(matcher, text):
+    assert matcher.match(text)[0] is None
+    assert matcher.match_many([text])[0][0] is None
+
+
+@pytest.mark.parametrize("text, category", [
+    ("jadwl ujian", "jadwal"),
+    ("atruan lab", "aturan"),
+    ("trima kasih", "greeting"),
+])
+def test_salah_ketik_tetap_dikoreksi(matcher, text, category):
+    assert matcher.match(text)[0] == category
+    assert matcher.match_many([text])[0][0] == category
+
+
+def test_target_hanya_keyword():
+    index = SpellingIndex(["buka", "jadwal"], known_words=["saja"])
+    assert index.correct("bukaa") == "buka"
+    # Kata dari teks KB dikenal, tapi bukan target koreksi
+    assert index.correct("saja") == "saja"
+    assert index.correct("sajq") == "sajq"
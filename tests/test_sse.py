@@ -0,0 +1,123 @@
+"""Stream SSE: heartbeat saat generator lambat, pembatalan saat disconnect, dan timeout per item"""
+import asyncio
+import threading
+import time
+import pytest
+import asgi
+import sse
+
+
+def _events(items, delay=0.0, closed=None):
+    """Generator event yang menunggu `delay` detik sebelum tiap item dan menandai closed saat ditutup"""
+    try:
+        for item in items:
+            time.sleep(delay)
+            yield item
+    finally:
+        if closed is not None:
+            closed.set()
+
+
+def _endless(produced, closed, delay=0.01):
+    try:
+        while True:
+            time.sleep(delay)
+            produced.append(1)
+            yield "x"
+    finally:
+        closed.set()
+
+
+def _collect(events):
+    async def run():
+        return [item async for item in events]
+
+    return asyncio.run(run())
+
+
+def test_format_event_json_satu_baris():
+    assert sse.format_event("message", {"text": "halo\ndunia"}) == 'event: message\ndata: {"text": "halo\\ndunia"}\n\n'
+
+
+def test_heartbeat_selama_generator_lambat():
+    output = list(sse.with_heartbeat(_events(["a", "b"], delay=0.15), 0.03, timeout=0))
+    assert [item for item in output if item != sse.HEARTBEAT] == ["a", "b"]
+    assert output.count(sse.HEARTBEAT) >= 2
+
+
+def test_tanpa_heartbeat_dijalankan_langsung():
+    caller = threading.current_thread()
+    threads = []
+
+    def events():
+        threads.append(threading.current_thread())
+        yield "a"
+
+    assert list(sse.with_heartbeat(events(), 0, timeout=0)) == ["a"]
+    assert threads == [caller]
+
+
+def test_error_generator_diteruskan():
+    def events():
+        yield "a"
+        raise RuntimeError("gagal")
+
+    stream = sse.with_heartbeat(events(), 1, timeout=0)
+    assert next(stream) == "a"
+    with pytest.raises(RuntimeError, match="gagal"):
+        next(stream)
+
+
+def test_generator_dibatalkan_saat_stream_ditutup():
+    produced, closed = [], threading.Event()
+    stream = sse.with_heartbeat(_endless(produced, closed), 1, timeout=0)
+    assert next(stream) == "x"
+    stream.close()
+    assert closed.wait(1)
+    count = len(produced)
+    time.sleep(0.05)
+    assert len(produced) == count
+
+
+def test_timeout_per_item_mengakhiri_stream():
+    closed = threading.Event()
+    start = time.monotonic()
+    output = list(sse.with_heartbeat(_events(["a", "b"], delay=0.6, closed=closed), 0.05, timeout=0.2))
+    # Stream selesai setelah timeout, tidak menunggu generator yang macet
+    assert time.monotonic() - start < 0.5
+    assert output[-1] == sse.TIMEOUT_EVENT
+    assert "a" not in output
+    # Batas yang didokumentasikan: generator baru ditutup setelah next() yang macet kembali
+    assert not closed.is_set()
+    assert closed.wait(2)
+
+
+def test_async_heartbeat_dan_timeout():
+    output = _collect(sse.awith_heartbeat(_events(["a", "b"], delay=0.15), 0.03, timeout=0))
+    assert [item for item in output if item != sse.HEARTBEAT] == ["a", "b"]
+    assert output.count(sse.HEARTBEAT) >= 2
+
+    output = _collect(sse.awith_heartbeat(_events(["a"], delay=0.5), 0, timeout=0.1))
+    assert output == [sse.TIMEOUT_EVENT]
+
+
+def test_async_generator_dibatalkan_saat_disconnect():
+    produced, closed = [], threading.Event()
+    sent = []
+
+    async def receive():
+        await asyncio.sleep(0.05)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    stream = asgi.EventStream(sse.awith_heartbeat(_endless(produced, closed), 1, timeout=0))
+    asyncio.run(asyncio.wait_for(asgi.send_stream(send, receive, stream), 2))
+    assert closed.wait(1)
+    assert sent[0]["status"] == 200
+    # Response berhenti tanpa penutup normal setelah disconnect
+    assert all(message.get("more_body") for message in sent[1:])
+    count = len(produced)
+    time.sleep(0.05)
+    assert len(produced) == count
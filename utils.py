@@ -1,53 +1,187 @@
 import json
 import re
 import logging
-from fuzzywuzzy import fuzz
 from logger_config import logger
-from config import MIN_CONFIDENCE_SCORE, MAX_INPUT_LENGTH, KB_FILE
+from config import (
+    MAX_INPUT_LENGTH, KB_FILE, KB_WATCH_INTERVAL, KB_SNAPSHOT,
+    RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL, MATCHER_POOL_WORKERS
+)
+from cache import ResponseCache
+from metrics import STAGE_LATENCY
+from knowledge import (
+    compile_knowledge_base, validate_knowledge_base, suggestion_text,
+    KnowledgeBaseWatcher, NO_INFO_RESPONSE
+)
+from kb_index import load_index, write_index
+from conversation import carried_entities, is_follow_up, next_context
+import argparse
+import hashlib
 import os
+import threading
+import time
 
-# Load knowledge base dengan error handling yang lebih baik
+# Knowledge base mentah dan hasil kompilasinya (respons, keyword, matcher).
+# COMPILED_KB hanya pernah diganti (bukan diubah), jadi pembaca cukup membaca
+# referensinya sekali tanpa lock. KEYWORDS dan MATCHER ikut diperbarui setiap load.
+# KB di-load saat pertama kali dibutuhkan (ensure_knowledge_base), bukan saat import.
+# KB mentah None jika KB dimuat dari artifact index (KB_SNAPSHOT).
 KB = {}
+KEYWORDS = {}
+MATCHER = None
+COMPILED_KB = None
+# Process pool matching (MATCHER_POOL_WORKERS > 0), dibuat saat matching pertama
+# di setiap proses dan dibuat ulang setiap KB di-load
+MATCHER_POOL = None
+_matcher_pool_failed = False
+_kb_version = 0
+_kb_reload_lock = threading.Lock()
+_kb_watcher = None
 
-def load_knowledge_base():
-    """Load knowledge base dari file JSON dengan validasi"""
-    global KB
+# Cache respons untuk query yang sering berulang, dikosongkan setiap KB di-reload
+RESPONSE_CACHE = ResponseCache(max_size=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+
+def _read_knowledge_base_file():
+    """Isi file KB (bytes), atau None jika file tidak ada/tidak bisa dibaca"""
     try:
         if not os.path.exists(KB_FILE):
             logger.error(f"Knowledge base file tidak ditemukan: {KB_FILE}")
-            KB = {}
-            return False
+            return None
+        
+        with open(KB_FILE, 'rb') as f:
+            return f.read()
+    
+    except Exception as e:
+        logger.error(f"Error membaca knowledge base: {str(e)}")
+        return None
+
+def _read_knowledge_base(raw):
+    """Parse dan validasi isi file KB. Mengembalikan dict, atau None jika gagal"""
+    try:
+        if raw is None:
+            return None
         
-        with open(KB_FILE, 'r', encoding='utf-8') as f:
-            KB = json.load(f)
+        data = json.loads(raw.decode('utf-8'))
         
         # Validasi struktur KB
-        if not isinstance(KB, dict):
+        if not isinstance(data, dict):
             logger.error("Knowledge base harus berupa dictionary")
-            KB = {}
-            return False
+            return None
         
-        logger.info(f"Knowledge base berhasil dimuat dengan {len(KB)} kategori")
-        return True
+        return data
     
     except json.JSONDecodeError as e:
         logger.error(f"JSON decode error saat membaca KB: {str(e)}")
-        KB = {}
-        return False
+        return None
     except Exception as e:
         logger.error(f"Error membaca knowledge base: {str(e)}")
-        KB = {}
-        return False
+        return None
 
-# Load KB saat startup
-load_knowledge_base()
-    
-KEYWORDS = {
-    "jadwal": ["jadwal", "buka", "tutup", "istirahat", "hari kerja", "jam", "berapa"],
-    "aturan": ["aturan", "sanksi", "syarat", "peraturan", "dilarang", "boleh"],
-    "spesifikasi": ["spesifikasi", "pc", "komputer", "software", "hardware", "mysql", "sistem"],
-    "greeting": ["halo", "hai", "hallo", "selamat", "pagi", "siang", "sore", "assalamualaikum", "terima kasih", "makasih", "oke", "ok"]
-}
+def _create_matcher_pool(matcher):
+    """MatcherPool untuk matcher ini, atau None jika pool gagal dibuat"""
+    from match_pool import MatcherPool
+    try:
+        return MatcherPool(matcher)
+    except Exception as e:
+        logger.error(f"Gagal membuat matcher pool, matching di proses ini: {str(e)}")
+        return None
+
+def load_knowledge_base(only_if_missing=False):
+    """
+    Load knowledge base dari file JSON, kompilasi menjadi template respons,
+    lalu tukar COMPILED_KB secara atomik. Jika reload gagal, KB lama tetap dipakai.
+    Jika KB_SNAPSHOT diisi, artifact index (build_index) yang dibangun dari isi file
+    KB saat ini dipakai tanpa parse/kompilasi; jika file KB tidak ada, artifact dipakai
+    apa adanya. Artifact yang tidak cocok diabaikan (KB dikompilasi dari JSON).
+    only_if_missing: tidak melakukan apa-apa jika KB sudah pernah di-load.
+    """
+    global KB, KEYWORDS, MATCHER, COMPILED_KB, MATCHER_POOL, _kb_version
+    with _kb_reload_lock:
+        if only_if_missing and COMPILED_KB is not None:
+            return True
+        
+        start = time.perf_counter()
+        raw = _read_knowledge_base_file()
+        compiled = None
+        if KB_SNAPSHOT:
+            compiled = load_index(KB_SNAPSHOT, hashlib.sha256(raw).hexdigest() if raw is not None else None)
+        if compiled is not None:
+            loaded = True
+            source = f"index {KB_SNAPSHOT}"
+        else:
+            data = _read_knowledge_base(raw)
+            if data is None and COMPILED_KB is not None and not COMPILED_KB.empty:
+                logger.warning("Reload knowledge base gagal, KB sebelumnya tetap dipakai")
+                return False
+            compiled = compile_knowledge_base(data or {})
+            loaded = data is not None
+            source = KB_FILE
+        
+        _kb_version += 1
+        compiled.version = _kb_version
+        old_pool = MATCHER_POOL
+        if old_pool is not None:
+            MATCHER_POOL = _create_matcher_pool(compiled.matcher)
+        KB = compiled.data
+        KEYWORDS = compiled.keywords
+        MATCHER = compiled.matcher
+        COMPILED_KB = compiled
+        RESPONSE_CACHE.clear()
+        if old_pool is not None:
+            old_pool.shutdown()
+        
+        if not loaded:
+            return False
+        logger.info(
+            f"Knowledge base berhasil dimuat dari {source} dengan {len(compiled.responses)} kategori "
+            f"(versi {_kb_version}, {time.perf_counter() - start:.3f}s)"
+        )
+        return True
+
+def ensure_knowledge_base():
+    """CompiledKB aktif; KB di-load lebih dulu jika belum pernah di-load di proses ini"""
+    compiled = COMPILED_KB
+    if compiled is None:
+        load_knowledge_base(only_if_missing=True)
+        compiled = COMPILED_KB
+    return compiled
+
+def kb_info():
+    """Info KB yang sedang aktif untuk health check"""
+    compiled = COMPILED_KB
+    return {
+        "version": compiled.version if compiled else None,
+        "categories": len(compiled.responses) if compiled else 0,
+        "keywords": len(compiled.matcher) if compiled else 0
+    }
+
+def _start_matcher_pool():
+    """Buat MatcherPool untuk KB aktif jika belum ada di proses ini (sekali; gagal = nonaktif)"""
+    global MATCHER_POOL, _matcher_pool_failed
+    with _kb_reload_lock:
+        if MATCHER_POOL is None and not _matcher_pool_failed:
+            MATCHER_POOL = _create_matcher_pool(COMPILED_KB.matcher)
+            _matcher_pool_failed = MATCHER_POOL is None
+        return MATCHER_POOL
+
+def current_matcher():
+    """Matcher aktif: MatcherPool jika mode process pool aktif, selain itu matcher KB"""
+    compiled = ensure_knowledge_base()
+    pool = MATCHER_POOL
+    if pool is None and MATCHER_POOL_WORKERS > 0 and not _matcher_pool_failed:
+        pool = _start_matcher_pool()
+    return pool if pool is not None else compiled.matcher
+
+def matcher_pool_stats():
+    """Statistik process pool matching untuk health check"""
+    pool = MATCHER_POOL
+    return pool.stats() if pool is not None else {"enabled": False}
+
+def start_kb_watcher(interval=KB_WATCH_INTERVAL):
+    """Mulai thread yang me-reload KB saat file berubah (interval 0 = nonaktif)"""
+    global _kb_watcher
+    if _kb_watcher is None and interval > 0:
+        _kb_watcher = KnowledgeBaseWatcher(KB_FILE, load_knowledge_base, interval).start()
+    return _kb_watcher
 
 def extract_keywords(text):
     """Extract kata-kata dari teks dengan validasi"""
@@ -69,78 +203,77 @@ def validate_input(user_input):
     
     return True, None
 
-def match_category(user_input):
+def match_with_score(user_input, context=None):
     """
     Mencocokkan input user dengan kategori menggunakan pendekatan token-based.
-    - Gunakan token_set_ratio per keyword, ambil skor terbaik per kategori.
+    - Scoring dilakukan oleh matcher yang dikompilasi bersama KB (keyword per entry).
     - Tangani sapaan/short-input sebagai kategori khusus atau ambiguous.
+    - context (ConversationContext giliran sebelumnya): kategori sebelumnya didahulukan,
+      dan follow-up yang tidak menyebut keyword kategori lain tetap di kategori itu
+      (lihat conversation.py); skornya skor input terhadap kategori itu.
+    Mengembalikan tuple (category, score); (None, 0) untuk input tidak valid.
     """
+    return _match(user_input, context)[:2]
+
+def _match(user_input, context=None):
+    """match_with_score plus contenders hasil tanpa konteks (lihat IntentMatcher.match_detail)"""
     try:
         is_valid, error_msg = validate_input(user_input)
         if not is_valid:
             logger.warning(f"Invalid input: {error_msg}")
-            return None
-
-        user_input_lower = user_input.lower().strip()
-
-        # Jika sapaan eksplisit, langsung kembalikan 'greeting'
-        if re.search(r"\b(halo|hai|hallo|selamat|pagi|siang|sore|assalamualaikum|makasih|terima kasih)\b", user_input_lower):
-            return "greeting"
-
-        best_score = 0
-        best_cat = None
+            return None, 0, ()
 
-        for cat, words in KEYWORDS.items():
-            if not words or not isinstance(words, list):
-                continue
+        prefer = context.category if context is not None else None
+        category, score, contenders = current_matcher().match_detail(user_input, prefer)
+        # Follow-up tanpa keyword kategori lain (bukan exact hit): tetap di kategori sebelumnya
+        if prefer is not None and category != prefer and score < 100 and is_follow_up(user_input.lower().strip()):
+            category = prefer
+            score = ensure_knowledge_base().matcher.category_score(user_input, prefer)
+            logger.debug("Follow-up - Input: '%s', Category dari konteks: %s", user_input, category)
+        logger.debug("Match result - Input: '%s', Category: %s, Score: %s", user_input, category, score)
+        return category, score, contenders
+    except Exception as e:
+        logger.error(f"Error dalam match_with_score: {str(e)}")
+        return None, 0, ()
 
-            # Hitung skor terbaik terhadap semua kata kunci kategori
-            scores = [fuzz.token_set_ratio(user_input_lower, kw) for kw in words]
-            if not scores:
-                continue
-            cat_best = max(scores)
+def match_category(user_input, context=None):
+    """Kategori untuk input user (lihat match_with_score), None jika tidak dikenali"""
+    return match_with_score(user_input, context)[0]
 
-            if cat_best > best_score:
-                best_score = cat_best
-                best_cat = cat
+def category_entities(category, user_input):
+    """Trigger varian dan token keyword kategori yang disebut di input (entity konteks percakapan)"""
+    if not category or category == "greeting":
+        return []
+    compiled = ensure_knowledge_base()
+    tokens = compiled.matcher.tokens(user_input)
+    text = " ".join(tokens)
+    response = compiled.responses.get(category)
+    entities = [trigger for trigger, _ in response.variants if trigger in text] if response is not None else []
+    keyword_tokens = {token for kw in compiled.matcher.normalized_keywords.get(category, ()) for token in kw.split()}
+    for token in tokens:
+        if token in keyword_tokens and token not in entities:
+            entities.append(token)
+    return entities
 
-        logger.debug(f"Match result - Input: '{user_input}', Category: {best_cat}, Score: {best_score}")
+def follow_up_entities(context, category, user_input):
+    """Entity konteks yang ikut dipakai memilih varian respons follow-up (lihat conversation.py)"""
+    if context is None or category != context.category:
+        return ()
+    return carried_entities(context, category, user_input.lower().strip(), category_entities(category, user_input))
 
-        # Penanganan input pendek / ambiguous: untuk input sangat pendek, butuh threshold lebih tinggi
-        if len(user_input_lower) <= 4 and best_score < max(80, MIN_CONFIDENCE_SCORE):
-            logger.debug("Short input with low confidence -> treat as ambiguous")
-            return None
-
-        # Single-token safeguard: jika user hanya satu kata, pastikan kecocokan sangat kuat
-        tokens = extract_keywords(user_input_lower)
-        if tokens and len(tokens) == 1 and best_cat is not None:
-            kw_list = KEYWORDS.get(best_cat, [])
-            token = tokens[0]
-            strong = False
-            for kw in kw_list:
-                # Accept if exact match or high similarity
-                if token == kw or token in kw or kw in token:
-                    strong = True
-                    break
-                if fuzz.token_set_ratio(token, kw) >= 90:
-                    strong = True
-                    break
-            if not strong:
-                logger.debug(f"Single-token '{token}' not strongly matching category '{best_cat}' -> ambiguous")
-                return None
-
-        return best_cat if best_score >= MIN_CONFIDENCE_SCORE else None
+def advance_context(context, user_input, category):
+    """Konteks percakapan session setelah giliran ini dijawab dengan kategori category"""
+    try:
+        entities = category_entities(category, user_input) or follow_up_entities(context, category, user_input)
+        return next_context(context, category, entities)
     except Exception as e:
-        logger.error(f"Error dalam match_category: {str(e)}")
-        return None
+        logger.error(f"Error dalam advance_context: {str(e)}")
+        return context
 
 def get_suggestion():
     """Memberikan saran kategori yang tersedia"""
     try:
-        categories = list(KEYWORDS.keys())
-        if not categories:
-            return "Maaf, tidak ada kategori yang tersedia."
-        return f"Kategori yang tersedia: {', '.join(categories)}"
+        return suggestion_text(ensure_knowledge_base().keywords.keys())
     except Exception as e:
         logger.error(f"Error dalam get_suggestion: {str(e)}")
         return "Maaf, terjadi kesalahan saat mengambil saran kategori."
@@ -158,96 +291,225 @@ def safe_get(d, *keys, default=None):
     
     return current
 
-def generate_response(category, user_input):
+def generate_response(category, user_input, entities=()):
     """
     Generate response berdasarkan kategori.
-    Dengan error handling yang comprehensive.
+    Respons sudah dirender saat KB dikompilasi, di sini hanya lookup.
+    entities: entity konteks yang ikut dipakai memilih varian (follow-up).
     """
     try:
         is_valid, error_msg = validate_input(user_input)
         if not is_valid:
             return f"Error: {error_msg}"
         
+        compiled = ensure_knowledge_base()
         if not category:
-            suggestions = get_suggestion()
-            return f"Maaf, saya tidak paham pertanyaan Anda. {suggestions}"
+            return compiled.not_understood
 
-        if not KB:
+        if compiled.empty:
             logger.warning("Knowledge base kosong")
-            return "Maaf, saya tidak memiliki informasi tentang pertanyaan Anda."
-
-        if category == "jadwal":
-            jadwal_data = safe_get(KB, "jadwal")
-            if not jadwal_data:
-                logger.warning("Data jadwal tidak ditemukan")
-                return "Maaf, saya tidak memiliki informasi tentang pertanyaan Anda."
-            
-            try:
-                hari_kerja = jadwal_data.get("hari_kerja", "tidak tersedia")
-                jam_buka = jadwal_data.get("jam_buka", "tidak tersedia")
-                jam_tutup = jadwal_data.get("jam_tutup", "tidak tersedia")
-                istirahat = jadwal_data.get("istirahat", "tidak tersedia")
-                return f"Lab buka {hari_kerja} pukul {jam_buka} - {jam_tutup} (istirahat {istirahat})."
-            except Exception as e:
-                logger.error(f"Error processing jadwal: {str(e)}")
-                return "Maaf, saya tidak memiliki informasi tentang pertanyaan Anda."
-
-        elif category == "aturan":
-            aturan_data = safe_get(KB, "aturan")
-            if not aturan_data:
-                logger.warning("Data aturan tidak ditemukan")
-                return "Maaf, saya tidak memiliki informasi tentang pertanyaan Anda."
-            
-            try:
-                if "sanksi" in user_input.lower():
-                    sanksi = aturan_data.get("sanksi", [])
-                    if not sanksi or not isinstance(sanksi, list):
-                        return "Maaf, saya tidak memiliki informasi tentang sanksi."
-                    s = "\n".join(f"• {x}" for x in sanksi if x)
-                    return f"Sanksi:\n{s}" if s else "Maaf, data sanksi tidak tersedia."
-                else:
-                    syarat = aturan_data.get("syarat", [])
-                    if not syarat or not isinstance(syarat, list):
-                        return "Maaf, saya tidak memiliki informasi tentang aturan."
-                    s = "\n".join(f"• {x}" for x in syarat if x)
-                    return f"Aturan lab:\n{s}" if s else "Maaf, data aturan tidak tersedia."
-            except Exception as e:
-                logger.error(f"Error processing aturan: {str(e)}")
-                return "Maaf, saya tidak memiliki informasi tentang pertanyaan Anda."
-
-        elif category == "spesifikasi":
-            spesifikasi_data = safe_get(KB, "spesifikasi")
-            if not spesifikasi_data:
-                logger.warning("Data spesifikasi tidak ditemukan")
-                return "Maaf, saya tidak memiliki informasi tentang pertanyaan Anda."
-            
-            try:
-                pc_data = spesifikasi_data.get("pc", {})
-                software_list = spesifikasi_data.get("software", [])
-                
-                if not pc_data or not software_list:
-                    return "Maaf, data spesifikasi tidak lengkap."
-                
-                jumlah = pc_data.get("jumlah", "tidak tersedia")
-                processor = pc_data.get("processor", "tidak tersedia")
-                ram = pc_data.get("ram", "tidak tersedia")
-                os = pc_data.get("os", "tidak tersedia")
-                sw = ", ".join(software_list) if isinstance(software_list, list) else "tidak tersedia"
-                
-                return f"Spesifikasi: {jumlah} PC, {processor}, RAM {ram}, {os}. Software: {sw}"
-            except Exception as e:
-                logger.error(f"Error processing spesifikasi: {str(e)}")
-                return "Maaf, saya tidak memiliki informasi tentang pertanyaan Anda."
-        
-        elif category == "greeting":
-            # Simple friendly replies for greetings and small talk
-            return "Halo! Saya asisten Lab ICLABS. Anda bisa menanyakan: 'jam buka', 'aturan lab', atau 'spesifikasi PC'. Ada yang ingin ditanyakan?"
-        
-        else:
+            return NO_INFO_RESPONSE
+
+        response = compiled.responses.get(category)
+        if response is None:
             # Kategori tidak dikenali
             logger.warning(f"Kategori tidak dikenali: {category}")
-            return "Maaf, saya tidak memiliki informasi tentang pertanyaan Anda."
+            return NO_INFO_RESPONSE
+        
+        return response.render(" ".join((user_input.lower(), *entities)))
     
     except Exception as e:
         logger.error(f"Unexpected error dalam generate_response: {str(e)}")
         return "Maaf, terjadi kesalahan. Silakan coba lagi."
+
+def _context_applies(entry, context, user_input_lower):
+    """
+    Jawaban tanpa konteks (entry RESPONSE_CACHE) tidak berlaku untuk session dengan
+    konteks ini: bias konteks memilih kategori lain, follow-up dialihkan ke kategori
+    konteks, atau entity konteks ikut memilih varian respons.
+    """
+    category, _, score, contenders, mentions_entities = entry
+    if context.category in contenders:
+        return True
+    if not is_follow_up(user_input_lower):
+        return False
+    if category != context.category:
+        return score < 100
+    return bool(context.entities) and not mentions_entities
+
+def _answer(user_input, context, key):
+    """Match dan generate respons, simpan di RESPONSE_CACHE dengan key ini"""
+    # Hasil yang dihitung sebelum KB di-reload tidak boleh masuk cache baru
+    generation = RESPONSE_CACHE.generation
+    start = time.perf_counter()
+    category, score, contenders = _match(user_input, context)
+    matched = time.perf_counter()
+    if context is None:
+        # Entity hanya dibawa dari konteks pada follow-up (lihat _context_applies)
+        mentions_entities = is_follow_up(key) and bool(category_entities(category, user_input))
+        entry = (category, generate_response(category, user_input), score, contenders, mentions_entities)
+    else:
+        entities = follow_up_entities(context, category, user_input)
+        entry = (category, generate_response(category, user_input, entities), score)
+    STAGE_LATENCY.observe(matched - start, "match")
+    STAGE_LATENCY.observe(time.perf_counter() - matched, "generate")
+    RESPONSE_CACHE.set(key, entry, generation=generation)
+    return entry
+
+def is_cached(user_input):
+    """
+    Respons untuk input ini sudah ada di RESPONSE_CACHE dan berlaku untuk session mana pun,
+    sehingga bisa dipastikan tanpa membaca konteks session dari history store.
+    """
+    is_valid, _ = validate_input(user_input)
+    if not is_valid:
+        return False
+    key = RESPONSE_CACHE.normalize_key(user_input)
+    entry = RESPONSE_CACHE.peek(key)
+    # Tanpa contenders dan bukan follow-up: konteks apa pun tidak mengubah jawaban (lihat _context_applies)
+    return entry is not None and not entry[3] and not is_follow_up(key)
+
+def get_response(user_input, context=None):
+    """
+    Match kategori dan generate respons untuk input user.
+    Hasil untuk query yang sama (setelah normalisasi) diambil dari RESPONSE_CACHE. Jawaban
+    tanpa konteks dipakai bersama semua session; key per konteks (kategori & entity
+    sebelumnya) hanya untuk input yang jawabannya memang bergantung pada konteks.
+    context: ConversationContext session (lihat conversation.py), atau None.
+    Mengembalikan tuple (category, response, score).
+    """
+    is_valid, _ = validate_input(user_input)
+    if not is_valid:
+        category, score = match_with_score(user_input)
+        return category, generate_response(category, user_input), score
+
+    key = RESPONSE_CACHE.normalize_key(user_input)
+    entry = RESPONSE_CACHE.get(key) or _answer(user_input, None, key)
+    if context is None or not _context_applies(entry, context, key):
+        return entry[:3]
+    context_key = (context.category, context.entities, key)
+    return (RESPONSE_CACHE.get(context_key) or _answer(user_input, context, context_key))[:3]
+
+def response_chunks(response):
+    """Potong respons per baris untuk streaming (baris baru ikut di akhir potongan)"""
+    return response.splitlines(keepends=True) or [response]
+
+def stream_response(user_input, context=None):
+    """
+    Versi streaming get_response untuk /chat/stream: yield ("score", skor) dan
+    ("category", kategori), lalu ("chunk", teks) per potongan respons.
+    """
+    category, response, score = get_response(user_input, context)
+    yield "score", score
+    yield "category", category
+    for chunk in response_chunks(response):
+        yield "chunk", chunk
+
+def get_responses(messages):
+    """
+    Versi batch untuk banyak pesan sekaligus (kiosk gateway, analytics).
+    Scoring keyword dilakukan sekaligus untuk seluruh batch dan pesan identik hanya diproses sekali.
+    Mengembalikan list dict {message, category, score, response} sesuai urutan input.
+    """
+    results = [None] * len(messages)
+    valid_idx = []
+    for i, message in enumerate(messages):
+        if isinstance(message, str):
+            is_valid, error_msg = validate_input(message)
+        else:
+            is_valid, error_msg = False, "message harus berupa string"
+        if is_valid:
+            valid_idx.append(i)
+        else:
+            results[i] = {"message": message, "category": None, "score": 0, "response": f"Error: {error_msg}"}
+
+    try:
+        matches = current_matcher().match_many([messages[i] for i in valid_idx])
+    except Exception as e:
+        logger.error(f"Error dalam get_responses: {str(e)}")
+        matches = [match_with_score(messages[i]) for i in valid_idx]
+
+    responses = {}
+    for i, (category, score) in zip(valid_idx, matches):
+        message = messages[i]
+        key = (category, RESPONSE_CACHE.normalize_key(message))
+        if key not in responses:
+            responses[key] = generate_response(category, message)
+        results[i] = {"message": message, "category": category, "score": score, "response": responses[key]}
+
+    return results
+
+def build_index(kb_file=KB_FILE, output=KB_SNAPSHOT):
+    """
+    Validasi file KB lalu tulis artifact index (kb_index.py) untuk KB_SNAPSHOT.
+    Mengembalikan (header, []) jika berhasil, atau (None, list error validasi).
+    """
+    with open(kb_file, 'rb') as f:
+        raw = f.read()
+    try:
+        data = json.loads(raw.decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        return None, [f"JSON tidak valid: {str(e)}"]
+    
+    errors = validate_knowledge_base(data)
+    if errors:
+        return None, errors
+    compiled = compile_knowledge_base(data)
+    return write_index(compiled, output, hashlib.sha256(raw).hexdigest()), []
+
+def main(argv=None):
+    """CLI: python -m utils build-index [--kb FILE] [--output FILE] [--check]"""
+    parser = argparse.ArgumentParser(prog="python -m utils", description="Perintah knowledge base chatbot")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build-index", help="validasi KB dan bangun artifact index untuk KB_SNAPSHOT")
+    build.add_argument("--kb", default=KB_FILE, help=f"file KB JSON (default {KB_FILE})")
+    build.add_argument("--output", default=KB_SNAPSHOT or "knowledge_base.idx",
+                       help="file artifact (default KB_SNAPSHOT atau knowledge_base.idx)")
+    build.add_argument("--check", action="store_true", help="hanya validasi, tanpa menulis artifact")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.check:
+        try:
+            with open(args.kb, 'r', encoding='utf-8') as f:
+                errors = validate_knowledge_base(json.load(f))
+        except (OSError, ValueError) as e:
+            errors = [str(e)]
+        header = None
+    else:
+        try:
+            header, errors = build_index(args.kb, args.output)
+        except (OSError, ValueError) as e:
+            header, errors = None, [str(e)]
+    
+    for error in errors:
+        print(f"error: {error}")
+    if errors:
+        print(f"{args.kb}: {len(errors)} error, index tidak dibuat")
+        return 1
+    if header is None:
+        print(f"{args.kb}: valid")
+        return 0
+    print(
+        f"{args.output}: {header['categories']} kategori, {header['keywords']} keyword, "
+        f"{os.path.getsize(args.output)} bytes, sumber sha256 {header['source_sha256'][:12]}, "
+        f"{time.perf_counter() - start:.2f}s"
+    )
+    return 0
+
+def _reset_after_fork():
+    """
+    Thread KB watcher dan process pool milik proses induk tidak ikut ter-fork.
+    KB yang sudah di-load tetap dipakai bersama (copy-on-write); watcher dan pool
+    dibuat ulang oleh proses anak saat dibutuhkan.
+    """
+    global MATCHER_POOL, _kb_watcher, _kb_reload_lock
+    MATCHER_POOL = None
+    _kb_watcher = None
+    _kb_reload_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+if __name__ == "__main__":
+    raise SystemExit(main())